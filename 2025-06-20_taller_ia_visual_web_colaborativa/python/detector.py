@@ -23,6 +23,9 @@ from ultralytics import YOLO
 import matplotlib.pyplot as plt
 from typing import List, Dict, Any
 
+# Post-procesado vectorizado de YOLO (copia del módulo del Monitor Visual 3D)
+from yolo_postprocess import extract_detections
+
 
 class VisualAIDetector:
     """Detector de objetos con YOLO y exportación para web"""
@@ -73,41 +76,42 @@ class VisualAIDetector:
         annotated_image = image.copy()
         
         for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    # Extraer información de la detección
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    conf = float(box.conf[0].cpu().numpy())
-                    cls = int(box.cls[0].cpu().numpy())
-                    class_name = self.model.names[cls]
-                    
-                    # Crear diccionario de detección
-                    detection = {
-                        "class": class_name,
-                        "confidence": round(conf, 3),
-                        "bbox": {
-                            "x1": int(x1), "y1": int(y1),
-                            "x2": int(x2), "y2": int(y2),
-                            "width": int(x2 - x1),
-                            "height": int(y2 - y1),
-                            "center_x": int((x1 + x2) / 2),
-                            "center_y": int((y1 + y2) / 2)
-                        }
+            # Cajas, confianzas y clases del resultado en un solo array (sin copias por caja)
+            boxes = extract_detections(result)
+            xyxy = boxes['bbox']
+            # Ancho y alto de las cajas en float antes de truncar, como int(x2 - x1)
+            sizes = (xyxy[:, 2:] - xyxy[:, :2]).astype(int)
+            for (x1, y1, x2, y2), (width, height), conf, cls, (cx, cy) in zip(
+                    xyxy.astype(int).tolist(), sizes.tolist(), boxes['confidence'].tolist(),
+                    boxes['class_id'].tolist(), boxes['center'].astype(int).tolist()):
+                class_name = self.model.names[cls]
+                
+                # Crear diccionario de detección
+                detection = {
+                    "class": class_name,
+                    "confidence": round(conf, 3),
+                    "bbox": {
+                        "x1": x1, "y1": y1,
+                        "x2": x2, "y2": y2,
+                        "width": width,
+                        "height": height,
+                        "center_x": cx,
+                        "center_y": cy
                     }
-                    detections.append(detection)
-                    
-                    # Dibujar bounding box en la imagen
-                    color = self._get_class_color(cls)
-                    cv2.rectangle(annotated_image, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
-                    
-                    # Agregar etiqueta
-                    label = f"{class_name}: {conf:.2f}"
-                    label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
-                    cv2.rectangle(annotated_image, (int(x1), int(y1) - label_size[1] - 10),
-                                (int(x1) + label_size[0], int(y1)), color, -1)
-                    cv2.putText(annotated_image, label, (int(x1), int(y1) - 5),
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+                }
+                detections.append(detection)
+                
+                # Dibujar bounding box en la imagen
+                color = self._get_class_color(cls)
+                cv2.rectangle(annotated_image, (x1, y1), (x2, y2), color, 2)
+                
+                # Agregar etiqueta
+                label = f"{class_name}: {conf:.2f}"
+                label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
+                cv2.rectangle(annotated_image, (x1, y1 - label_size[1] - 10),
+                            (x1 + label_size[0], y1), color, -1)
+                cv2.putText(annotated_image, label, (x1, y1 - 5),
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
         
         # Crear resultado completo
         result_data = {
@@ -0,0 +1,1001 @@
+"""
+Benchmarks del Monitor Visual 3D
+
+Uso:
+    python benchmarks.py modes [--duration 20] [--fps 60]
+    python benchmarks.py parity [--source synthetic:640x480] [--frames 20]
+    python benchmarks.py protocol [--messages 2000]
+    python benchmarks.py broadcast [--clients 1 10 50 100 200] [--ticks 40]
+    python benchmarks.py pipeline [--source synthetic] [--frames 300] [--realtime] [--mode threads]
+    python benchmarks.py yolo-batch [--cameras 1 2 4 8] [--rounds 30]
+    python benchmarks.py colors [--frames 300] [--source synthetic]
+    python benchmarks.py tracking [--intervals 3 6 10] [--lag 2] [--frames 300]
+    python benchmarks.py yolo-post [--boxes 5 20 100] [--rounds 2000]
+    python benchmarks.py grabber [--work-ms 20 50 100] [--duration 5]
+    python benchmarks.py recorder [--frames 20000]
+    python benchmarks.py sender [--duration 5] [--fps 10 30]
+    python benchmarks.py startup [--source synthetic] [--mode threads]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import queue
+import random
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+import websockets
+
+from client_sessions import ClientBroadcaster
+from color_model import IncrementalColorModel
+from detector_workers import DetectorPool
+from frame_grabber import FrameGrabber
+from frame_sources import SyntheticSource, open_source
+from latest_value import LatestValue
+from main import VisualMonitor
+from process_detectors import ProcessDetectorPool
+from protocol import BinaryDeltaDecoder, BinaryDeltaEncoder
+from recorder import StreamReader, StreamRecorder
+from scheduler import DEFAULT_INTERVALS
+from tracker import BoxTracker
+from yolo_postprocess import YoloDetections, extract_detections
+
+DETECTORS = ['yolo', 'pose', 'hands', 'faces', 'colors']
+
+
+def synthetic_frames(count: int = 60, width: int = 320, height: int = 240, seed: int = 0) -> List[np.ndarray]:
+    """Genera frames reproducibles con ruido y un rectángulo en movimiento"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = int((i * 5) % (width - 60))
+        cv2.rectangle(frame, (x, height // 3), (x + 60, height // 3 + 100), (40, 160, 220), -1)
+        frames.append(frame)
+    return frames
+
+
+def run_detector_throughput(pool, frames: List[np.ndarray], duration: float, fps: float) -> Dict[str, float]:
+    """Envía frames al pool durante `duration` segundos y mide resultados por segundo"""
+    processed = {name: 0 for name in pool.names}
+    interval = 1.0 / fps
+    frame_id = 0
+    start = time.perf_counter()
+    next_submit = start
+    while time.perf_counter() - start < duration:
+        frame_id += 1
+        pool.submit(pool.names, frames[frame_id % len(frames)], frame_id)
+        for name in pool.collect():
+            processed[name] += 1
+        next_submit += interval
+        time.sleep(max(0.0, next_submit - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    return {name: count / elapsed for name, count in processed.items()}
+
+
+def compare_execution_modes(duration: float = 20.0, fps: float = 60.0):
+    """Compara el rendimiento de detectores en hilos frente a procesos"""
+    frames = synthetic_frames()
+    results = {}
+
+    print("🧵 Modo hilos: cargando modelos...")
+    functions = VisualMonitor.detectors_only(DETECTORS).detector_functions()
+    thread_pool = DetectorPool({name: functions[name] for name in DETECTORS})
+    thread_pool.start()
+    try:
+        results['threads'] = run_detector_throughput(thread_pool, frames, duration, fps)
+    finally:
+        thread_pool.stop()
+
+    print("🧩 Modo procesos: cargando modelos en cada worker...")
+    process_pool = ProcessDetectorPool(DETECTORS, frame_shape=frames[0].shape)
+    process_pool.start()
+    try:
+        if not process_pool.wait_ready():
+            print("❌ Los procesos worker no terminaron de cargar")
+            return results
+        results['processes'] = run_detector_throughput(process_pool, frames, duration, fps)
+    finally:
+        process_pool.stop()
+
+    print(f"\n📊 Resultados por segundo ({duration:.0f}s, frames enviados a {fps:.0f} fps)")
+    print(f"{'detector':>10} {'hilos':>10} {'procesos':>10} {'speedup':>9}")
+    for name in DETECTORS:
+        threads_rate = results['threads'][name]
+        process_rate = results['processes'][name]
+        speedup = process_rate / threads_rate if threads_rate > 0 else float('inf')
+        print(f"{name:>10} {threads_rate:>10.1f} {process_rate:>10.1f} {speedup:>8.2f}x")
+    print(f"{'total':>10} {sum(results['threads'].values()):>10.1f} "
+          f"{sum(results['processes'].values()):>10.1f}")
+    return results
+
+
+def _wait_process_result(pool: ProcessDetectorPool, name: str, frame_id: int,
+                         timeout: float = 10.0):
+    """Espera el resultado de `name` para un frame concreto (None si se omitió o no llegó)"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        pool.collect()
+        worker = pool.workers.get(name)
+        if worker is not None and worker.latest_answered_id >= frame_id:
+            result = worker.result
+            return result.data if result is not None and result.frame_id == frame_id else None
+        time.sleep(0.002)
+    return None
+
+
+def _max_box_error(expected: List[List[float]], actual: List[List[float]]) -> float:
+    """Mayor diferencia en píxeles entre cajas emparejadas en orden (inf si no coincide el número)"""
+    if len(expected) != len(actual):
+        return float('inf')
+    if not expected:
+        return 0.0
+    return float(np.max(np.abs(np.asarray(expected, dtype=np.float64) - np.asarray(actual, dtype=np.float64))))
+
+
+def compare_mode_boxes(source: str = 'synthetic:640x480', frames: int = 20):
+    """Comprueba que los modos hilos y procesos devuelven las mismas cajas en coordenadas del frame"""
+    names = ['yolo', 'faces']
+    frame_source = open_source(source, realtime=False, max_frames=frames)
+    samples = []
+    while True:
+        ok, frame = frame_source.read()
+        if not ok:
+            break
+        samples.append(frame)
+    frame_source.release()
+    if not samples:
+        print(f"❌ La fuente {source} no entregó frames")
+        return {}
+
+    functions = VisualMonitor.detectors_only(names).detector_functions()
+    expected = [{name: functions[name](frame) for name in names} for frame in samples]
+
+    def boxes(name: str, data: Dict) -> List[List[float]]:
+        if name == 'yolo':
+            return [list(det['bbox']) for det in data['detections']]
+        return [face['bbox'] for face in data['face_positions']]
+
+    # Anillo del tamaño de la fuente (por defecto) y anillo fijo de 320x240 (frames redimensionados)
+    errors = {}
+    for label, frame_shape in (('anillo del tamaño de la fuente', None),
+                               ('anillo 320x240, reescalado', (240, 320, 3))):
+        pool = ProcessDetectorPool(names, frame_shape=frame_shape)
+        pool.start()
+        try:
+            worst = {name: 0.0 for name in names}
+            for frame_id, frame in enumerate(samples, start=1):
+                for name in names:
+                    pool.submit([name], frame, frame_id)
+                    data = _wait_process_result(pool, name, frame_id)
+                    if data is None:
+                        worst[name] = float('inf')
+                        continue
+                    error = _max_box_error(boxes(name, expected[frame_id - 1][name]), boxes(name, data))
+                    worst[name] = max(worst[name], error)
+            errors[label] = worst
+        finally:
+            pool.stop()
+
+    height, width = samples[0].shape[:2]
+    print(f"\n📊 Cajas en modo procesos frente a hilos ({len(samples)} frames de {width}x{height})")
+    print(f"{'anillo':>30} " + " ".join(f"{name + ' px':>9}" for name in names))
+    for label, worst in errors.items():
+        print(f"{label:>30} " + " ".join(f"{worst[name]:>9.2f}" for name in names))
+    print("px = mayor diferencia de coordenadas; con el anillo reescalado el modelo ve una imagen más "
+          "pequeña, así que se esperan diferencias pequeñas, no un cambio de escala")
+    return errors
+
+
+def synthetic_states(count: int, seed: int = 0) -> List[Dict]:
+    """Secuencia de estados comprimidos: escena mayormente estable con cambios ocasionales"""
+    rng = random.Random(seed)
+    state = {
+        'timestamp': time.time(), 'people_count': 1, 'objects_count': 2, 'hands_count': 1,
+        'faces_count': 1, 'movement_intensity': 0.0, 'hand_gestures': ['open_hand'],
+        'frame_size': [320, 240], 'pose_detected': True,
+        'detections': [{'class': 'person', 'confidence': 0.91, 'center': [160, 120]}],
+        'dominant_colors': [[120, 110, 100], [30, 40, 50]],
+        'pose_landmarks': [round(rng.random(), 2) for _ in range(15)]
+    }
+    states = []
+    for _ in range(count):
+        state = dict(state)
+        state['timestamp'] += 0.05
+        state['movement_intensity'] = round(rng.random() * 0.05, 3) if rng.random() < 0.3 else 0.0
+        if rng.random() < 0.1:
+            state['people_count'] = rng.randint(0, 3)
+            state['detections'] = [
+                {'class': 'person', 'confidence': round(rng.uniform(0.6, 1.0), 2),
+                 'center': [rng.randint(0, 320), rng.randint(0, 240)]}
+                for _ in range(state['people_count'])
+            ]
+        if rng.random() < 0.2:
+            state['pose_landmarks'] = [round(rng.random(), 2) for _ in range(15)]
+        if rng.random() < 0.05:
+            state['hand_gestures'] = [rng.choice(['fist', 'open_hand', 'peace'])]
+        states.append(state)
+    return states
+
+
+def compare_protocols(messages: int = 2000):
+    """Compara bytes y CPU por mensaje entre JSON y el protocolo binario con deltas"""
+    states = synthetic_states(messages)
+
+    start = time.perf_counter()
+    json_bytes = sum(len(json.dumps(state, default=str)) for state in states)
+    json_time = time.perf_counter() - start
+
+    encoder = BinaryDeltaEncoder()
+    start = time.perf_counter()
+    encoded = [encoder.encode(state) for state in states]
+    binary_time = time.perf_counter() - start
+    binary_bytes = sum(len(message) for message in encoded)
+
+    decoder = BinaryDeltaDecoder()
+    mismatches = sum(decoder.decode(message) != state for message, state in zip(encoded, states))
+
+    print(f"\n📊 Protocolo WebSocket ({messages} mensajes)")
+    print(f"{'formato':>10} {'bytes/msg':>10} {'µs/msg':>8}")
+    print(f"{'json':>10} {json_bytes / messages:>10.1f} {json_time / messages * 1e6:>8.1f}")
+    print(f"{'binario':>10} {binary_bytes / messages:>10.1f} {binary_time / messages * 1e6:>8.1f}")
+    print(f"Reducción de ancho de banda: {json_bytes / binary_bytes:.1f}x, "
+          f"estados distintos tras decodificar: {mismatches}")
+
+
+class _DeliveryTracker:
+    """Hora de llegada de cada tick a cada cliente (el timestamp del estado identifica el tick)"""
+
+    def __init__(self, clients: int):
+        self.clients = clients
+        self.received = 0
+        self._arrivals: Dict[float, List[float]] = {}
+        self._complete: Dict[float, asyncio.Event] = {}
+
+    def _event(self, tick: float) -> asyncio.Event:
+        return self._complete.setdefault(tick, asyncio.Event())
+
+    def record(self, message):
+        arrived = time.perf_counter()
+        tick = json.loads(message)['timestamp']
+        self.received += 1
+        arrivals = self._arrivals.setdefault(tick, [])
+        arrivals.append(arrived)
+        if len(arrivals) == self.clients:
+            self._event(tick).set()
+
+    async def wait_delivered(self, tick: float, start: float, timeout: float = 2.0):
+        """Segundos desde `start` hasta que el último cliente recibió el tick (None si no llegó a todos)"""
+        try:
+            await asyncio.wait_for(self._event(tick).wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return max(self._arrivals[tick]) - start
+
+    def reset(self):
+        self._arrivals.clear()
+        self._complete.clear()
+
+
+async def _drain_client(websocket, tracker: _DeliveryTracker):
+    try:
+        async for message in websocket:
+            tracker.record(message)
+    except websockets.exceptions.ConnectionClosed:
+        pass
+
+
+async def _broadcast_benchmark(client_counts: List[int], ticks: int, interval: float):
+    states = synthetic_states(ticks)
+    rows = []
+    for count in client_counts:
+        broadcaster = ClientBroadcaster(base_interval=interval)
+
+        async def handler(websocket):
+            broadcaster.add(websocket)
+            try:
+                await websocket.wait_closed()
+            finally:
+                await broadcaster.remove(websocket)
+
+        async with websockets.serve(handler, 'localhost', 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            tracker = _DeliveryTracker(count)
+            clients = [await websockets.connect(f'ws://localhost:{port}') for _ in range(count)]
+            readers = [asyncio.create_task(_drain_client(c, tracker)) for c in clients]
+            while len(broadcaster) < count:
+                await asyncio.sleep(0.01)
+
+            async def run_ticks(send_tick):
+                """Tiempo bloqueado en el envío, tiempo hasta que todos recibieron cada tick e incompletos"""
+                blocked, delivered, missing = [], [], 0
+                for state in states:
+                    start = time.perf_counter()
+                    await send_tick(state)
+                    blocked.append(time.perf_counter() - start)
+                    elapsed = await tracker.wait_delivered(state['timestamp'], start)
+                    if elapsed is None:
+                        missing += 1
+                    else:
+                        delivered.append(elapsed)
+                    await asyncio.sleep(max(0.0, interval - (time.perf_counter() - start)))
+                tracker.reset()
+                return blocked, delivered, missing
+
+            # Referencia: serializar y esperar el envío a cada cliente en orden (implementación anterior)
+            async def send_sequential(state):
+                message = json.dumps(state, default=str)
+                for websocket in list(broadcaster.sessions):
+                    await websocket.send(message)
+
+            # Serialización única + colas por cliente: broadcast solo encola, las tareas de envío entregan
+            async def send_fan_out(state):
+                broadcaster.broadcast(state)
+
+            sequential_blocked, sequential, sequential_missing = await run_ticks(send_sequential)
+            fan_out_blocked, fan_out, fan_out_missing = await run_ticks(send_fan_out)
+
+            drops = sum(session.metrics['dropped'] for session in broadcaster.sessions.values())
+            for websocket in clients:
+                await websocket.close()
+            await asyncio.gather(*readers)
+
+        def ms(values, q):
+            return np.percentile(values, q) * 1000 if values else float('nan')
+
+        rows.append((count, ms(sequential_blocked, 50), ms(sequential, 50), ms(sequential, 95),
+                     ms(fan_out_blocked, 50), ms(fan_out, 50), ms(fan_out, 95),
+                     sequential_missing + fan_out_missing, drops))
+    return rows
+
+
+def compare_broadcast(client_counts: List[int], ticks: int = 40, interval: float = 0.050):
+    """Mide el tiempo desde que sale un tick hasta que lo han recibido todos los clientes locales"""
+    rows = asyncio.run(_broadcast_benchmark(client_counts, ticks, interval))
+    print(f"\n📊 Broadcast hasta la entrega a todos los clientes ({ticks} ticks cada {interval * 1000:.0f}ms)")
+    print(f"{'':>9} {'secuencial':>28} {'fan-out':>28}")
+    print(f"{'clientes':>9} {'bloqueo':>8} {'entrega p50':>11} {'p95':>7} {'bloqueo':>8} {'entrega p50':>11} "
+          f"{'p95':>7} {'incompletos':>12} {'descartes':>10}")
+    for count, seq_blocked, seq_p50, seq_p95, fan_blocked, fan_p50, fan_p95, missing, drops in rows:
+        print(f"{count:>9} {seq_blocked:>8.3f} {seq_p50:>11.3f} {seq_p95:>7.3f} {fan_blocked:>8.3f} "
+              f"{fan_p50:>11.3f} {fan_p95:>7.3f} {missing:>12} {drops:>10}")
+    print("ms; bloqueo = p50 del tiempo que el emisor pasa en la llamada, "
+          "entrega = desde que empieza la llamada hasta que el último cliente recibió el tick")
+
+
+def run_pipeline(source: str = 'synthetic', frames: int = 300, realtime: bool = False,
+                 mode: str = 'threads', scheduler: str = 'fixed', budget_ms: float = 25.0,
+                 cascade: bool = False) -> Dict:
+    """Procesa una fuente sin ventana ni WebSocket y mide fps sostenidos y latencias"""
+    frame_source = open_source(source, realtime=realtime, max_frames=frames)
+    monitor = VisualMonitor(execution_mode=mode, scheduler=scheduler, budget_ms=budget_ms,
+                            source=frame_source, headless=True, cascade=cascade)
+    try:
+        if not monitor.detector_pool.wait_ready():
+            print("❌ Los detectores no terminaron de cargar")
+            return {}
+        start = time.perf_counter()
+        while True:
+            read_start = time.perf_counter()
+            ok, frame = frame_source.read()
+            capture_time = time.perf_counter()
+            if not ok:
+                if frame_source.exhausted:
+                    break
+                continue
+            monitor.metrics.record('capture', capture_time - read_start)
+            monitor.process_frame(frame, capture_time)  # Registra su propia etapa 'process_frame'
+        elapsed = time.perf_counter() - start
+        # Dejar que terminen las inferencias en curso antes de leer contadores
+        time.sleep(0.5)
+        monitor.detector_pool.collect()
+        detector_stats = monitor.detector_pool.get_stats(monitor.frame_count)
+        stages = monitor.metrics.snapshot()
+    finally:
+        monitor.detector_pool.stop()
+        frame_source.release()
+
+    fps = monitor.frame_count / elapsed if elapsed > 0 else 0.0
+    print(f"\n📊 Pipeline sin ventana: {frame_source.describe()}, modo {mode}, planificador {scheduler}"
+          + (", cascada" if cascade else ""))
+    print(f"Frames: {monitor.frame_count} en {elapsed:.2f}s -> {fps:.1f} fps sostenidos")
+    print(f"{'detector':>14} {'proc/s':>8} {'descartes':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, s in detector_stats.items():
+        stage = stages.get(name, {})
+        print(f"{name:>14} {s['processed'] / elapsed:>8.1f} {s['dropped']:>10} "
+              f"{stage.get('p50_ms', 0.0):>8.2f} {stage.get('p95_ms', 0.0):>8.2f}")
+    for name in ('capture', 'movement', 'colors', 'process_frame'):
+        stage = stages.get(name)
+        if stage and 'p50_ms' in stage and name not in detector_stats:
+            print(f"{name:>14} {'':>8} {'':>10} {stage['p50_ms']:>8.2f} {stage['p95_ms']:>8.2f}")
+    if cascade:
+        print(f"Cascada: {monitor.cascade_stats['skipped']} ejecuciones de MediaPipe evitadas sin personas, "
+              f"{monitor.cascade_stats['submitted']} sobre recortes")
+    return {'fps': fps, 'elapsed': elapsed, 'detectors': detector_stats, 'stages': stages}
+
+
+def compare_startup(source: str = 'synthetic', mode: str = 'threads', timeout: float = 120.0):
+    """Carga secuencial de los modelos antes de abrir la cámara frente a carga perezosa en paralelo"""
+    start = time.perf_counter()
+    VisualMonitor.detectors_only(['yolo', 'pose', 'hands', 'faces'])
+    sequential = time.perf_counter() - start
+
+    monitor = VisualMonitor(execution_mode=mode, source=open_source(source), headless=True)
+    thread = threading.Thread(target=monitor.camera_thread, daemon=True)
+    thread.start()
+    deadline = time.perf_counter() + timeout
+    while monitor.startup['first_full_result_s'] is None and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    monitor.running = False
+    thread.join(timeout=2.0)
+    monitor.detector_pool.stop()
+    monitor.cap.release()
+
+    startup = monitor.startup
+    full = startup['first_full_result_s']
+    print(f"\n📊 Arranque ({mode}, {source})")
+    print(f"Antes: {sequential:.2f}s cargando los modelos uno tras otro antes de abrir la cámara")
+    print(f"Ahora: primer frame a los {startup['first_frame_s'] or 0.0:.2f}s, resultado completo "
+          + ("sin completar" if full is None else f"a los {full:.2f}s"))
+    for name, s in monitor.detector_pool.get_stats().items():
+        print(f"{name:>8}: carga {s.get('load_time', 0.0):.2f}s, calentamiento {s.get('warmup_time', 0.0) * 1000:.0f}ms")
+    return startup
+
+
+def compare_yolo_batches(camera_counts: List[int], rounds: int = 30):
+    """Compara YOLO frame a frame frente a un lote por ronda (un frame por cámara)"""
+    monitor = VisualMonitor.detectors_only(['yolo'])
+    frames = synthetic_frames(max(camera_counts))
+    monitor.detect_objects_yolo_batch(frames[:1])  # Calentamiento
+
+    print(f"\n📊 YOLO por cámara vs por lotes ({rounds} rondas)")
+    print(f"{'cámaras':>8} {'uno a uno ms':>13} {'lote ms':>9} {'ms/cámara':>10} {'speedup':>8}")
+    for count in camera_counts:
+        batch = frames[:count]
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for frame in batch:
+                monitor.detect_objects_yolo(frame)
+        single = (time.perf_counter() - start) / rounds
+        start = time.perf_counter()
+        for _ in range(rounds):
+            monitor.detect_objects_yolo_batch(batch)
+        batched = (time.perf_counter() - start) / rounds
+        print(f"{count:>8} {single * 1000:>13.1f} {batched * 1000:>9.1f} "
+              f"{batched * 1000 / count:>10.1f} {single / batched:>7.2f}x")
+
+
+def _palette_jitter(palettes: List[List[List[int]]]) -> float:
+    """Cambio medio (distancia RGB) de cada posición de la paleta entre frames consecutivos"""
+    values = np.asarray(palettes, dtype=np.float32)
+    if len(values) < 2:
+        return 0.0
+    return float(np.linalg.norm(np.diff(values, axis=0), axis=2).mean())
+
+
+def compare_color_models(frames: int = 300, source: str = 'synthetic', noise: float = 6.0):
+    """Coste y estabilidad: k-means por llamada frente al modelo incremental"""
+    frame_source = open_source(source, realtime=False, max_frames=frames)
+    fps = frame_source.fps if frame_source.fps > 0 else 30.0
+    rng = np.random.default_rng(1)
+    sequence = []
+    while True:
+        ok, frame = frame_source.read()
+        if not ok:
+            if frame_source.exhausted:
+                break
+            continue
+        # Ruido de sensor: la escena no cambia, la paleta tampoco debería
+        noisy = np.clip(frame.astype(np.float32) + rng.normal(0, noise, frame.shape), 0, 255)
+        sequence.append(noisy.astype(np.uint8))
+    frame_source.release()
+    duration = len(sequence) / fps
+
+    monitor = VisualMonitor.detectors_only([])
+    # Intervalo con el que corre cada método en el monitor (k-means original: cada 10 frames)
+    own_interval = {'kmeans': 10, 'incremental': DEFAULT_INTERVALS['colors']}
+    rows = []
+    # Los dos métodos con los dos intervalos: a igual intervalo la inestabilidad por
+    # actualización es comparable; entre intervalos distintos, la de por segundo de video
+    for interval in sorted(set(own_interval.values())):
+        for label in ('kmeans', 'incremental'):
+            fn = monitor.extract_dominant_colors_fast if label == 'kmeans' else IncrementalColorModel(k=3).update
+            palettes = []
+            elapsed = 0.0
+            for i, frame in enumerate(sequence):
+                if i % interval:
+                    continue
+                start = time.perf_counter()
+                palettes.append(fn(frame))
+                elapsed += time.perf_counter() - start
+            jitter = _palette_jitter(palettes)
+            rows.append((label, interval, interval == own_interval[label], elapsed / len(palettes) * 1e6,
+                         elapsed / len(sequence) * 1e6, jitter, jitter * (len(palettes) - 1) / duration))
+
+    print(f"\n📊 Colores dominantes ({len(sequence)} frames = {duration:.1f} s a {fps:.0f} fps, ruido σ={noise})")
+    print(f"{'método':>12} {'intervalo':>10} {'µs/llamada':>11} {'µs/frame':>9} "
+          f"{'inest./act.':>12} {'inest./s':>9}")
+    for label, interval, own, cost, amortized, jitter, jitter_rate in rows:
+        print(f"{label:>12} {interval:>9}{'*' if own else ' '} {cost:>11.1f} {amortized:>9.1f} "
+              f"{jitter:>12.2f} {jitter_rate:>9.1f}")
+    print("* = intervalo con el que corre en el monitor; µs/frame = coste repartido entre todos los frames")
+    print("inest./act. = cambio RGB medio por posición de la paleta entre actualizaciones; "
+          "inest./s = cambio acumulado por segundo de video")
+
+
+def _center_error(detections: List[Dict], truth: List[Dict]) -> float:
+    """Distancia media (px) entre el centro de cada caja real y la detección de su clase"""
+    errors = []
+    for gt in truth:
+        gx, gy = (gt['bbox'][0] + gt['bbox'][2]) / 2, (gt['bbox'][1] + gt['bbox'][3]) / 2
+        same = [d for d in detections if d['class'] == gt['class']]
+        if same:
+            errors.append(min(np.hypot((d['bbox'][0] + d['bbox'][2]) / 2 - gx,
+                                       (d['bbox'][1] + d['bbox'][3]) / 2 - gy) for d in same))
+    return float(np.mean(errors)) if errors else 0.0
+
+
+def compare_tracking(intervals: List[int], lag: int = 2, frames: int = 300):
+    """Error de posición de las cajas entre ejecuciones de YOLO: caché frente a seguimiento"""
+    print(f"\n📊 Seguimiento de cajas ({frames} frames sintéticos, resultado de YOLO {lag} frames tarde)")
+    print(f"{'intervalo':>10} {'caché px':>9} {'tracker px':>11} {'tracker µs':>11} {'ids':>5}")
+    for interval in intervals:
+        source = SyntheticSource(realtime=False, max_frames=frames)
+        tracker = BoxTracker(small_size=(80, 60))
+        pending = []        # (frame en que llega, frame observado, detecciones)
+        cached: List[Dict] = []
+        prev_gray = None
+        cached_errors, tracked_errors, tracking_time = [], [], 0.0
+        for frame_id in range(1, frames + 1):
+            ok, frame = source.read()
+            truth = source.ground_truth()
+            gray = cv2.cvtColor(cv2.resize(frame, (80, 60)), cv2.COLOR_BGR2GRAY)
+            start = time.perf_counter()
+            tracker.propagate(prev_gray, gray, frame.shape, frame_id)
+            tracking_time += time.perf_counter() - start
+            prev_gray = gray
+
+            if frame_id % interval == 0:
+                # YOLO "perfecto" con la latencia de un worker
+                pending.append((frame_id + lag, frame_id, truth))
+            while pending and pending[0][0] <= frame_id:
+                _, observed, detections = pending.pop(0)
+                cached = detections
+                start = time.perf_counter()
+                tracker.update(detections, observed)
+                tracking_time += time.perf_counter() - start
+
+            if cached:
+                cached_errors.append(_center_error(cached, truth))
+                tracked_errors.append(_center_error(tracker.detections(), truth))
+        print(f"{interval:>10} {np.mean(cached_errors):>9.2f} {np.mean(tracked_errors):>11.2f} "
+              f"{tracking_time / frames * 1e6:>11.1f} {tracker.stats['tracks_created']:>5}")
+    print("px = distancia media entre el centro real y el publicado; ids = tracks creados (2 figuras)")
+
+
+class _SyntheticBoxes:
+    """Imita ultralytics Boxes: `data` N × 6 e iteración caja a caja con xyxy/conf/cls de 1 fila"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        for i in range(len(self.data)):
+            yield _SyntheticBoxes(self.data[i:i + 1])
+
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+
+    @property
+    def conf(self):
+        return self.data[:, -2]
+
+    @property
+    def cls(self):
+        return self.data[:, -1]
+
+
+class _SyntheticResult:
+    def __init__(self, data):
+        self.boxes = _SyntheticBoxes(data)
+
+
+def _parse_yolo_loop(result, names: Dict[int, str]) -> Dict:
+    """Post-procesado anterior: una copia a numpy y escalares de Python por caja"""
+    people_count, objects_count, detections = 0, 0, []
+    for box in result.boxes:
+        class_id = int(box.cls[0])
+        confidence = float(box.conf[0])
+        if confidence >= 0.5:  # Mismo criterio que conf= y extract_detections
+            x1, y1, x2, y2 = (box.xyxy[0].cpu().numpy() if hasattr(box.xyxy, 'cpu') else box.xyxy[0])
+            class_name = names[class_id]
+            detections.append({
+                'class': class_name,
+                'confidence': confidence,
+                'bbox': [float(x1), float(y1), float(x2), float(y2)],
+                'center': [float((x1 + x2) / 2), float((y1 + y2) / 2)],
+                'area': float((x2 - x1) * (y2 - y1))
+            })
+            if class_name == 'person':
+                people_count += 1
+            else:
+                objects_count += 1
+    return {'people_count': people_count, 'objects_count': objects_count, 'detections': detections}
+
+
+def compare_yolo_postprocess(box_counts: List[int], rounds: int = 2000):
+    """Coste del post-procesado de YOLO por frame: bucle por caja frente a arrays"""
+    try:
+        import torch
+        to_tensor = torch.from_numpy
+    except ImportError:
+        to_tensor = None  # Sin torch se mide solo la parte de Python/numpy
+    names = {i: f'class_{i}' for i in range(80)}
+    names[0] = 'person'
+    rng = np.random.default_rng(0)
+
+    print(f"\n📊 Post-procesado de YOLO ({rounds} resultados, tensores {'torch' if to_tensor else 'numpy'})")
+    print(f"{'cajas':>6} {'bucle µs':>9} {'array µs':>9} {'+envío µs':>10} {'iguales':>8}")
+    for count in box_counts:
+        xy = rng.uniform(0, 300, (count, 2))
+        wh = rng.uniform(10, 100, (count, 2))
+        data = np.hstack([xy, xy + wh, rng.uniform(0.2, 1.0, (count, 1)),
+                          rng.integers(0, 3, (count, 1))]).astype(np.float32)
+        result = _SyntheticResult(to_tensor(data) if to_tensor else data)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            loop = _parse_yolo_loop(result, names)
+        loop_time = (time.perf_counter() - start) / rounds
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            detections = YoloDetections(extract_detections(result, min_confidence=0.5), names)
+            detections.class_counts(0)
+        array_time = (time.perf_counter() - start) / rounds
+
+        # Lo que lee el envío por WebSocket: solo las personas con confianza >= 0.6
+        start = time.perf_counter()
+        for _ in range(rounds):
+            detections = YoloDetections(extract_detections(result, min_confidence=0.5), names)
+            detections.class_counts(0)
+            list(detections.select(0, 0.6))
+        sent_time = (time.perf_counter() - start) / rounds
+
+        same = detections.as_dicts() == loop['detections']
+        print(f"{count:>6} {loop_time * 1e6:>9.1f} {array_time * 1e6:>9.1f} {sent_time * 1e6:>10.1f} "
+              f"{'sí' if same else 'no':>8}")
+
+
+class _BufferedCamera:
+    """Cámara simulada: el driver produce frames a `fps` y guarda los últimos `buffer`"""
+
+    is_live = True
+
+    def __init__(self, fps: float = 30.0, buffer: int = 4, size=(240, 320)):
+        self.fps = fps
+        self.buffer = buffer
+        self.size = size
+        self.start = time.perf_counter()
+        self.next_index = 0
+        self.produced = 0
+
+    def read(self):
+        produced = int((time.perf_counter() - self.start) * self.fps) + 1
+        index = max(self.next_index, produced - self.buffer)  # Los más viejos se pierden
+        ready_at = self.start + index / self.fps
+        delay = ready_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)  # Bloquea hasta que el driver tenga el frame
+        self.next_index = index + 1
+        self.produced = max(self.produced, index + 1)
+        frame = np.zeros(self.size + (3,), dtype=np.uint8)
+        frame.reshape(-1)[:4] = np.frombuffer(np.int32(index).tobytes(), dtype=np.uint8)
+        return True, frame
+
+    def produced_at(self, frame: np.ndarray) -> float:
+        index = int(np.frombuffer(frame.reshape(-1)[:4].tobytes(), dtype=np.int32)[0])
+        return self.start + index / self.fps
+
+    def release(self):
+        pass
+
+
+def compare_grabber(work_ms: List[float], duration: float = 5.0, fps: float = 30.0, buffer: int = 4):
+    """Edad del frame al procesarlo: cap.read() en línea frente a FrameGrabber"""
+    print(f"\n📊 Captura ({fps:.0f} fps, buffer del driver de {buffer} frames, {duration:.0f}s por caso)")
+    print(f"{'trabajo ms':>10} {'modo':>9} {'fps':>6} {'edad p50 ms':>12} {'edad p95 ms':>12} {'descartados':>12}")
+    for work in work_ms:
+        for mode in ('inline', 'grabber'):
+            camera = _BufferedCamera(fps, buffer)
+            grabber = FrameGrabber(camera).start() if mode == 'grabber' else None
+            ages = []
+            last_id = 0
+            end = time.perf_counter() + duration
+            while time.perf_counter() < end:
+                if grabber is None:
+                    _, frame = camera.read()
+                else:
+                    grabbed = grabber.wait(last_id, timeout=1.0)
+                    last_id, frame = grabbed.frame_id, grabbed.frame
+                ages.append(time.perf_counter() - camera.produced_at(frame))
+                time.sleep(work / 1000)  # Procesamiento simulado
+            if grabber is not None:
+                grabber.stop()
+            dropped = camera.produced - len(ages)
+            ages_ms = np.array(ages) * 1000
+            print(f"{work:>10.0f} {mode:>9} {len(ages) / duration:>6.1f} {np.percentile(ages_ms, 50):>12.1f} "
+                  f"{np.percentile(ages_ms, 95):>12.1f} {dropped:>12}")
+    print("edad = tiempo entre que el driver tiene el frame y el inicio de su procesamiento")
+
+
+def _recorded_states(frames: int) -> List[Dict]:
+    """Estados de synthetic_states con las cajas que trae process_frame"""
+    states = synthetic_states(frames)
+    for state in states:
+        state['detections'] = [
+            dict(det, bbox=[det['center'][0] - 20, det['center'][1] - 40,
+                            det['center'][0] + 20, det['center'][1] + 40])
+            for det in state['detections']
+        ]
+    return states
+
+
+def compare_recorder(frames: int = 20000):
+    """Coste en el hilo de cámara, tamaño por fila y lectura por rango: JSON Lines en línea vs bloques .npz"""
+    states = _recorded_states(frames)
+    directory = tempfile.mkdtemp(prefix='recorder_bench_')
+    try:
+        jsonl_path = os.path.join(directory, 'frames.jsonl')
+        start = time.perf_counter()
+        with open(jsonl_path, 'w') as f:
+            for state in states:
+                f.write(json.dumps(state) + '\n')
+        jsonl_us = (time.perf_counter() - start) / frames * 1e6
+
+        recorder = StreamRecorder(os.path.join(directory, 'npz'))
+        costs = []
+        for state in states:
+            start = time.perf_counter()
+            recorder.record(state)
+            costs.append(time.perf_counter() - start)
+        recorder.close()
+        costs_us = np.array(costs) * 1e6
+
+        # Un 5% del tiempo grabado, en mitad de la grabación
+        t0, t1 = states[0]['timestamp'], states[-1]['timestamp']
+        range_start = t0 + (t1 - t0) * 0.5
+        range_end = range_start + (t1 - t0) * 0.05
+
+        start = time.perf_counter()
+        with open(jsonl_path) as f:
+            jsonl_rows = sum(1 for line in f if range_start <= json.loads(line)['timestamp'] <= range_end)
+        jsonl_read_ms = (time.perf_counter() - start) * 1000
+
+        reader = StreamReader(os.path.join(directory, 'npz'))
+        start = time.perf_counter()
+        npz_rows = sum(1 for _ in reader.iter_records(range_start, range_end))
+        npz_read_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        reader.column('people_count', range_start, range_end)
+        column_ms = (time.perf_counter() - start) * 1000
+
+        npz_bytes = sum(os.path.getsize(os.path.join(directory, 'npz', name))
+                        for name in os.listdir(os.path.join(directory, 'npz')))
+        print(f"\n📊 Grabación de {frames} frames")
+        print(f"{'formato':>10} {'µs/frame p50':>13} {'µs/frame p99':>13} {'bytes/frame':>12} "
+              f"{'rango 5% ms':>12} {'filas':>7}")
+        print(f"{'jsonl':>10} {jsonl_us:>13.1f} {'-':>13} {os.path.getsize(jsonl_path) / frames:>12.1f} "
+              f"{jsonl_read_ms:>12.1f} {jsonl_rows:>7}")
+        print(f"{'npz':>10} {np.percentile(costs_us, 50):>13.1f} {np.percentile(costs_us, 99):>13.1f} "
+              f"{npz_bytes / frames:>12.1f} {npz_read_ms:>12.1f} {npz_rows:>7}")
+        print(f"columna people_count del rango: {column_ms:.1f}ms; escritor: {recorder.summary()}, "
+              f"{recorder.stats['write_ms']:.0f}ms en su hilo")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+async def _polling_sender(data_queue: queue.Queue, duration: float, latencies: List[float],
+                          min_interval: float = 0.050) -> int:
+    """Bucle anterior de websocket_sender: sondeo cada 10 ms y vaciado con get_nowait"""
+    wakeups = 0
+    last_send_time = 0.0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        wakeups += 1
+        current_time = time.time()
+        if current_time - last_send_time >= min_interval:
+            while not data_queue.empty():
+                try:
+                    data = data_queue.get_nowait()
+                except queue.Empty:
+                    break
+                latencies.append(time.perf_counter() - data['_queued_at'])
+            last_send_time = current_time
+        await asyncio.sleep(0.010)
+    return wakeups
+
+
+async def _event_sender(slot: LatestValue, duration: float, latencies: List[float],
+                        min_interval: float = 0.050, keepalive: float = 1.0) -> int:
+    """Bucle actual de websocket_sender: espera en LatestValue y duerme solo por el límite de frecuencia"""
+    slot.bind()
+    wakeups = 0
+    last_send_time = 0.0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        delay = last_send_time + min_interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        values = await slot.wait(timeout=min(keepalive, max(0.0, end - time.perf_counter())))
+        wakeups += 1
+        for data in values.values():
+            latencies.append(time.perf_counter() - data['_queued_at'])
+        last_send_time = time.perf_counter()
+    return wakeups
+
+
+def _run_sender(mode: str, duration: float, fps: float) -> Dict[str, float]:
+    """CPU del proceso y espera de cada dato hasta el sender, con un productor a `fps` (0 = inactivo)"""
+    latencies: List[float] = []
+    data_queue: queue.Queue = queue.Queue(maxsize=5)
+    slot = LatestValue()
+    running = True
+
+    def producer():
+        next_at = time.perf_counter()
+        while running:
+            next_at += 1 / fps
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+            data = {'_queued_at': time.perf_counter()}
+            if mode == 'polling':
+                if data_queue.full():
+                    try:
+                        data_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                try:
+                    data_queue.put_nowait(data)
+                except queue.Full:
+                    pass
+            else:
+                slot.publish(data)
+
+    thread = threading.Thread(target=producer, daemon=True) if fps > 0 else None
+    if thread is not None:
+        thread.start()
+    cpu_start = time.process_time()
+    if mode == 'polling':
+        wakeups = asyncio.run(_polling_sender(data_queue, duration, latencies))
+    else:
+        wakeups = asyncio.run(_event_sender(slot, duration, latencies))
+    cpu = time.process_time() - cpu_start
+    running = False
+    if thread is not None:
+        thread.join()
+
+    latencies_ms = np.array(latencies or [0.0]) * 1000
+    return {'cpu_pct': cpu / duration * 100, 'wakeups_s': wakeups / duration,
+            'p50': float(np.percentile(latencies_ms, 50)), 'p95': float(np.percentile(latencies_ms, 95)),
+            'delivered': len(latencies)}
+
+
+def compare_sender(duration: float = 5.0, fps_values: List[float] = (10, 30)):
+    """Sender por sondeo de data_queue frente a LatestValue: CPU en reposo y espera añadida"""
+    print(f"\n📊 Sender de WebSocket (límite de 20 Hz, {duration:.0f}s por caso)")
+    print(f"{'productor':>10} {'modo':>8} {'CPU %':>7} {'despertares/s':>14} {'espera p50 ms':>14} "
+          f"{'espera p95 ms':>14} {'entregados':>11}")
+    for fps in [0.0] + list(fps_values):
+        for mode in ('polling', 'event'):
+            r = _run_sender(mode, duration, fps)
+            label = 'inactivo' if fps == 0 else f"{fps:.0f} fps"
+            print(f"{label:>10} {mode:>8} {r['cpu_pct']:>7.2f} {r['wakeups_s']:>14.1f} {r['p50']:>14.2f} "
+                  f"{r['p95']:>14.2f} {r['delivered']:>11}")
+    print("espera = desde que el hilo de cámara entrega el dato hasta que el sender lo toma")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del Monitor Visual 3D")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    modes_parser = subparsers.add_parser('modes', help="Hilos vs procesos para los detectores")
+    modes_parser.add_argument('--duration', type=float, default=20.0)
+    modes_parser.add_argument('--fps', type=float, default=60.0)
+
+    parity_parser = subparsers.add_parser('parity', help="Mismas cajas en modo hilos y procesos")
+    parity_parser.add_argument('--source', default='synthetic:640x480')
+    parity_parser.add_argument('--frames', type=int, default=20)
+
+    protocol_parser = subparsers.add_parser('protocol', help="JSON vs binario con deltas")
+    protocol_parser.add_argument('--messages', type=int, default=2000)
+
+    broadcast_parser = subparsers.add_parser('broadcast', help="Tiempo de broadcast de 1 a N clientes")
+    broadcast_parser.add_argument('--clients', type=int, nargs='+', default=[1, 10, 50, 100, 200])
+    broadcast_parser.add_argument('--ticks', type=int, default=40)
+
+    pipeline_parser = subparsers.add_parser('pipeline', help="Pipeline completo sin ventana sobre una fuente")
+    pipeline_parser.add_argument('--source', default='synthetic',
+                                 help="Video, carpeta de imágenes, índice de cámara o 'synthetic[:AnchoxAlto]'")
+    pipeline_parser.add_argument('--frames', type=int, default=300)
+    pipeline_parser.add_argument('--realtime', action='store_true', help="Respetar los fps de la fuente")
+    pipeline_parser.add_argument('--mode', choices=['threads', 'processes'], default='threads')
+    pipeline_parser.add_argument('--scheduler', choices=['fixed', 'adaptive'], default='fixed')
+    pipeline_parser.add_argument('--budget-ms', type=float, default=25.0)
+    pipeline_parser.add_argument('--cascade', action='store_true', help="MediaPipe solo sobre personas de YOLO")
+
+    batch_parser = subparsers.add_parser('yolo-batch', help="YOLO uno a uno vs por lotes para N cámaras")
+    batch_parser.add_argument('--cameras', type=int, nargs='+', default=[1, 2, 4, 8])
+    batch_parser.add_argument('--rounds', type=int, default=30)
+
+    colors_parser = subparsers.add_parser('colors', help="Coste y estabilidad de los colores dominantes")
+    colors_parser.add_argument('--frames', type=int, default=300)
+    colors_parser.add_argument('--source', default='synthetic')
+
+    tracking_parser = subparsers.add_parser('tracking', help="Error de posición con y sin seguimiento")
+    tracking_parser.add_argument('--intervals', type=int, nargs='+', default=[3, 6, 10])
+    tracking_parser.add_argument('--lag', type=int, default=2)
+    tracking_parser.add_argument('--frames', type=int, default=300)
+
+    post_parser = subparsers.add_parser('yolo-post', help="Post-procesado de YOLO por caja vs vectorizado")
+    post_parser.add_argument('--boxes', type=int, nargs='+', default=[5, 20, 100])
+    post_parser.add_argument('--rounds', type=int, default=2000)
+
+    grabber_parser = subparsers.add_parser('grabber', help="Edad del frame con cap.read() en línea vs FrameGrabber")
+    grabber_parser.add_argument('--work-ms', type=float, nargs='+', default=[20, 50, 100])
+    grabber_parser.add_argument('--duration', type=float, default=5.0)
+
+    recorder_parser = subparsers.add_parser('recorder', help="Grabación JSON Lines en línea vs bloques .npz")
+    recorder_parser.add_argument('--frames', type=int, default=20000)
+
+    sender_parser = subparsers.add_parser('sender', help="Sender por sondeo vs LatestValue: CPU y espera")
+    sender_parser.add_argument('--duration', type=float, default=5.0)
+    sender_parser.add_argument('--fps', type=float, nargs='+', default=[10, 30])
+
+    startup_parser = subparsers.add_parser('startup', help="Tiempo hasta el primer frame y el primer resultado completo")
+    startup_parser.add_argument('--source', default='synthetic')
+    startup_parser.add_argument('--mode', choices=['threads', 'processes'], default='threads')
+
+    args = parser.parse_args()
+    if args.command == 'modes':
+        compare_execution_modes(args.duration, args.fps)
+    elif args.command == 'parity':
+        compare_mode_boxes(args.source, args.frames)
+    elif args.command == 'protocol':
+        compare_protocols(args.messages)
+    elif args.command == 'broadcast':
+        compare_broadcast(args.clients, args.ticks)
+    elif args.command == 'pipeline':
+        run_pipeline(args.source, args.frames, args.realtime, args.mode, args.scheduler, args.budget_ms,
+                     args.cascade)
+    elif args.command == 'yolo-batch':
+        compare_yolo_batches(args.cameras, args.rounds)
+    elif args.command == 'colors':
+        compare_color_models(args.frames, args.source)
+    elif args.command == 'tracking':
+        compare_tracking(args.intervals, args.lag, args.frames)
+    elif args.command == 'yolo-post':
+        compare_yolo_postprocess(args.boxes, args.rounds)
+    elif args.command == 'grabber':
+        compare_grabber(args.work_ms, args.duration)
+    elif args.command == 'recorder':
+        compare_recorder(args.frames)
+    elif args.command == 'sender':
+        compare_sender(args.duration, args.fps)
+    elif args.command == 'startup':
+        compare_startup(args.source, args.mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Difusión a clientes WebSocket con contrapresión por cliente
+
+El payload se serializa una sola vez por formato y se deja en una cola
+acotada de cada cliente (si se llena se descarta el más antiguo). Cada
+cliente tiene su propia tarea de envío, así que un navegador lento no
+retrasa a los demás. Los clientes lentos se degradan a una frecuencia
+menor y se recuperan cuando vuelven a ir bien.
+
+Con varias cámaras la frecuencia se controla por cliente y cámara, y cada
+cámara tiene su propio codificador binario.
+
+Cada cliente puede suscribirse a una parte de los temas y pedir una
+frecuencia menor:
+    {"type": "subscribe", "fields": ["detections", "colors"], "rate": 10}
+Quien no se suscribe recibe todos los temas a la frecuencia base. El
+payload se serializa una vez por formato y combinación de temas.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+import websockets
+
+from protocol import BinaryDeltaEncoder, fields_for_topics
+
+# Temas de suscripción: detector que los produce y claves del JSON comprimido
+TOPICS = {
+    'detections': ('yolo', ('people_count', 'objects_count', 'detections')),
+    'pose': ('pose', ('pose_detected', 'pose_landmarks')),
+    'hands': ('hands', ('hands_count', 'hand_gestures')),
+    'faces': ('faces', ('faces_count',)),
+    'colors': ('colors', ('dominant_colors',))
+}
+ALL_TOPICS = frozenset(TOPICS)
+# Claves del JSON que reciben todos los clientes
+BASE_KEYS = ('timestamp', 'camera_id', 'frame_size', 'movement_intensity', 'warming')
+
+
+def parse_subscription(message: Dict) -> Tuple[FrozenSet[str], Optional[float]]:
+    """Valida un mensaje 'subscribe'; devuelve (temas, frecuencia en Hz o None)"""
+    fields = message.get('fields', sorted(ALL_TOPICS))
+    if isinstance(fields, str):
+        fields = [fields]
+    unknown = [field for field in fields if field not in TOPICS]
+    if unknown:
+        raise ValueError(f"Temas desconocidos: {unknown} (válidos: {sorted(TOPICS)})")
+    rate = message.get('rate')
+    if rate is not None:
+        rate = float(rate)
+        if rate <= 0:
+            raise ValueError(f"Frecuencia no válida: {rate}")
+    return frozenset(fields), rate
+
+
+def filter_topics(data: Dict, topics: FrozenSet[str]) -> Dict:
+    """Copia del dict comprimido con solo las claves base y las de los temas suscritos"""
+    keys = set(BASE_KEYS)
+    for topic in topics:
+        keys.update(TOPICS[topic][1])
+    return {key: value for key, value in data.items() if key in keys}
+
+
+class ClientSession:
+    def __init__(self, websocket, protocol: str = 'json', queue_size: int = 4,
+                 base_interval: float = 0.050, max_interval: float = 1.0,
+                 slow_latency: float = 0.100, pipeline_metrics=None):
+        """
+        Estado de envío de un cliente
+
+        Args:
+            websocket: Conexión del cliente
+            protocol: 'json' o 'binary'
+            queue_size: Mensajes pendientes como máximo (se descarta el más antiguo)
+            base_interval: Intervalo mínimo entre mensajes (20 Hz por defecto)
+            max_interval: Intervalo máximo al degradar un cliente lento
+            slow_latency: Latencia de envío (s) a partir de la cual el cliente es lento
+            pipeline_metrics: PipelineMetrics opcional donde registrar la etapa 'send'
+        """
+        self.websocket = websocket
+        self.protocol = protocol
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.slow_latency = slow_latency
+        self.min_interval = base_interval
+        self.pipeline_metrics = pipeline_metrics
+        self.topics: FrozenSet[str] = ALL_TOPICS
+        self.subscribed = False  # False: recibe todo (cliente sin mensaje 'subscribe')
+
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_enqueue: Dict[Optional[int], float] = {}  # Por cámara
+        self._healthy_sends = 0
+        self._drops_at_last_check = 0
+        self.sent_keyframes: Dict[Optional[int], int] = {}  # Keyframe binario que ya tiene el cliente, por cámara
+        self.closed = False
+
+        self.metrics = {
+            'sent': 0,
+            'dropped': 0,
+            'queue_depth': 0,
+            'send_latency_ms': 0.0,      # Media móvil
+            'max_send_latency_ms': 0.0,
+            'rate_hz': 1.0 / base_interval if base_interval > 0 else 0.0,
+            'downgrades': 0
+        }
+
+    def subscribe(self, topics: FrozenSet[str], interval: float):
+        """Cambia los temas y el intervalo base del cliente; en binario empezará por un keyframe"""
+        self.topics = topics
+        self.subscribed = True
+        self.base_interval = interval
+        self.min_interval = interval
+        self._healthy_sends = 0
+        self.sent_keyframes.clear()
+        self.metrics['rate_hz'] = 1.0 / interval if interval > 0 else 0.0
+
+    def start(self):
+        self._task = asyncio.create_task(self._sender())
+
+    async def close(self):
+        self.closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def is_due(self, now: float, camera_id: Optional[int] = None) -> bool:
+        """True si el cliente acepta un mensaje nuevo de la cámara según su frecuencia actual"""
+        # Tolerancia del 10% para no perder ticks por jitter del bucle de envío
+        return not self.closed and now - self._last_enqueue.get(camera_id, 0.0) >= self.min_interval * 0.9
+
+    def enqueue(self, message, now: float, camera_id: Optional[int] = None):
+        """Deja un mensaje en la cola sin bloquear (descarta el más antiguo si está llena)"""
+        if len(self.queue) >= self.queue_size:
+            self.queue.popleft()
+            self.metrics['dropped'] += 1
+            # El keyframe pudo perderse: reenviarlo antes del siguiente delta
+            self.sent_keyframes.clear()
+        self.queue.append(message)
+        self._last_enqueue[camera_id] = now
+        self.metrics['queue_depth'] = len(self.queue)
+        self._wakeup.set()
+
+    async def _sender(self):
+        """Tarea de envío del cliente: despierta solo cuando hay mensajes"""
+        while not self.closed:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self.queue:
+                message = self.queue.popleft()
+                self.metrics['queue_depth'] = len(self.queue)
+                start = time.perf_counter()
+                try:
+                    await self.websocket.send(message)
+                except websockets.exceptions.ConnectionClosed:
+                    self.closed = True
+                    return
+                except Exception as e:
+                    print(f"⚠️  Error enviando a cliente: {e}")
+                    self.closed = True
+                    return
+                self._record_send(time.perf_counter() - start)
+
+    def _record_send(self, latency: float):
+        """Actualiza métricas y adapta la frecuencia del cliente"""
+        metrics = self.metrics
+        metrics['sent'] += 1
+        if self.pipeline_metrics is not None:
+            self.pipeline_metrics.record('send', latency)
+        latency_ms = latency * 1000
+        metrics['send_latency_ms'] += 0.2 * (latency_ms - metrics['send_latency_ms'])
+        metrics['max_send_latency_ms'] = max(metrics['max_send_latency_ms'], latency_ms)
+
+        new_drops = metrics['dropped'] - self._drops_at_last_check
+        self._drops_at_last_check = metrics['dropped']
+        if new_drops > 0 or metrics['send_latency_ms'] > self.slow_latency * 1000:
+            # Cliente lento: reducir a la mitad su frecuencia
+            if self.min_interval < self.max_interval:
+                self.min_interval = min(self.max_interval, max(self.min_interval, 0.001) * 2)
+                metrics['downgrades'] += 1
+            self._healthy_sends = 0
+        else:
+            self._healthy_sends += 1
+            # Recuperar frecuencia tras una racha de envíos rápidos
+            if self._healthy_sends >= 20 and self.min_interval > self.base_interval:
+                self.min_interval = max(self.base_interval, self.min_interval / 2)
+                self._healthy_sends = 0
+        metrics['rate_hz'] = 1.0 / self.min_interval if self.min_interval > 0 else 0.0
+
+
+class ClientBroadcaster:
+    def __init__(self, base_interval: float = 0.050, queue_size: int = 4, keyframe_interval: int = 40,
+                 metrics=None):
+        """
+        Registro de clientes y difusión con serialización única
+
+        Args:
+            base_interval: Intervalo mínimo entre mensajes por cliente
+            queue_size: Tamaño de la cola de envío de cada cliente
+            keyframe_interval: Mensajes entre keyframes del protocolo binario
+            metrics: PipelineMetrics opcional para la latencia de envío
+        """
+        self.base_interval = base_interval
+        self.queue_size = queue_size
+        self.pipeline_metrics = metrics
+        self.sessions: Dict[object, ClientSession] = {}
+        self.keyframe_interval = keyframe_interval
+        # Un codificador por cámara y combinación de temas
+        self.binary_encoders: Dict[Tuple[Optional[int], FrozenSet[str]], BinaryDeltaEncoder] = {}
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def add(self, websocket, protocol: str = 'json') -> ClientSession:
+        session = ClientSession(websocket, protocol, self.queue_size, self.base_interval,
+                                pipeline_metrics=self.pipeline_metrics)
+        self.sessions[websocket] = session
+        session.start()
+        return session
+
+    def set_protocol(self, websocket, protocol: str):
+        """Cambia el formato de un cliente; en binario empezará por un keyframe"""
+        session = self.sessions.get(websocket)
+        if session is not None:
+            session.protocol = protocol
+            session.sent_keyframes.clear()
+
+    def subscribe(self, websocket, topics: FrozenSet[str], rate: Optional[float] = None) -> Optional[ClientSession]:
+        """Aplica una suscripción; la frecuencia no supera la base del servidor"""
+        session = self.sessions.get(websocket)
+        if session is not None:
+            interval = self.base_interval if rate is None else max(self.base_interval, 1.0 / rate)
+            session.subscribe(topics, interval)
+        return session
+
+    def required_detectors(self) -> Optional[Set[str]]:
+        """Detectores que algún cliente necesita, o None si no hay clientes"""
+        if not self.sessions:
+            return None
+        topics = set()
+        for session in self.sessions.values():
+            topics.update(session.topics)
+        return {TOPICS[topic][0] for topic in topics}
+
+    async def remove(self, websocket) -> Optional[ClientSession]:
+        session = self.sessions.pop(websocket, None)
+        if session is not None:
+            await session.close()
+        return session
+
+    def broadcast(self, data: Dict) -> int:
+        """Serializa una vez por formato y encola a los clientes que tocan; devuelve cuántos"""
+        now = time.time()
+        camera_id = data.get('camera_id')
+        due = [session for session in self.sessions.values() if session.is_due(now, camera_id)]
+        if not due:
+            return 0
+
+        # Un mensaje por formato y combinación de temas, serializado una sola vez
+        json_messages: Dict[FrozenSet[str], str] = {}
+        binary_messages: Dict[FrozenSet[str], bytes] = {}
+        for session in due:
+            topics = session.topics
+            if session.protocol == 'binary':
+                encoder = self.binary_encoders.get((camera_id, topics))
+                if encoder is None:
+                    fields = None if topics == ALL_TOPICS else fields_for_topics(topics)
+                    encoder = BinaryDeltaEncoder(keyframe_interval=self.keyframe_interval, fields=fields)
+                    self.binary_encoders[(camera_id, topics)] = encoder
+                if topics not in binary_messages:
+                    binary_messages[topics] = encoder.encode(data)
+                # Un cliente sin el keyframe actual lo recibe antes que el delta
+                if session.sent_keyframes.get(camera_id) != encoder.keyframe_seq:
+                    if not encoder.last_was_keyframe:
+                        session.enqueue(encoder.last_keyframe_message, now, camera_id)
+                    session.sent_keyframes[camera_id] = encoder.keyframe_seq
+                session.enqueue(binary_messages[topics], now, camera_id)
+            else:
+                if topics not in json_messages:
+                    payload = data if topics == ALL_TOPICS else filter_topics(data, topics)
+                    json_messages[topics] = json.dumps(payload, default=str)
+                session.enqueue(json_messages[topics], now, camera_id)
+        return len(due)
+
+    def metrics(self) -> List[Dict]:
+        """Métricas por cliente: profundidad de cola, descartes y latencia de envío"""
+        return [
+            {'client': str(session.websocket.remote_address), 'protocol': session.protocol,
+             'topics': sorted(session.topics), **session.metrics}
+            for session in self.sessions.values()
+        ]
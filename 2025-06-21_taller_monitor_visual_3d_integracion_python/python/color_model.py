@@ -0,0 +1,138 @@
+"""
+Colores dominantes incrementales para el Monitor Visual 3D
+
+En lugar de lanzar k-means desde centros aleatorios cada N frames, el modelo
+conserva sus centros y los actualiza en cada frame con un paso de k-means
+online: asigna los píxeles de una miniatura al centro más cercano y mueve
+cada centro una fracción hacia la media de sus píxeles. El peso de cada
+color decae exponencialmente, y el orden de la paleta solo cambia cuando un
+color supera claramente a otro. Así la paleta es estable y cada
+actualización cuesta una fracción de cv2.kmeans.
+"""
+
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class IncrementalColorModel:
+    def __init__(self, k: int = 3, size: Tuple[int, int] = (32, 24), learning_rate: float = 0.1,
+                 min_weight: float = 0.02, order_hysteresis: float = 0.05, seed: int = 0):
+        """
+        Args:
+            k: Número de colores de la paleta
+            size: Miniatura (ancho, alto) sobre la que se actualiza el modelo
+            learning_rate: Fracción que se mueve cada centro y decae cada peso por frame
+            min_weight: Peso por debajo del cual un color se reinicia en el píxel peor representado
+            order_hysteresis: Ventaja de peso necesaria para que un color adelante a otro en la paleta
+            seed: Semilla del generador propio que elige los centros iniciales
+        """
+        self.k = k
+        self.size = size
+        self.learning_rate = learning_rate
+        self.min_weight = min_weight
+        self.order_hysteresis = order_hysteresis
+        self.seed = seed
+
+        self.centers: Optional[np.ndarray] = None   # k × 3, BGR float32
+        self.weights = np.full(k, 1.0 / k, dtype=np.float32)
+        self.order = list(range(k))
+        self.updates = 0
+
+    def _pixels(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_LINEAR)
+        return small.reshape(-1, 3).astype(np.float32)
+
+    @staticmethod
+    def _distances(pixels: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        """|p - c|² sin el término |p|², constante por píxel (basta para el argmin)"""
+        return (centers ** 2).sum(axis=1) - 2 * pixels @ centers.T
+
+    def _initialize(self, pixels: np.ndarray, iterations: int = 10):
+        """
+        Primer frame: k-means completo con centros k-means++ elegidos por un
+        generador propio, sin cambiar la semilla global de OpenCV
+        """
+        rng = np.random.default_rng(self.seed)
+        centers = pixels[[rng.integers(len(pixels))]]
+        for _ in range(1, self.k):
+            nearest = (self._distances(pixels, centers) + (pixels ** 2).sum(axis=1, keepdims=True)).min(axis=1)
+            nearest = np.maximum(nearest, 0.0)
+            total = nearest.sum()
+            index = rng.choice(len(pixels), p=nearest / total) if total > 0 else rng.integers(len(pixels))
+            centers = np.vstack([centers, pixels[index]])
+
+        # Iteraciones de Lloyd hasta que los centros se mueven menos de un nivel de color
+        for _ in range(iterations):
+            labels = self._distances(pixels, centers).argmin(axis=1)
+            counts = np.bincount(labels, minlength=self.k)
+            present = counts > 0
+            sums = np.stack([np.bincount(labels, weights=pixels[:, c], minlength=self.k) for c in range(3)], axis=1)
+            moved = centers.copy()
+            moved[present] = sums[present] / counts[present, None]
+            converged = np.abs(moved - centers).max() < 1.0
+            centers = moved
+            if converged:
+                break
+
+        labels = self._distances(pixels, centers).argmin(axis=1)
+        self.centers = centers.astype(np.float32)
+        counts = np.bincount(labels, minlength=self.k)
+        self.weights = (counts / len(pixels)).astype(np.float32)
+        self.order = list(np.argsort(-self.weights))
+
+    def update(self, frame: np.ndarray) -> List[List[int]]:
+        """Actualiza el modelo con un frame BGR y devuelve la paleta RGB ordenada por peso"""
+        pixels = self._pixels(frame)
+        self.updates += 1
+        if self.centers is None:
+            self._initialize(pixels)
+            return self.palette()
+
+        # Asignación al centro más cercano
+        distances = self._distances(pixels, self.centers)
+        labels = distances.argmin(axis=1)
+        counts = np.bincount(labels, minlength=self.k).astype(np.float32)
+
+        # Paso de k-means online hacia la media de cada grupo
+        rate = self.learning_rate
+        present = counts > 0
+        if present.any():
+            sums = np.stack([np.bincount(labels, weights=pixels[:, c], minlength=self.k) for c in range(3)], axis=1)
+            means = sums[present] / counts[present, None]
+            self.centers[present] += rate * (means - self.centers[present])
+        self.weights = (1 - rate) * self.weights + rate * counts / len(pixels)
+
+        # Un color sin píxeles durante muchos frames pasa a cubrir el píxel peor representado
+        dead = np.flatnonzero(self.weights < self.min_weight)
+        if dead.size:
+            worst = pixels[(distances.min(axis=1) + (pixels ** 2).sum(axis=1)).argmax()]
+            self.centers[dead[0]] = worst
+            self.weights[dead[0]] = self.min_weight * 2
+
+        self._update_order()
+        return self.palette()
+
+    def _update_order(self):
+        """Ordena por peso con histéresis para que la paleta no parpadee"""
+        order = self.order
+        changed = True
+        while changed:
+            changed = False
+            for i in range(len(order) - 1):
+                if self.weights[order[i + 1]] > self.weights[order[i]] + self.order_hysteresis:
+                    order[i], order[i + 1] = order[i + 1], order[i]
+                    changed = True
+
+    def palette(self) -> List[List[int]]:
+        """Colores RGB enteros, el más frecuente primero"""
+        if self.centers is None:
+            return [[128, 128, 128]] * self.k
+        return [[int(self.centers[i][2]), int(self.centers[i][1]), int(self.centers[i][0])]
+                for i in self.order]  # BGR a RGB
+
+    def reset(self):
+        self.centers = None
+        self.weights = np.full(self.k, 1.0 / self.k, dtype=np.float32)
+        self.order = list(range(self.k))
@@ -0,0 +1,502 @@
+"""
+Workers persistentes para los detectores del Monitor Visual 3D
+
+Cada detector (YOLO, pose, manos, caras) vive en su propio hilo de larga
+duración. El hilo de cámara deja el frame más reciente en un buzón de un
+solo elemento y nunca espera: si el detector sigue ocupado, el frame
+pendiente se reemplaza y se cuenta como descartado. Los resultados se
+publican en una ranura versionada que se consulta sin bloquear.
+
+Con varias cámaras, un detector pesado (YOLO) puede compartirse con un
+BatchedDetectorWorker: un solo hilo y un solo modelo reciben el último frame
+de cada cámara y los infieren como un lote. CameraDetectorPool ofrece a cada
+cámara la misma interfaz que DetectorPool.
+
+Los modelos se cargan de forma perezosa dentro del hilo de cada worker, así
+que varios modelos cargan en paralelo y solo cuando hacen falta. Un worker
+con `load_fn` empieza en estado 'unloaded'. Pasa a 'warming' con el primer
+frame que recibe (o con `load`): carga el modelo y hace una inferencia de
+calentamiento sobre un frame negro. Después queda en 'ready' y procesa el
+frame pendiente.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class DetectorResult(NamedTuple):
+    """Resultado publicado por un worker"""
+    version: int        # Se incrementa con cada resultado nuevo
+    frame_id: int       # Frame sobre el que se calculó
+    data: Dict          # Salida del detector
+    latency: float      # Segundos de inferencia
+
+
+# Estados de un worker
+UNLOADED = 'unloaded'   # Modelo sin cargar (nadie lo ha pedido todavía)
+WARMING = 'warming'     # Cargando el modelo o haciendo la inferencia de calentamiento
+READY = 'ready'
+FAILED = 'failed'       # La carga falló: el worker ya no acepta frames
+
+DEFAULT_WARMUP_SHAPE = (240, 320, 3)
+
+
+class DetectorWorker:
+    def __init__(self, name: str, detect_fn: Callable[[np.ndarray], Dict],
+                 load_fn: Optional[Callable[[], None]] = None):
+        """
+        Crea un worker persistente para un detector
+
+        Args:
+            name: Nombre del detector ('yolo', 'pose', ...)
+            detect_fn: Función que recibe un frame BGR y devuelve un dict
+            load_fn: Carga el modelo en el hilo del worker la primera vez que se
+                necesita (None = el modelo ya está cargado)
+        """
+        self.name = name
+        self.detect_fn = detect_fn
+        self.load_fn = load_fn
+        self.state = UNLOADED if load_fn is not None else READY
+        self._warmup_shape = DEFAULT_WARMUP_SHAPE
+
+        # Buzón de último frame (un solo elemento)
+        self._condition = threading.Condition()
+        self._pending_frame: Optional[np.ndarray] = None
+        self._pending_id = 0
+        self._busy = False
+        self._running = False
+
+        # Ranura de resultado versionada
+        self._result: Optional[DetectorResult] = None
+        self._latest_submitted_id = 0
+
+        # Contadores para saber cuánto se retrasa cada detector
+        self.stats = {
+            'submitted': 0,   # Frames entregados al buzón
+            'processed': 0,   # Inferencias completadas
+            'dropped': 0,     # Frames reemplazados antes de procesarse
+            'stale': 0,       # Resultados que llegaron con un frame más nuevo esperando
+            'errors': 0,
+            'last_latency': 0.0,
+            'frame_lag': 0,   # Frames entre el último enviado y el último resultado
+            'load_time': 0.0,     # Segundos cargando el modelo
+            'warmup_time': 0.0    # Segundos de la inferencia de calentamiento
+        }
+
+        self._thread = threading.Thread(target=self._run, name=f"detector-{name}", daemon=True)
+
+    def start(self):
+        """Arranca el hilo del worker"""
+        self._running = True
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        """Detiene el worker y espera a que termine la inferencia en curso"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout=timeout)
+
+    @property
+    def busy(self) -> bool:
+        """True si hay una inferencia en curso, un frame esperando o el modelo no está listo"""
+        return self._busy or self._pending_frame is not None or self.state in (WARMING, FAILED)
+
+    def load(self, frame_shape: Tuple[int, ...] = DEFAULT_WARMUP_SHAPE):
+        """Empieza a cargar el modelo en el hilo del worker sin esperar a un frame"""
+        with self._condition:
+            if self.state == UNLOADED:
+                self.state = WARMING
+                self._warmup_shape = tuple(frame_shape)
+                self._condition.notify()
+
+    def submit(self, frame: np.ndarray, frame_id: int):
+        """Deja un frame en el buzón sin bloquear (reemplaza el pendiente)"""
+        with self._condition:
+            if self.state == FAILED:
+                return
+            if self.state == UNLOADED:
+                # Primer uso: cargar y calentar con un frame del mismo tamaño
+                self.state = WARMING
+                self._warmup_shape = frame.shape
+            if self._pending_frame is not None:
+                self.stats['dropped'] += 1
+            self._pending_frame = frame
+            self._pending_id = frame_id
+            self._latest_submitted_id = frame_id
+            self.stats['submitted'] += 1
+            self._condition.notify()
+
+    def result(self) -> Optional[DetectorResult]:
+        """Devuelve el último resultado publicado (o None si aún no hay)"""
+        return self._result
+
+    def _warm_up(self):
+        """Carga el modelo y hace una inferencia de calentamiento (hilo del worker)"""
+        start = time.perf_counter()
+        try:
+            self.load_fn()
+            loaded = time.perf_counter()
+            self.detect_fn(np.zeros(self._warmup_shape, dtype=np.uint8))
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"❌ No se pudo cargar el detector {self.name}: {e}")
+            with self._condition:
+                self.state = FAILED
+                self._pending_frame = None
+            return
+        self.stats['load_time'] = loaded - start
+        self.stats['warmup_time'] = time.perf_counter() - loaded
+        with self._condition:
+            self.state = READY
+        print(f"🔥 Detector {self.name} listo: carga {self.stats['load_time']:.2f}s, "
+              f"calentamiento {self.stats['warmup_time'] * 1000:.0f}ms")
+
+    def _run(self):
+        """Bucle del worker: carga el modelo cuando se pide, espera frame, detecta y publica"""
+        while True:
+            with self._condition:
+                while self._running and self._pending_frame is None and self.state != WARMING:
+                    self._condition.wait()
+                if not self._running:
+                    break
+                warming = self.state == WARMING
+            if warming:
+                self._warm_up()
+                continue
+
+            with self._condition:
+                if self._pending_frame is None:
+                    continue
+                frame = self._pending_frame
+                frame_id = self._pending_id
+                self._pending_frame = None
+                self._busy = True
+
+            start = time.perf_counter()
+            try:
+                data = self.detect_fn(frame)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"❌ Error en worker {self.name}: {e}")
+                self._busy = False
+                continue
+            latency = time.perf_counter() - start
+
+            with self._condition:
+                version = self._result.version + 1 if self._result else 1
+                self._result = DetectorResult(version, frame_id, data, latency)
+                self._busy = False
+                self.stats['processed'] += 1
+                self.stats['last_latency'] = latency
+                self.stats['frame_lag'] = self._latest_submitted_id - frame_id
+                if self._pending_frame is not None:
+                    self.stats['stale'] += 1
+
+
+class DetectorPool:
+    def __init__(self, detectors: Dict[str, Callable[[np.ndarray], Dict]],
+                 loaders: Optional[Dict[str, Callable[[], None]]] = None):
+        """
+        Agrupa un worker persistente por detector
+
+        Args:
+            detectors: Diccionario nombre -> función de detección
+            loaders: Diccionario nombre -> función que carga su modelo (carga perezosa);
+                los detectores sin loader se consideran listos
+        """
+        loaders = loaders or {}
+        self.workers = {name: DetectorWorker(name, fn, loaders.get(name)) for name, fn in detectors.items()}
+        self._seen_versions = {name: 0 for name in detectors}
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.workers.keys())
+
+    def start(self):
+        for worker in self.workers.values():
+            worker.start()
+        print(f"🧵 Workers de detección activos: {', '.join(self.workers)}")
+
+    def stop(self):
+        for worker in self.workers.values():
+            worker.stop()
+
+    def load(self, names: Optional[List[str]] = None):
+        """Empieza a cargar en paralelo los modelos indicados (None = todos)"""
+        for name in self.workers if names is None else names:
+            self.workers[name].load()
+
+    def wait_ready(self, timeout: float = 120.0) -> bool:
+        """Carga todos los modelos y espera a que terminen su calentamiento"""
+        self.load()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            states = self.states().values()
+            if all(state in (READY, FAILED) for state in states):
+                return all(state == READY for state in states)
+            time.sleep(0.05)
+        return False
+
+    def states(self) -> Dict[str, str]:
+        """Estado de cada detector ('unloaded', 'warming', 'ready' o 'failed')"""
+        return {name: worker.state for name, worker in self.workers.items()}
+
+    def is_busy(self, name: str) -> bool:
+        return self.workers[name].busy
+
+    def submit(self, names: List[str], frame: np.ndarray, frame_id: int):
+        """Entrega el mismo frame a los detectores indicados sin bloquear"""
+        for name in names:
+            self.workers[name].submit(frame, frame_id)
+
+    def collect(self) -> Dict[str, DetectorResult]:
+        """Devuelve solo los resultados nuevos desde la última llamada"""
+        new_results = {}
+        for name, worker in self.workers.items():
+            result = worker.result()
+            if result is not None and result.version > self._seen_versions[name]:
+                self._seen_versions[name] = result.version
+                new_results[name] = result
+        return new_results
+
+    def get_stats(self, current_frame_id: Optional[int] = None) -> Dict[str, Dict]:
+        """Copia de los contadores de cada worker"""
+        stats = {}
+        for name, worker in self.workers.items():
+            worker_stats = dict(worker.stats)
+            worker_stats['state'] = worker.state
+            result = worker.result()
+            if current_frame_id is not None and result is not None:
+                worker_stats['frame_lag'] = current_frame_id - result.frame_id
+            stats[name] = worker_stats
+        return stats
+
+    def print_stats(self, current_frame_id: Optional[int] = None):
+        """Imprime un resumen de los contadores por detector"""
+        for name, s in self.get_stats(current_frame_id).items():
+            print(f"   {name:>6}: procesados={s['processed']} descartados={s['dropped']} "
+                  f"obsoletos={s['stale']} retraso={s['frame_lag']} frames "
+                  f"latencia={s['last_latency'] * 1000:.1f}ms")
+
+
+class BatchedDetectorWorker:
+    def __init__(self, name: str, batch_fn: Callable[[List[np.ndarray]], List[Dict]],
+                 max_batch: int = 8, gather_timeout: float = 0.005):
+        """
+        Worker compartido por varias cámaras que infiere sus frames en lote
+
+        Args:
+            name: Nombre del detector ('yolo')
+            batch_fn: Función que recibe una lista de frames BGR y devuelve un dict por frame
+            max_batch: Frames por lote como máximo
+            gather_timeout: Segundos que se espera al resto de cámaras para completar el lote
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.gather_timeout = gather_timeout
+
+        # Buzón de último frame por cámara
+        self._condition = threading.Condition()
+        self._pending: Dict[Hashable, Tuple[np.ndarray, int]] = {}
+        self._in_flight = set()
+        self._running = False
+
+        # Ranura de resultado versionada por cámara
+        self._results: Dict[Hashable, DetectorResult] = {}
+        self._latest_submitted: Dict[Hashable, int] = {}
+
+        self.camera_stats: Dict[Hashable, Dict] = {}
+        self.stats = {
+            'batches': 0,
+            'frames': 0,
+            'errors': 0,
+            'last_batch_size': 0,
+            'last_latency': 0.0
+        }
+
+        self._thread = threading.Thread(target=self._run, name=f"detector-{name}-batch", daemon=True)
+
+    def register(self, camera_id: Hashable):
+        """Da de alta una cámara (el tamaño de lote esperado es el número de cámaras)"""
+        self.camera_stats[camera_id] = {
+            'submitted': 0, 'processed': 0, 'dropped': 0, 'stale': 0, 'errors': 0,
+            'last_latency': 0.0, 'frame_lag': 0
+        }
+
+    def start(self):
+        self._running = True
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join(timeout=timeout)
+
+    def busy(self, camera_id: Hashable) -> bool:
+        """True si la cámara tiene un frame esperando o dentro del lote en curso"""
+        return camera_id in self._pending or camera_id in self._in_flight
+
+    def submit(self, camera_id: Hashable, frame: np.ndarray, frame_id: int):
+        """Deja el frame de una cámara en su buzón sin bloquear (reemplaza el pendiente)"""
+        with self._condition:
+            stats = self.camera_stats[camera_id]
+            if camera_id in self._pending:
+                stats['dropped'] += 1
+            self._pending[camera_id] = (frame, frame_id)
+            self._latest_submitted[camera_id] = frame_id
+            stats['submitted'] += 1
+            self._condition.notify_all()  # El worker y quien espere en wait_result comparten la condición
+
+    def result(self, camera_id: Hashable) -> Optional[DetectorResult]:
+        return self._results.get(camera_id)
+
+    def wait_result(self, camera_id: Hashable, after_version: int = 0,
+                    timeout: Optional[float] = None) -> Optional[DetectorResult]:
+        """Espera un resultado de la cámara más nuevo que `after_version`
+
+        Devuelve None si vence `timeout` o si el frame de la cámara salió del
+        lote sin resultado (error del detector).
+        """
+        def ready():
+            result = self._results.get(camera_id)
+            newer = result is not None and result.version > after_version
+            return newer or not self.busy(camera_id) or not self._running
+
+        with self._condition:
+            self._condition.wait_for(ready, timeout=timeout)
+            result = self._results.get(camera_id)
+        return result if result is not None and result.version > after_version else None
+
+    def _batch_ready(self) -> bool:
+        return not self._running or len(self._pending) >= min(len(self.camera_stats), self.max_batch)
+
+    def _run(self):
+        """Bucle del worker: junta los frames pendientes, infiere el lote y reparte por cámara"""
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                # Dar un margen corto a las demás cámaras para llenar el lote
+                self._condition.wait_for(self._batch_ready, timeout=self.gather_timeout)
+                if not self._running:
+                    break
+                batch = list(self._pending.items())[:self.max_batch]
+                for camera_id, _ in batch:
+                    del self._pending[camera_id]
+                self._in_flight = {camera_id for camera_id, _ in batch}
+
+            start = time.perf_counter()
+            try:
+                outputs = self.batch_fn([frame for _, (frame, _) in batch])
+            except Exception as e:
+                self.stats['errors'] += 1
+                for camera_id, _ in batch:
+                    self.camera_stats[camera_id]['errors'] += 1
+                print(f"❌ Error en worker {self.name} (lote de {len(batch)}): {e}")
+                with self._condition:
+                    self._in_flight = set()
+                    self._condition.notify_all()
+                continue
+            latency = time.perf_counter() - start
+
+            with self._condition:
+                for (camera_id, (_, frame_id)), data in zip(batch, outputs):
+                    previous = self._results.get(camera_id)
+                    version = previous.version + 1 if previous else 1
+                    self._results[camera_id] = DetectorResult(version, frame_id, data, latency)
+                    stats = self.camera_stats[camera_id]
+                    stats['processed'] += 1
+                    stats['last_latency'] = latency
+                    stats['frame_lag'] = self._latest_submitted[camera_id] - frame_id
+                    if camera_id in self._pending:
+                        stats['stale'] += 1
+                self._in_flight = set()
+                self.stats['batches'] += 1
+                self.stats['frames'] += len(batch)
+                self.stats['last_batch_size'] = len(batch)
+                self.stats['last_latency'] = latency
+                self._condition.notify_all()  # Quien espere en wait_result
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats['mean_batch_size'] = stats['frames'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+
+class CameraDetectorPool:
+    def __init__(self, camera_id: Hashable, local_pool: DetectorPool,
+                 shared: Dict[str, BatchedDetectorWorker]):
+        """
+        Detectores de una cámara: sus workers propios más los compartidos por lotes
+
+        Args:
+            camera_id: Identificador de la cámara en los workers compartidos
+            local_pool: DetectorPool con los detectores propios de la cámara
+            shared: Workers por lotes compartidos (se arrancan y detienen fuera)
+        """
+        self.camera_id = camera_id
+        self.local_pool = local_pool
+        self.shared = shared
+        self._seen_versions = {name: 0 for name in shared}
+        for worker in shared.values():
+            worker.register(camera_id)
+
+    @property
+    def names(self) -> List[str]:
+        return self.local_pool.names + list(self.shared)
+
+    def start(self):
+        self.local_pool.start()
+
+    def stop(self):
+        self.local_pool.stop()
+
+    def load(self, names: Optional[List[str]] = None):
+        self.local_pool.load([name for name in names if name not in self.shared] if names is not None else None)
+
+    def wait_ready(self, timeout: float = 120.0) -> bool:
+        return self.local_pool.wait_ready(timeout)
+
+    def states(self) -> Dict[str, str]:
+        states = self.local_pool.states()
+        states.update({name: READY for name in self.shared})  # Se cargan antes de arrancar
+        return states
+
+    def is_busy(self, name: str) -> bool:
+        if name in self.shared:
+            return self.shared[name].busy(self.camera_id)
+        return self.local_pool.is_busy(name)
+
+    def submit(self, names: List[str], frame: np.ndarray, frame_id: int):
+        local = [name for name in names if name not in self.shared]
+        self.local_pool.submit(local, frame, frame_id)
+        for name in names:
+            if name in self.shared:
+                self.shared[name].submit(self.camera_id, frame, frame_id)
+
+    def collect(self) -> Dict[str, DetectorResult]:
+        new_results = self.local_pool.collect()
+        for name, worker in self.shared.items():
+            result = worker.result(self.camera_id)
+            if result is not None and result.version > self._seen_versions[name]:
+                self._seen_versions[name] = result.version
+                new_results[name] = result
+        return new_results
+
+    def get_stats(self, current_frame_id: Optional[int] = None) -> Dict[str, Dict]:
+        stats = self.local_pool.get_stats(current_frame_id)
+        for name, worker in self.shared.items():
+            worker_stats = dict(worker.camera_stats[self.camera_id])
+            result = worker.result(self.camera_id)
+            if current_frame_id is not None and result is not None:
+                worker_stats['frame_lag'] = current_frame_id - result.frame_id
+            stats[name] = worker_stats
+        return stats
+
+    print_stats = DetectorPool.print_stats
@@ -0,0 +1,234 @@
+"""
+Fuentes de frames para el Monitor Visual 3D
+
+Todas exponen la misma interfaz mínima que cv2.VideoCapture (read,
+isOpened, release), así VisualMonitor puede procesar la cámara, un video,
+una carpeta de imágenes o frames sintéticos sin cambios. Las fuentes
+finitas marcan `exhausted` al terminar. Con realtime=True se respetan los
+fps de la fuente; con realtime=False se entregan tan rápido como se pidan
+(útil para benchmarks reproducibles).
+"""
+
+import os
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class FrameSource:
+    def __init__(self, fps: float = 30.0, realtime: bool = True, max_frames: Optional[int] = None):
+        """
+        Args:
+            fps: Frecuencia nominal de la fuente
+            realtime: Esperar entre frames para respetar `fps`
+            max_frames: Detener la fuente tras este número de frames
+        """
+        self.fps = fps
+        self.realtime = realtime
+        self.max_frames = max_frames
+        self.frames_read = 0
+        self.exhausted = False
+        self._next_frame_time = None
+
+    @property
+    def is_live(self) -> bool:
+        """True si los frames llegan a su ritmo y se pueden descartar (FrameGrabber)"""
+        return self.realtime
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.exhausted or (self.max_frames is not None and self.frames_read >= self.max_frames):
+            self.exhausted = True
+            return False, None
+        self._pace()
+        ok, frame = self._read_frame()
+        if ok:
+            self.frames_read += 1
+        return ok, frame
+
+    def _pace(self):
+        """Espera hasta el instante del siguiente frame (solo en modo tiempo real)"""
+        if not self.realtime or self.fps <= 0:
+            return
+        now = time.perf_counter()
+        if self._next_frame_time is None:
+            self._next_frame_time = now
+        delay = self._next_frame_time - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame_time = max(self._next_frame_time, now) + 1.0 / self.fps
+
+    def _read_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        raise NotImplementedError
+
+    def isOpened(self) -> bool:
+        return not self.exhausted
+
+    def release(self):
+        self.exhausted = True
+
+    def describe(self) -> str:
+        return self.__class__.__name__
+
+
+class CameraSource(FrameSource):
+    def __init__(self, index: int = 0, width: int = 320, height: int = 240, fps: float = 30.0,
+                 max_frames: Optional[int] = None):
+        """Cámara en vivo con la configuración optimizada del monitor"""
+        # La cámara ya entrega a su ritmo: no hace falta esperar entre frames
+        super().__init__(fps, realtime=False, max_frames=max_frames)
+        self.index = index
+        self.cap = cv2.VideoCapture(index)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)  # Resolución más baja
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)  # Resolución más baja
+        self.cap.set(cv2.CAP_PROP_FPS, fps)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Buffer mínimo para reducir lag
+
+    @property
+    def is_live(self) -> bool:
+        return True
+
+    def _read_frame(self):
+        return self.cap.read()
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+    def describe(self) -> str:
+        return f"cámara {self.index}"
+
+
+class VideoFileSource(FrameSource):
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False,
+                 max_frames: Optional[int] = None):
+        """Archivo de video; `loop` lo reinicia al llegar al final"""
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        super().__init__(fps, realtime, max_frames)
+        self.loop = loop
+
+    def _read_frame(self):
+        ok, frame = self.cap.read()
+        if not ok and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read()
+        if not ok:
+            self.exhausted = True
+        return ok, frame
+
+    def release(self):
+        super().release()
+        self.cap.release()
+
+    def describe(self) -> str:
+        return f"video {os.path.basename(self.path)} @ {self.fps:.0f}fps"
+
+
+class ImageDirectorySource(FrameSource):
+    def __init__(self, directory: str, fps: float = 30.0, realtime: bool = True, loop: bool = False,
+                 max_frames: Optional[int] = None):
+        """Imágenes de una carpeta en orden alfabético"""
+        super().__init__(fps, realtime, max_frames)
+        self.directory = directory
+        self.files = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.loop = loop
+        self._position = 0
+        if not self.files:
+            self.exhausted = True
+
+    def _read_frame(self):
+        if self._position >= len(self.files):
+            if not self.loop:
+                self.exhausted = True
+                return False, None
+            self._position = 0
+        frame = cv2.imread(self.files[self._position])
+        self._position += 1
+        return frame is not None, frame
+
+    def describe(self) -> str:
+        return f"carpeta {self.directory} ({len(self.files)} imágenes)"
+
+
+class SyntheticSource(FrameSource):
+    def __init__(self, width: int = 320, height: int = 240, fps: float = 30.0, realtime: bool = True,
+                 max_frames: Optional[int] = None, seed: int = 0):
+        """Frames reproducibles: fondo con ruido fijo y figuras en movimiento"""
+        super().__init__(fps, realtime, max_frames)
+        self.width = width
+        self.height = height
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        # Parche con textura propia (como una persona) para que el flujo óptico tenga detalle
+        patch = rng.integers(0, 60, (height // 2, width // 5, 3), dtype=np.uint8)
+        self.patch = cv2.resize(cv2.resize(patch, (max(1, width // 40), max(1, height // 16))),
+                                (width // 5, height // 2), interpolation=cv2.INTER_NEAREST) + \
+            np.array([40, 120, 180], dtype=np.uint8)
+        self._index = 0
+        self._boxes = []
+
+    def _read_frame(self):
+        i = self._index
+        self._index += 1
+        frame = self.background.copy()
+        w, h = self.width, self.height
+        # Rectángulo texturizado horizontal y círculo en trayectoria circular
+        x = int((i * 5) % max(1, w - w // 5))
+        y = h // 3
+        ph, pw = self.patch.shape[:2]
+        frame[y:y + ph, x:x + pw] = self.patch[:max(0, min(ph, h - y)), :max(0, min(pw, w - x))]
+        cx = int(w / 2 + w / 4 * np.cos(i / 15))
+        cy = int(h / 2 + h / 4 * np.sin(i / 15))
+        radius = max(4, h // 12)
+        cv2.circle(frame, (cx, cy), radius, (200, 60, 60), -1)
+        self._boxes = [
+            {'class': 'person', 'confidence': 1.0, 'bbox': [float(x), float(y), float(x + pw), float(y + ph)]},
+            {'class': 'sports ball', 'confidence': 1.0,
+             'bbox': [float(cx - radius), float(cy - radius), float(cx + radius), float(cy + radius)]}
+        ]
+        return True, frame
+
+    def ground_truth(self) -> List[Dict]:
+        """Cajas reales de las figuras del último frame (formato de detección de YOLO)"""
+        return [dict(box) for box in self._boxes]
+
+    def describe(self) -> str:
+        return f"sintético {self.width}x{self.height} @ {self.fps:.0f}fps"
+
+
+def open_source(spec: Union[int, str, FrameSource] = 0, realtime: bool = True, loop: bool = False,
+                max_frames: Optional[int] = None) -> FrameSource:
+    """
+    Crea una fuente a partir de una especificación
+
+    Args:
+        spec: Índice de cámara ('0'), 'synthetic' o 'synthetic:640x480',
+            una carpeta de imágenes o la ruta de un video
+        realtime: Respetar los fps de la fuente (se ignora en cámara)
+        loop: Reiniciar videos/carpetas al terminar
+        max_frames: Número máximo de frames a entregar
+    """
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int) or str(spec).isdigit():
+        return CameraSource(int(spec), max_frames=max_frames)
+    if spec.startswith('synthetic'):
+        width, height = 320, 240
+        if ':' in spec:
+            width, height = (int(v) for v in spec.split(':', 1)[1].lower().split('x'))
+        return SyntheticSource(width, height, realtime=realtime, max_frames=max_frames)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, realtime=realtime, loop=loop, max_frames=max_frames)
+    if os.path.isfile(spec):
+        return VideoFileSource(spec, realtime=realtime, loop=loop, max_frames=max_frames)
+    raise ValueError(f"Fuente de frames no válida: {spec}")
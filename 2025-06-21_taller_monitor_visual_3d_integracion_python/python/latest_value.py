@@ -0,0 +1,88 @@
+"""
+Paso del hilo de cámara al bucle de asyncio sin sondeo
+
+El hilo de cámara publica cada resultado en LatestValue. Hay un hueco por
+clave (camera_id), así que un valor nuevo reemplaza al anterior si nadie
+lo leyó. El sender de WebSocket espera con `await wait()` y solo despierta
+cuando hay algo nuevo, sin consultar una cola cada 10 ms.
+
+El hilo productor despierta al bucle con `loop.call_soon_threadsafe`, y
+solo si el consumidor está esperando y no hay ya un aviso pendiente. Si
+el sender está durmiendo por el límite de frecuencia, publicar es solo
+guardar una referencia. Así, por ciclo de envío, el bucle despierta como
+mucho una vez.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional
+
+
+class LatestValue:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[Hashable, Any] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+        self._waiting = False
+        self._wake_scheduled = False
+        self.stats = {'published': 0, 'overwritten': 0, 'taken': 0, 'wakeups': 0}
+
+    def bind(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Asocia el hueco al bucle que lo va a esperar (llamar desde ese bucle)"""
+        self._loop = loop or asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def publish(self, value: Any, key: Hashable = None):
+        """Guarda el último valor de `key` (desde cualquier hilo, nunca bloquea)"""
+        with self._lock:
+            if key in self._values:
+                self.stats['overwritten'] += 1  # Nadie leyó el anterior
+            self._values[key] = value
+            self.stats['published'] += 1
+            if not self._waiting or self._wake_scheduled or self._loop is None:
+                return
+            self._wake_scheduled = True
+            loop = self._loop
+        try:
+            loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            pass  # El bucle ya se cerró
+
+    def _wake(self):
+        with self._lock:
+            self._wake_scheduled = False
+        self.stats['wakeups'] += 1
+        self._event.set()
+
+    def take(self) -> Dict[Hashable, Any]:
+        """Valores nuevos por clave desde la última lectura (sin esperar)"""
+        with self._lock:
+            values, self._values = self._values, {}
+        self.stats['taken'] += len(values)
+        return values
+
+    async def wait(self, timeout: Optional[float] = None) -> Dict[Hashable, Any]:
+        """Espera a que haya valores nuevos; {} si vence `timeout`"""
+        if self._event is None:
+            self.bind()
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            with self._lock:
+                if self._values:
+                    self._waiting = False
+                    values, self._values = self._values, {}
+                    self.stats['taken'] += len(values)
+                    return values
+                self._waiting = True
+                self._event.clear()
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                with self._lock:
+                    self._waiting = False
+                return {}
+            try:
+                await asyncio.wait_for(self._event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
@@ -14,149 +14,382 @@ import json
 import time
 from ultralytics import YOLO
 import mediapipe as mp
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, FrozenSet, Iterable, List, Tuple, Optional
 import threading
-import queue
+import os
+from datetime import datetime
+from detector_workers import READY, WARMING, DetectorPool
+from process_detectors import ProcessDetectorPool
+from scheduler import create_scheduler
+from protocol import BINARY_FORMAT, JSON_FORMAT
+from client_sessions import ClientBroadcaster, parse_subscription
+from metrics import PipelineMetrics
+from frame_sources import FrameSource, open_source
+from frame_grabber import FrameGrabber
+from latest_value import LatestValue
+from recorder import StreamRecorder
+from color_model import IncrementalColorModel
+from tracker import BoxTracker
+from yolo_postprocess import YoloDetections, extract_detections, find_class_id
+
+# Clave de la caché de resultados de cada detector
+CACHE_KEYS = {'yolo': 'yolo_data', 'pose': 'pose_data', 'hands': 'hands_data',
+              'faces': 'faces_data', 'colors': 'dominant_colors'}
+
 
 class VisualMonitor:
-    def __init__(self):
-        """Inicializa el monitor visual con todos los detectores optimizado"""
-        # Modelos de detección
-        self.yolo_model = YOLO('yolov8n.pt')  # Modelo ligero
-        
-        # MediaPipe para detección de poses y manos (configuración optimizada)
-        self.mp_pose = mp.solutions.pose
-        self.mp_hands = mp.solutions.hands
-        self.mp_face = mp.solutions.face_detection
+    def __init__(self, execution_mode: str = 'threads', scheduler: str = 'fixed',
+                 budget_ms: float = 25.0, source=0, headless: bool = False, cascade: bool = False,
+                 tracking: bool = False, yolo_interval: int = 3, record: Optional[str] = None,
+                 detectors: Optional[Iterable[str]] = None):
+        """
+        Inicializa el monitor visual con todos los detectores optimizado
+        
+        Args:
+            execution_mode: 'threads' (un hilo por detector) o 'processes'
+                (un proceso por detector leyendo frames de memoria compartida)
+            scheduler: 'fixed' (intervalos fijos) o 'adaptive' (presupuesto de latencia)
+            budget_ms: Presupuesto de inferencia por frame del planificador adaptativo
+            source: Índice de cámara, ruta de video, carpeta de imágenes, 'synthetic'
+                o una instancia de FrameSource
+            headless: No abrir ventanas de OpenCV (servidores y CI)
+            cascade: Ejecutar pose/manos/caras solo sobre las personas que encontró YOLO
+            tracking: Propagar las cajas de YOLO con flujo óptico entre ejecuciones (track_id estable)
+            yolo_interval: Frames entre ejecuciones de YOLO
+            record: Carpeta donde grabar los datos procesados en bloques columnares (None = no grabar)
+            detectors: Detectores que se ejecutan mientras no hay clientes suscritos (None = todos);
+                los modelos que nadie necesita no se cargan
+        """
+        started_at = time.perf_counter()
+        self.execution_mode = execution_mode
+        self.cascade = cascade
+        self.default_detectors = frozenset(detectors) if detectors is not None else None
+        
+        # Los modelos no se cargan aquí: cada worker carga el suyo en segundo plano
+        
+        # Fuente de frames (cámara optimizada 320x240 @ 30fps por defecto)
+        self.cap: FrameSource = open_source(source)
+        self.grabber: Optional[FrameGrabber] = None  # Se crea al arrancar el hilo de cámara
+        self.headless = headless
+        self.running = True
+        
+        # Último dato procesado, esperado por el sender de WebSocket
+        self.latest_data = LatestValue()
+        
+        self._init_frame_state(scheduler, budget_ms, yolo_interval, tracking)
+        self._started_at = started_at  # El arranque se mide desde aquí
         
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=0,  # Modelo más ligero
-            smooth_landmarks=False,  # Desactivar suavizado para mayor velocidad
-            min_detection_confidence=0.7,  # Umbral más alto para menos falsos positivos
-            min_tracking_confidence=0.5
-        )
-        
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            min_detection_confidence=0.7,  # Umbral más alto
-            min_tracking_confidence=0.5
-        )
-        
-        self.face_detection = self.mp_face.FaceDetection(
-            model_selection=0,
-            min_detection_confidence=0.7  # Umbral más alto
-        )
-        
-        # Configuración de cámara optimizada
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 320)  # Resolución más baja
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 240)  # Resolución más baja
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Buffer mínimo para reducir lag
+        # WebSocket optimizado
+        # Latencias por etapa (histogramas móviles p50/p95/p99)
+        self.metrics = PipelineMetrics(window=512)
         
-        # Cola para datos (tamaño limitado)
-        self.data_queue = queue.Queue(maxsize=5)
+        self.websocket_server = None
+        # Cola acotada y tarea de envío por cliente; keyframe binario cada ~2s a 20 Hz
+        self.broadcaster = ClientBroadcaster(base_interval=0.050, queue_size=4, keyframe_interval=40,
+                                             metrics=self.metrics)
+        self._refresh_subscriptions()  # Sin clientes: los detectores de --detectors
+        
+        # Workers persistentes (uno por detector) para procesamiento paralelo
+        if execution_mode == 'processes':
+            # Un proceso por detector (incluye k-means de colores) sobre un anillo de memoria compartida
+            self.detector_pool = ProcessDetectorPool(['yolo', 'pose', 'hands', 'faces', 'colors'])
+        else:
+            functions = self.detector_functions()
+            self.detector_pool = DetectorPool({
+                name: functions[name] for name in ['yolo', 'pose', 'hands', 'faces']
+            }, loaders=self.model_loaders())
+        self.detector_pool.start()
+        # Con --detectors se adelanta en paralelo la carga de esos modelos; sin la opción,
+        # cada modelo se carga cuando el planificador le entrega su primer frame
+        if self.default_detectors is not None:
+            self.detector_pool.load(self._required_models(self.default_detectors))
+        
+        # Grabación opcional: el escritor corre en su propio hilo
+        self.recorder = StreamRecorder(record) if record else None
         
+        print("🎯 Monitor Visual OPTIMIZADO inicializado correctamente")
+        print(f"📷 Fuente de frames: {self.cap.describe()}" + (" (sin ventana)" if headless else ""))
+        if execution_mode == 'processes':
+            print("🤖 Modelos en procesos worker (memoria compartida), cargados al recibir su primer frame")
+        else:
+            print("🤖 Modelos en segundo plano, cargados al recibir su primer frame: YOLO + MediaPipe (configuración ligera)")
+        if detectors is not None:
+            print(f"🎛️  Detectores sin clientes: {', '.join(sorted(self.default_detectors)) or 'ninguno'}")
+        print("⚡ Procesamiento alternado activado para mayor velocidad")
+        if cascade:
+            print("🎯 Cascada activada: MediaPipe solo sobre personas detectadas por YOLO")
+        if tracking:
+            print(f"🛰️  Seguimiento activado: YOLO cada {yolo_interval} frames, cajas propagadas con flujo óptico")
+        if record:
+            print(f"📼 Grabando datos procesados en {os.path.abspath(record)}")
+
+    def _init_frame_state(self, scheduler: str, budget_ms: float, yolo_interval: int = 3,
+                          tracking: bool = False):
+        """Estado por flujo de frames: planificador, cache de resultados y movimiento"""
         # Optimización: Contadores de frames para alternar procesamiento
         self.frame_count = 0
-        self.yolo_interval = 3      # Ejecutar YOLO cada 3 frames
+        self.yolo_interval = yolo_interval  # Ejecutar YOLO cada 3 frames por defecto
         self.pose_interval = 2      # Ejecutar pose cada 2 frames  
         self.hands_interval = 2     # Ejecutar hands cada 2 frames
         self.face_interval = 4      # Ejecutar face cada 4 frames
-        self.colors_interval = 10   # Ejecutar colores cada 10 frames
+        self.colors_interval = 2    # Colores incrementales: cada 2 frames cuestan menos que k-means cada 10
+        
+        # Planificador: decide qué detectores corren en cada frame
+        self.scheduler = create_scheduler(scheduler, budget_ms, {
+            'yolo': self.yolo_interval,
+            'pose': self.pose_interval,
+            'hands': self.hands_interval,
+            'faces': self.face_interval,
+            'colors': self.colors_interval
+        })
         
         # Cache para resultados previos
-        self.cached_results = {
+        self.cached_results = self.empty_results()
+        
+        # Detectores que algún cliente necesita (None = todos); se aplican en el hilo de cámara
+        self.active_detectors: Optional[FrozenSet[str]] = None
+        self._applied_detectors: Optional[FrozenSet[str]] = None
+        
+        # Variables para cálculo de movimiento optimizado
+        self.prev_frame = None
+        self.movement_history = []
+        self.movement_roi = None  # ROI para cálculo de movimiento más eficiente
+        
+        # Paleta persistente: k-means online sobre una miniatura en cada frame
+        self.color_model = IncrementalColorModel(k=3)
+        
+        # Cascada: cajas de persona del último resultado de YOLO
+        self.person_boxes: List[List[float]] = []
+        self.cascade_stats = {'skipped': 0, 'submitted': 0}
+        
+        # Seguimiento entre ejecuciones de YOLO (sobre el gris 80x60 del movimiento)
+        self.tracker = BoxTracker(small_size=(80, 60)) if tracking else None
+        
+        # Arranque: segundos hasta el primer frame y hasta el primer resultado de todos los detectores
+        self._started_at = time.perf_counter()
+        self._first_results = set()
+        self.startup = {'first_frame_s': None, 'first_full_result_s': None}
+
+    @staticmethod
+    def empty_results() -> Dict:
+        """Resultados por defecto de cada detector (antes del primer resultado o sin suscriptores)"""
+        return {
             'yolo_data': {'people_count': 0, 'objects_count': 0, 'detections': []},
             'pose_data': {'pose_detected': False, 'landmarks': [], 'visibility_scores': []},
             'hands_data': {'hands_count': 0, 'hands_landmarks': [], 'gestures': []},
             'faces_data': {'faces_count': 0, 'face_positions': []},
             'dominant_colors': [[128, 128, 128], [64, 64, 64], [192, 192, 192]]
         }
+
+    def set_active_detectors(self, names: Optional[Iterable[str]]):
+        """Limita los detectores que se ejecutan (None = todos); lo aplica el siguiente frame"""
+        self.active_detectors = frozenset(names) if names is not None else None
+
+    def _refresh_subscriptions(self):
+        """Recalcula los detectores activos a partir de las suscripciones de los clientes"""
+        required = self.broadcaster.required_detectors()
+        if required is None:
+            # Sin clientes se usan los de --detectors (todos por defecto): la ventana local y las métricas
+            required = set(self.default_detectors) if self.default_detectors is not None else None
+        if required is not None and self.cascade and required & {'pose', 'hands', 'faces'}:
+            required.add('yolo')  # La cascada necesita las cajas de persona
+        self.set_active_detectors(required)
+
+    def _required_models(self, names: Optional[Iterable[str]]) -> List[str]:
+        """Detectores del pool que hay que cargar para ejecutar `names` (None = todos)"""
+        required = set(self.detector_pool.names) if names is None else set(names)
+        if self.cascade and required & {'pose', 'hands', 'faces'}:
+            required.add('yolo')
+        return [name for name in self.detector_pool.names if name in required]
+
+    def detector_states(self) -> Dict[str, str]:
+        """Estado de carga de cada detector ('unloaded', 'warming', 'ready' o 'failed')"""
+        return self.detector_pool.states()
+
+    def _record_startup(self, delivered: Iterable[str], active: Optional[FrozenSet[str]]):
+        """Anota el primer frame y el primer frame con resultado de todos los detectores activos"""
+        elapsed = time.perf_counter() - self._started_at
+        if self.startup['first_frame_s'] is None:
+            self.startup['first_frame_s'] = elapsed
+            print(f"⏱️  Primer frame procesado a los {elapsed:.2f}s")
+        self._first_results.update(delivered)
+        expected = set(CACHE_KEYS) if active is None else set(active) & set(CACHE_KEYS)
+        if self.cascade:
+            # Sin personas MediaPipe no corre: basta con que su modelo esté listo
+            states = self.detector_states()
+            expected -= {name for name in ('pose', 'hands', 'faces') if states.get(name) == READY}
+        if expected <= self._first_results:
+            self.startup['first_full_result_s'] = elapsed
+            print(f"⏱️  Primer resultado completo a los {elapsed:.2f}s")
+
+    def _apply_active_detectors(self):
+        """Vacía la caché de los detectores que dejan de estar activos (hilo de cámara)"""
+        active = self.active_detectors
+        previous = self._applied_detectors
+        self._applied_detectors = active
+        if active is None:
+            print("🎛️  Detectores activos: todos")
+            return
+        print(f"🎛️  Detectores activos: {', '.join(sorted(active)) or 'ninguno'}")
+        empty = self.empty_results()
+        for name, key in CACHE_KEYS.items():
+            if name not in active and (previous is None or name in previous):
+                self.cached_results[key] = empty[key]
+        if 'yolo' not in active:
+            self.person_boxes = []
+            if self.tracker is not None:
+                self.tracker.reset()
+
+    def _load_models(self, names: List[str]):
+        """Carga solo los modelos indicados"""
+        if 'yolo' in names:
+            self.yolo_model = YOLO('yolov8n.pt')  # Modelo ligero
+            self.person_class_id = find_class_id(self.yolo_model.names, 'person')
         
-        # Variables para cálculo de movimiento optimizado
-        self.prev_frame = None
-        self.movement_history = []
-        self.movement_roi = None  # ROI para cálculo de movimiento más eficiente
+        # MediaPipe para detección de poses y manos (configuración optimizada)
+        self.mp_pose = mp.solutions.pose
+        self.mp_hands = mp.solutions.hands
+        self.mp_face = mp.solutions.face_detection
         
-        # WebSocket optimizado
-        self.websocket_server = None
-        self.connected_clients = set()
-        
-        # Threading para procesamiento paralelo
-        self.processing_threads = []
-        self.thread_results = {}
-        self.thread_locks = {
-            'yolo': threading.Lock(),
-            'pose': threading.Lock(),
-            'hands': threading.Lock(),
-            'faces': threading.Lock()
+        if 'pose' in names:
+            self.pose = self.mp_pose.Pose(
+                static_image_mode=False,
+                model_complexity=0,  # Modelo más ligero
+                smooth_landmarks=False,  # Desactivar suavizado para mayor velocidad
+                min_detection_confidence=0.7,  # Umbral más alto para menos falsos positivos
+                min_tracking_confidence=0.5
+            )
+        
+        if 'hands' in names:
+            self.hands = self.mp_hands.Hands(
+                static_image_mode=False,
+                max_num_hands=2,
+                min_detection_confidence=0.7,  # Umbral más alto
+                min_tracking_confidence=0.5
+            )
+        
+        if 'faces' in names:
+            self.face_detection = self.mp_face.FaceDetection(
+                model_selection=0,
+                min_detection_confidence=0.7  # Umbral más alto
+            )
+
+    def model_loaders(self) -> Dict:
+        """Carga de cada modelo por nombre, ejecutada en el hilo de su worker"""
+        return {name: (lambda name=name: self._load_models([name])) for name in ['yolo', 'pose', 'hands', 'faces']}
+
+    @classmethod
+    def detectors_only(cls, names: List[str]) -> 'VisualMonitor':
+        """Crea una instancia sin cámara ni servidor, solo con los modelos indicados (procesos worker y benchmarks)"""
+        monitor = cls.__new__(cls)
+        monitor.cascade = False
+        monitor.person_boxes = []
+        monitor.color_model = IncrementalColorModel(k=3)
+        monitor._load_models(names)
+        return monitor
+
+    def detector_functions(self) -> Dict:
+        """Funciones de detección por nombre, usadas por los workers"""
+        if self.cascade:
+            # MediaPipe sobre recortes de las personas que encontró YOLO
+            return {
+                'yolo': self.detect_objects_yolo,
+                'pose': lambda frame: self.detect_pose_mediapipe(frame, self.person_roi(frame.shape, largest=True)),
+                'hands': lambda frame: self.detect_hands_mediapipe(frame, self.person_roi(frame.shape)),
+                'faces': lambda frame: self.detect_faces_mediapipe(frame, self.person_roi(frame.shape)),
+                'colors': self.update_dominant_colors
+            }
+        return {
+            'yolo': self.detect_objects_yolo,
+            'pose': self.detect_pose_mediapipe,
+            'hands': self.detect_hands_mediapipe,
+            'faces': self.detect_faces_mediapipe,
+            'colors': self.update_dominant_colors
         }
-        
-        print("🎯 Monitor Visual OPTIMIZADO inicializado correctamente")
-        print("📷 Cámara configurada: 320x240 @ 30fps (optimizada)")
-        print("🤖 Modelos cargados: YOLO + MediaPipe (configuración ligera)")
-        print("⚡ Procesamiento alternado activado para mayor velocidad")
+
+    def person_roi(self, frame_shape: Tuple[int, ...], largest: bool = False, margin: float = 0.15,
+                   min_size: int = 64) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Región (x1, y1, x2, y2) que cubre las personas detectadas por YOLO
+        
+        Args:
+            frame_shape: Forma del frame (alto, ancho, ...)
+            largest: Solo la persona más grande (Pose sigue a una sola persona)
+            margin: Margen relativo alrededor de las cajas (manos y cabeza pueden salirse)
+            min_size: Lado mínimo del recorte en píxeles
+        """
+        boxes = self.person_boxes
+        if not boxes:
+            return None
+        if largest:
+            boxes = [max(boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]))]
+        h, w = frame_shape[:2]
+        x1 = min(b[0] for b in boxes)
+        y1 = min(b[1] for b in boxes)
+        x2 = max(b[2] for b in boxes)
+        y2 = max(b[3] for b in boxes)
+        pad_x = max((x2 - x1) * margin, (min_size - (x2 - x1)) / 2)
+        pad_y = max((y2 - y1) * margin, (min_size - (y2 - y1)) / 2)
+        x1, x2 = int(max(0, x1 - pad_x)), int(min(w, x2 + pad_x))
+        y1, y2 = int(max(0, y1 - pad_y)), int(min(h, y2 + pad_y))
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return None
+        return x1, y1, x2, y2
 
     def detect_objects_yolo(self, frame: np.ndarray) -> Dict:
         """Detecta objetos usando YOLO"""
-        results = self.yolo_model(frame, verbose=False)
-        
-        people_count = 0
-        objects_count = 0
-        detections = []
-        
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    class_id = int(box.cls[0])
-                    confidence = float(box.conf[0])
-                    
-                    if confidence > 0.5:  # Umbral de confianza
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        class_name = self.yolo_model.names[class_id]
-                        
-                        detection = {
-                            'class': class_name,
-                            'confidence': confidence,
-                            'bbox': [float(x1), float(y1), float(x2), float(y2)],
-                            'center': [float((x1 + x2) / 2), float((y1 + y2) / 2)],
-                            'area': float((x2 - x1) * (y2 - y1))
-                        }
-                        detections.append(detection)
-                        
-                        if class_name == 'person':
-                            people_count += 1
-                        else:
-                            objects_count += 1
-        
+        return self.detect_objects_yolo_batch([frame])[0]
+
+    def detect_objects_yolo_batch(self, frames: List[np.ndarray]) -> List[Dict]:
+        """Detecta objetos en varios frames con una sola llamada a YOLO (un resultado por frame)"""
+        results = self.yolo_model(frames, verbose=False)
+        return [self._parse_yolo_result(result) for result in results]
+
+    def _parse_yolo_result(self, result) -> Dict:
+        """Convierte el resultado de YOLO de un frame en conteos y detecciones"""
+        # Umbral y centros/áreas vectorizados; los dicts se crean solo si alguien los lee
+        detections = YoloDetections(extract_detections(result, min_confidence=0.5),
+                                    self.yolo_model.names)
+        people_count, objects_count = detections.class_counts(self.person_class_id)
         return {
             'people_count': people_count,
             'objects_count': objects_count,
             'detections': detections
         }
 
-    def detect_pose_mediapipe(self, frame: np.ndarray) -> Dict:
-        """Detecta poses usando MediaPipe"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(rgb_frame)
-        
+    @staticmethod
+    def _roi_transform(frame_shape: Tuple[int, ...], roi: Optional[Tuple[int, int, int, int]]):
+        """Escala y desplazamiento para pasar coordenadas normalizadas del recorte al frame"""
+        if roi is None:
+            return 1.0, 1.0, 0.0, 0.0
+        h, w = frame_shape[:2]
+        x1, y1, x2, y2 = roi
+        return (x2 - x1) / w, (y2 - y1) / h, x1 / w, y1 / h
+
+    def detect_pose_mediapipe(self, frame: np.ndarray,
+                              roi: Optional[Tuple[int, int, int, int]] = None) -> Dict:
+        """Detecta poses usando MediaPipe (opcionalmente solo dentro de `roi`)"""
         pose_data = {
             'landmarks': [],
             'visibility_scores': [],
             'pose_detected': False
         }
+        if self.cascade and roi is None:
+            return pose_data  # Sin personas: no ejecutar el modelo
+        
+        crop = frame if roi is None else frame[roi[1]:roi[3], roi[0]:roi[2]]
+        rgb_frame = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        results = self.pose.process(rgb_frame)
         
         if results.pose_landmarks:
             pose_data['pose_detected'] = True
             landmarks = []
             visibility_scores = []
+            sx, sy, ox, oy = self._roi_transform(frame.shape, roi)
             
             for landmark in results.pose_landmarks.landmark:
-                landmarks.extend([landmark.x, landmark.y, landmark.z])
+                # z usa aproximadamente la misma escala que x
+                landmarks.extend([ox + landmark.x * sx, oy + landmark.y * sy, landmark.z * sx])
                 visibility_scores.append(landmark.visibility)
             
             pose_data['landmarks'] = landmarks
@@ -164,24 +397,29 @@ class VisualMonitor:
         
         return pose_data
 
-    def detect_hands_mediapipe(self, frame: np.ndarray) -> Dict:
-        """Detecta manos usando MediaPipe"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
-        
+    def detect_hands_mediapipe(self, frame: np.ndarray,
+                               roi: Optional[Tuple[int, int, int, int]] = None) -> Dict:
+        """Detecta manos usando MediaPipe (opcionalmente solo dentro de `roi`)"""
         hands_data = {
             'hands_count': 0,
             'hands_landmarks': [],
             'gestures': []
         }
+        if self.cascade and roi is None:
+            return hands_data  # Sin personas: no ejecutar el modelo
+        
+        crop = frame if roi is None else frame[roi[1]:roi[3], roi[0]:roi[2]]
+        rgb_frame = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        results = self.hands.process(rgb_frame)
         
         if results.multi_hand_landmarks:
             hands_data['hands_count'] = len(results.multi_hand_landmarks)
+            sx, sy, ox, oy = self._roi_transform(frame.shape, roi)
             
             for hand_landmarks in results.multi_hand_landmarks:
                 landmarks = []
                 for landmark in hand_landmarks.landmark:
-                    landmarks.extend([landmark.x, landmark.y, landmark.z])
+                    landmarks.extend([ox + landmark.x * sx, oy + landmark.y * sy, landmark.z * sx])
                 hands_data['hands_landmarks'].append(landmarks)
                 
                 # Análisis básico de gestos (puño cerrado vs abierto)
@@ -228,24 +466,30 @@ class VisualMonitor:
         else:
             return "partial"
 
-    def detect_faces_mediapipe(self, frame: np.ndarray) -> Dict:
-        """Detecta caras usando MediaPipe"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_detection.process(rgb_frame)
-        
+    def detect_faces_mediapipe(self, frame: np.ndarray,
+                               roi: Optional[Tuple[int, int, int, int]] = None) -> Dict:
+        """Detecta caras usando MediaPipe (opcionalmente solo dentro de `roi`)"""
         faces_data = {
             'faces_count': 0,
             'face_positions': []
         }
+        if self.cascade and roi is None:
+            return faces_data  # Sin personas: no ejecutar el modelo
+        
+        crop = frame if roi is None else frame[roi[1]:roi[3], roi[0]:roi[2]]
+        rgb_frame = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        results = self.face_detection.process(rgb_frame)
         
         if results.detections:
             faces_data['faces_count'] = len(results.detections)
             
-            h, w, _ = frame.shape
+            # Coordenadas en píxeles del frame completo
+            h, w = crop.shape[:2]
+            offset_x, offset_y = (roi[0], roi[1]) if roi is not None else (0, 0)
             for detection in results.detections:
                 bbox = detection.location_data.relative_bounding_box
-                x = int(bbox.xmin * w)
-                y = int(bbox.ymin * h)
+                x = offset_x + int(bbox.xmin * w)
+                y = offset_y + int(bbox.ymin * h)
                 width = int(bbox.width * w)
                 height = int(bbox.height * h)
                 
@@ -297,6 +541,10 @@ class VisualMonitor:
         """Mantener compatibilidad - redirige a versión optimizada"""
         return self.calculate_movement_intensity_optimized(frame)
 
+    def update_dominant_colors(self, frame: np.ndarray) -> List[List[int]]:
+        """Actualiza la paleta incremental con un frame (centros persistentes, orden estable)"""
+        return self.color_model.update(frame)
+
     def extract_dominant_colors_fast(self, frame: np.ndarray, k: int = 3) -> List[List[int]]:
         """Extrae los colores dominantes ULTRA RÁPIDO"""
         # Frame muy pequeño para máxima velocidad
@@ -335,83 +583,83 @@ class VisualMonitor:
         
         return dominant_colors
 
-    def process_frame_threaded(self, frame: np.ndarray, detection_type: str):
-        """Procesa un tipo específico de detección en paralelo"""
-        try:
-            if detection_type == 'yolo':
-                with self.thread_locks['yolo']:
-                    self.thread_results['yolo'] = self.detect_objects_yolo(frame)
-            elif detection_type == 'pose':
-                with self.thread_locks['pose']:
-                    self.thread_results['pose'] = self.detect_pose_mediapipe(frame)
-            elif detection_type == 'hands':
-                with self.thread_locks['hands']:
-                    self.thread_results['hands'] = self.detect_hands_mediapipe(frame)
-            elif detection_type == 'faces':
-                with self.thread_locks['faces']:
-                    self.thread_results['faces'] = self.detect_faces_mediapipe(frame)
-        except Exception as e:
-            print(f"❌ Error en thread {detection_type}: {e}")
-
-    def process_frame(self, frame: np.ndarray) -> Dict:
-        """Procesa un frame completo OPTIMIZADO con threading y alternancia"""
+    def process_frame(self, frame: np.ndarray, capture_time: Optional[float] = None) -> Dict:
+        """Procesa un frame completo OPTIMIZADO con workers persistentes y alternancia"""
         timestamp = time.time()
+        process_start = time.perf_counter()
         self.frame_count += 1
         
-        # Lista de threads activos
-        active_threads = []
-        
-        # Ejecutar detecciones según intervalos (procesamiento alternado)
-        if self.frame_count % self.yolo_interval == 0:
-            thread = threading.Thread(target=self.process_frame_threaded, args=(frame, 'yolo'))
-            thread.start()
-            active_threads.append(thread)
-        
-        if self.frame_count % self.pose_interval == 0:
-            thread = threading.Thread(target=self.process_frame_threaded, args=(frame, 'pose'))
-            thread.start()
-            active_threads.append(thread)
-        
-        if self.frame_count % self.hands_interval == 0:
-            thread = threading.Thread(target=self.process_frame_threaded, args=(frame, 'hands'))
-            thread.start()
-            active_threads.append(thread)
-        
-        if self.frame_count % self.face_interval == 0:
-            thread = threading.Thread(target=self.process_frame_threaded, args=(frame, 'faces'))
-            thread.start()
-            active_threads.append(thread)
-        
-        # Cálculo de movimiento (siempre, es rápido)
+        # Cálculo de movimiento (siempre, es rápido): guía al planificador
+        prev_gray = self.prev_frame
         movement_intensity = self.calculate_movement_intensity_optimized(frame)
-        
-        # Colores dominantes (menos frecuente)
-        if self.frame_count % self.colors_interval == 0:
-            dominant_colors = self.extract_dominant_colors_fast(frame)
-            self.cached_results['dominant_colors'] = dominant_colors
-        else:
-            dominant_colors = self.cached_results['dominant_colors']
-        
-        # Esperar a que terminen los threads activos (con timeout)
-        for thread in active_threads:
-            thread.join(timeout=0.02)  # Timeout de 20ms máximo
-        
-        # Actualizar cache con nuevos resultados
-        if 'yolo' in self.thread_results:
-            self.cached_results['yolo_data'] = self.thread_results['yolo']
-        if 'pose' in self.thread_results:
-            self.cached_results['pose_data'] = self.thread_results['pose']
-        if 'hands' in self.thread_results:
-            self.cached_results['hands_data'] = self.thread_results['hands']
-        if 'faces' in self.thread_results:
-            self.cached_results['faces_data'] = self.thread_results['faces']
+        self.metrics.record('movement', time.perf_counter() - process_start)
+        
+        # Seguimiento: mover las cajas con flujo óptico sobre el mismo gris 80x60
+        if self.tracker is not None:
+            start = time.perf_counter()
+            self.tracker.propagate(prev_gray, self.prev_frame, frame.shape, self.frame_count)
+            self.metrics.record('tracking', time.perf_counter() - start)
+        
+        # Suscripciones: los detectores que ningún cliente necesita no se planifican
+        if self.active_detectors != self._applied_detectors:
+            self._apply_active_detectors()
+        active = self.active_detectors
+        inactive = [] if active is None else [name for name in CACHE_KEYS if name not in active]
+        
+        # El planificador elige qué detectores corren en este frame
+        busy = [name for name in self.detector_pool.names if self.detector_pool.is_busy(name)]
+        due_detectors = self.scheduler.select(self.frame_count, movement_intensity, busy, inactive)
+        
+        # Cascada: sin personas en el último resultado de YOLO no se ejecuta MediaPipe
+        if self.cascade:
+            gated = [name for name in due_detectors if name in ('pose', 'hands', 'faces')]
+            if gated and not self.person_boxes:
+                due_detectors = [name for name in due_detectors if name not in gated]
+                self.cascade_stats['skipped'] += len(gated)
+            else:
+                self.cascade_stats['submitted'] += len(gated)
+        
+        # Colores dominantes: en modo procesos también van a un worker
+        colors_due = 'colors' in due_detectors and 'colors' not in self.detector_pool.names
+        if colors_due:
+            due_detectors.remove('colors')
+        
+        # Entregar el frame a los workers (sin bloquear)
+        self.detector_pool.submit(due_detectors, frame, self.frame_count)
+        
+        if colors_due:
+            start = time.perf_counter()
+            self.cached_results['dominant_colors'] = self.update_dominant_colors(frame)
+            self.scheduler.record_latency('colors', time.perf_counter() - start)
+            self.metrics.record('colors', time.perf_counter() - start)
+        
+        # Actualizar cache solo con resultados nuevos (publicados por los workers)
+        collected = self.detector_pool.collect()
+        for name, result in collected.items():
+            if name in inactive:
+                continue  # Resultado en vuelo de un detector ya desactivado
+            self.cached_results[CACHE_KEYS[name]] = result.data
+            self.scheduler.record_latency(name, result.latency)
+            self.metrics.record(name, result.latency)
+            if name == 'yolo' and self.tracker is not None:
+                # El resultado es del frame result.frame_id: el tracker lo lleva al actual
+                self.tracker.update(result.data['detections'], result.frame_id)
+            elif name == 'yolo' and self.cascade:
+                self._update_person_boxes(result.data)
+        dominant_colors = self.cached_results['dominant_colors']
+        
+        detections = self.cached_results['yolo_data']['detections']
+        if self.tracker is not None:
+            detections = self.tracker.detections()
+            if self.cascade:
+                self._update_person_boxes({'detections': detections})
         
         # Compilar datos usando cache
         processed_data = {
             'timestamp': timestamp,
             'people_count': self.cached_results['yolo_data']['people_count'],
             'objects_count': self.cached_results['yolo_data']['objects_count'],
-            'detections': self.cached_results['yolo_data']['detections'],
+            'detections': detections,
             'pose_detected': self.cached_results['pose_data']['pose_detected'],
             'pose_landmarks': self.cached_results['pose_data']['landmarks'],
             'hands_count': self.cached_results['hands_data']['hands_count'],
@@ -420,25 +668,56 @@ class VisualMonitor:
             'face_positions': self.cached_results['faces_data']['face_positions'],
             'movement_intensity': movement_intensity,
             'dominant_colors': dominant_colors,
-            'frame_size': [frame.shape[1], frame.shape[0]]
+            'frame_size': [frame.shape[1], frame.shape[0]],
+            '_capture_time': capture_time if capture_time is not None else process_start
         }
         
+        # Detectores activos que todavía cargan su modelo (los clientes ven 'warming')
+        warming = [name for name, state in self.detector_states().items()
+                   if state == WARMING and (active is None or name in active)]
+        if warming:
+            processed_data['warming'] = warming
+        if self.startup['first_full_result_s'] is None:
+            delivered = [name for name in collected if name not in inactive]
+            self._record_startup(delivered + (['colors'] if colors_due else []), active)
+        
+        self.metrics.record('process_frame', time.perf_counter() - process_start)
         return processed_data
 
+    def _update_person_boxes(self, yolo_data: Dict):
+        """Guarda las cajas de persona para la cascada; sin personas vacía las caches de MediaPipe"""
+        # Se reemplaza la lista entera: los workers leen siempre una versión completa
+        detections = yolo_data['detections']
+        if isinstance(detections, YoloDetections):
+            self.person_boxes = detections.select(self.person_class_id).array['bbox'].tolist()
+        else:  # Detecciones del tracker
+            self.person_boxes = [det['bbox'] for det in detections if det['class'] == 'person']
+        if not self.person_boxes:
+            self.cached_results['pose_data'] = {'pose_detected': False, 'landmarks': [], 'visibility_scores': []}
+            self.cached_results['hands_data'] = {'hands_count': 0, 'hands_landmarks': [], 'gestures': []}
+            self.cached_results['faces_data'] = {'faces_count': 0, 'face_positions': []}
+
     async def websocket_handler(self, websocket):
         """Maneja conexiones WebSocket correctamente"""
         print(f"🔌 Nueva conexión WebSocket desde {websocket.remote_address}")
-        self.connected_clients.add(websocket)
+        # JSON por defecto; el cliente puede pedir el formato binario con un mensaje 'protocol'
+        protocol = 'json'
         
         try:
             # Enviar mensaje de bienvenida
             welcome_msg = json.dumps({
                 "type": "connection",
                 "status": "connected",
-                "message": "Conectado al monitor visual"
+                "message": "Conectado al monitor visual",
+                "protocol": protocol,
+                "detectors": self.detector_states()
             })
             await websocket.send(welcome_msg)
             
+            # Registrar el cliente después del saludo: desde aquí solo escribe su tarea de envío
+            self.broadcaster.add(websocket, protocol)
+            self._refresh_subscriptions()
+            
             # Mantener la conexión viva
             async for message in websocket:
                 # Procesar mensajes del cliente si es necesario
@@ -446,37 +725,78 @@ class VisualMonitor:
                     data = json.loads(message)
                     print(f"📨 Mensaje del cliente: {data}")
                 except json.JSONDecodeError:
-                    pass
+                    continue
+                
+                if isinstance(data, dict) and data.get('type') == 'metrics':
+                    await websocket.send(json.dumps({
+                        "type": "metrics",
+                        **self.get_metrics_report()
+                    }, default=str))
+                
+                elif isinstance(data, dict) and data.get('type') == 'protocol':
+                    protocol = 'binary' if data.get('format') == BINARY_FORMAT else 'json'
+                    # Confirmar antes de cambiar: la tarea de envío del cliente no puede
+                    # mandarle un frame binario antes de que reciba la confirmación
+                    await websocket.send(json.dumps({
+                        "type": "protocol",
+                        "format": BINARY_FORMAT if protocol == 'binary' else JSON_FORMAT
+                    }))
+                    self.broadcaster.set_protocol(websocket, protocol)
+                
+                elif isinstance(data, dict) and data.get('type') == 'subscribe':
+                    # Temas y frecuencia que necesita este cliente
+                    try:
+                        topics, rate = parse_subscription(data)
+                    except (TypeError, ValueError) as e:
+                        await websocket.send(json.dumps({"type": "error", "message": str(e)}))
+                        continue
+                    session = self.broadcaster.subscribe(websocket, topics, rate)
+                    self._refresh_subscriptions()
+                    await websocket.send(json.dumps({
+                        "type": "subscribe",
+                        "fields": sorted(topics),
+                        "rate": session.metrics['rate_hz'] if session is not None else None
+                    }))
                     
         except websockets.exceptions.ConnectionClosed:
             print(f"🔌 Cliente desconectado: {websocket.remote_address}")
         except Exception as e:
             print(f"⚠️  Error en conexión WebSocket: {e}")
         finally:
-            if websocket in self.connected_clients:
-                self.connected_clients.remove(websocket)
+            session = await self.broadcaster.remove(websocket)
+            self._refresh_subscriptions()
             print(f"❌ Conexión cerrada: {websocket.remote_address}")
+            if session is not None:
+                m = session.metrics
+                print(f"   enviados={m['sent']} descartados={m['dropped']} "
+                      f"latencia={m['send_latency_ms']:.1f}ms degradaciones={m['downgrades']}")
+
+    def get_metrics_report(self) -> Dict:
+        """Latencias por etapa, estado de los detectores y de los clientes"""
+        return {
+            "frame_count": self.frame_count,
+            "stages": self.metrics.snapshot(),
+            "detectors": self.detector_pool.get_stats(self.frame_count),
+            "cascade": self.cascade_stats if self.cascade else None,
+            "tracking": self.tracker.stats if self.tracker is not None else None,
+            "capture": self.grabber.get_stats() if self.grabber is not None else None,
+            "recorder": self.recorder.stats if self.recorder is not None else None,
+            "handoff": self.latest_data.stats,
+            "startup": self.startup,
+            "clients": self.broadcaster.metrics()
+        }
+
+    def dump_metrics(self, path: Optional[str] = None) -> str:
+        """Guarda el informe de métricas en JSON (por defecto metrics_<fecha>.json)"""
+        if path is None:
+            path = f"metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        report = self.get_metrics_report()
+        report.pop("stages")
+        return self.metrics.dump(path, extra=report)
 
     async def broadcast_data(self, data: Dict):
-        """Envía datos a todos los clientes conectados"""
-        if self.connected_clients:
-            # Crear mensaje JSON
-            message = json.dumps(data, default=str)
-            
-            # Enviar a todos los clientes
-            disconnected = []
-            for client in list(self.connected_clients):  # Crear copia de la lista
-                try:
-                    await client.send(message)
-                except websockets.exceptions.ConnectionClosed:
-                    disconnected.append(client)
-                except Exception as e:
-                    print(f"⚠️  Error enviando a cliente: {e}")
-                    disconnected.append(client)
-            
-            # Limpiar conexiones cerradas
-            for client in disconnected:
-                self.connected_clients.discard(client)
+        """Serializa una vez y encola a cada cliente (no espera a los envíos)"""
+        self.broadcaster.broadcast(data)
 
     def camera_thread(self):
         """Hilo principal OPTIMIZADO de captura y procesamiento de cámara"""
@@ -484,27 +804,34 @@ class VisualMonitor:
         
         skip_display = 0  # Contador para saltar frames de visualización
         
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                print("❌ Error al capturar frame")
+        # La captura corre en su propio hilo; aquí se toma siempre el frame más reciente
+        self.grabber = FrameGrabber(self.cap, name='camera-grabber').start()
+        last_frame_id = 0
+        
+        while self.running:
+            grabbed = self.grabber.wait(last_frame_id, timeout=0.5)
+            if grabbed is None:
+                if self.grabber.exhausted:
+                    print("🏁 Fuente de frames terminada")
+                    break
                 continue
+            last_frame_id = grabbed.frame_id
+            frame, capture_time = grabbed.frame, grabbed.capture_time
+            # Edad del frame al empezar a procesarlo (la latencia se mide desde la captura)
+            self.metrics.record('capture', time.perf_counter() - capture_time)
             
             # Procesar frame
             try:
-                processed_data = self.process_frame(frame)
+                processed_data = self.process_frame(frame, capture_time)
+                if self.recorder is not None:
+                    self.recorder.record(processed_data)
                 
-                # Añadir a cola para WebSocket (con manejo de overflow)
-                if self.data_queue.full():
-                    try:
-                        self.data_queue.get_nowait()  # Remover dato viejo
-                    except queue.Empty:
-                        pass
+                # Entregar al sender de WebSocket (reemplaza al dato anterior si no se envió)
+                processed_data['_queued_at'] = time.perf_counter()
+                self.latest_data.publish(processed_data)
                 
-                try:
-                    self.data_queue.put_nowait(processed_data)
-                except queue.Full:
-                    pass  # Ignorar si está llena
+                if self.headless:
+                    continue
                 
                 # Mostrar frame con anotaciones menos frecuente (cada 3 frames)
                 skip_display += 1
@@ -522,9 +849,14 @@ class VisualMonitor:
                 print(f"❌ Error procesando frame: {e}")
                 continue
         
-        self.cap.release()
-        cv2.destroyAllWindows()
+        self.grabber.release()
+        if not self.headless:
+            cv2.destroyAllWindows()
         print("📹 Cámara detenida correctamente")
+        print(f"🎞️  Captura: {self.grabber.summary()}")
+        print("📊 Estado de los workers de detección:")
+        self.detector_pool.print_stats(self.frame_count)
+        print(f"🗓️  Planificador: {self.scheduler.summary()}")
 
     def draw_annotations_fast(self, frame: np.ndarray, data: Dict):
         """Dibuja anotaciones OPTIMIZADAS para visualización rápida"""
@@ -575,10 +907,12 @@ class VisualMonitor:
             cv2.putText(frame, text, (10, 30 + i*25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
 
     async def websocket_sender(self):
-        """Hilo OPTIMIZADO para envío de datos via WebSocket"""
-        last_send_time = 0
+        """Envía el último dato de cada cámara; despierta solo con datos nuevos o por el límite de frecuencia"""
+        last_send_time = 0.0
         min_interval = 0.050  # Máximo 20 FPS para WebSocket (menos carga de red)
-        last_data = None  # Guardar último dato enviado
+        keepalive = 1.0  # Sin datos nuevos, reenviar el último dato cada segundo
+        last_data = {}  # Último dato enviado por cámara (None con una sola cámara)
+        self.latest_data.bind()
         
         # Datos por defecto para enviar mientras no hay datos reales
         default_data = {
@@ -597,38 +931,44 @@ class VisualMonitor:
         
         while True:
             try:
+                # Controlar frecuencia de envío: dormir hasta que toque, sin sondear
+                delay = last_send_time + min_interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                
+                # El dato más reciente de cada cámara (los intermedios ya se reemplazaron)
+                latest_data = await self.latest_data.wait(timeout=keepalive)
                 current_time = time.time()
                 
-                # Controlar frecuencia de envío
-                if current_time - last_send_time >= min_interval:
-                    # Obtener el dato más reciente (descartar intermedios)
-                    latest_data = None
-                    while not self.data_queue.empty():
-                        try:
-                            latest_data = self.data_queue.get_nowait()
-                        except queue.Empty:
-                            break
-                    
-                    # Si hay nuevos datos, usarlos. Si no, usar los últimos o default
-                    if latest_data:
-                        last_data = latest_data
-                        data_to_send = latest_data
-                    elif last_data:
-                        # Actualizar timestamp del último dato
-                        last_data['timestamp'] = current_time
-                        data_to_send = last_data
-                    else:
-                        # Usar datos por defecto con timestamp actual
-                        default_data['timestamp'] = current_time
-                        data_to_send = default_data
-                    
-                    # Siempre enviar si hay clientes conectados
-                    if self.connected_clients:
+                for camera_id, data in latest_data.items():
+                    self.metrics.record('queue', time.perf_counter() - data['_queued_at'])
+                    last_data[camera_id] = data
+                if latest_data:
+                    to_send = list(latest_data.items())
+                elif last_data:
+                    # Keepalive: el último dato de cada cámara con timestamp actual; copia
+                    # superficial porque otros hilos (p. ej. el grabador) aún lo referencian
+                    to_send = [(camera_id, {**data, 'timestamp': current_time})
+                               for camera_id, data in last_data.items()]
+                else:
+                    # Usar datos por defecto con timestamp actual
+                    default_data['timestamp'] = current_time
+                    to_send = [(None, default_data)]
+                
+                # Siempre enviar si hay clientes conectados
+                if len(self.broadcaster):
+                    for camera_id, data_to_send in to_send:
+                        start = time.perf_counter()
                         compressed_data = self.compress_data_for_websocket(data_to_send)
+                        compressed_at = time.perf_counter()
                         await self.broadcast_data(compressed_data)
-                        last_send_time = current_time
-                        
-                await asyncio.sleep(0.010)  # Check más frecuente pero envío controlado
+                        broadcast_at = time.perf_counter()
+                        self.metrics.record('compression', compressed_at - start)
+                        self.metrics.record('broadcast', broadcast_at - compressed_at)
+                        if camera_id in latest_data:
+                            self.metrics.record('capture_to_broadcast',
+                                                broadcast_at - latest_data[camera_id]['_capture_time'])
+                    last_send_time = time.perf_counter()
                 
             except Exception as e:
                 print(f"❌ Error enviando datos: {e}")
@@ -650,18 +990,27 @@ class VisualMonitor:
             'frame_size': data.get('frame_size', [320, 240]),
             'pose_detected': data.get('pose_detected', False)  # Añadir campo que faltaba
         }
+        if data.get('camera_id') is not None:
+            compressed['camera_id'] = data['camera_id']
+        if data.get('warming'):
+            compressed['warming'] = data['warming']  # Detectores que aún cargan su modelo
         
         # Solo incluir detecciones de personas (más relevantes)
         detections = data.get('detections', [])
-        person_detections = [
-            {
-                'class': det['class'],
-                'confidence': round(det['confidence'], 2),
-                'center': [round(det['center'][0]), round(det['center'][1])]
-            }
-            for det in detections 
-            if det.get('class') == 'person' and det.get('confidence', 0) > 0.6
-        ]
+        if isinstance(detections, YoloDetections):
+            # Filtrar sobre el array: solo se crean los dicts de las personas enviadas
+            detections = detections.select(self.person_class_id, 0.6)
+        person_detections = []
+        for det in detections:
+            if det.get('class') == 'person' and det.get('confidence', 0) >= 0.6:
+                compact = {
+                    'class': det['class'],
+                    'confidence': round(det['confidence'], 2),
+                    'center': [round(det['center'][0]), round(det['center'][1])]
+                }
+                if 'track_id' in det:
+                    compact['track_id'] = det['track_id']  # Con --track cada persona conserva su id
+                person_detections.append(compact)
         compressed['detections'] = person_detections
         
         # Colores dominantes simplificados
@@ -731,11 +1080,70 @@ class VisualMonitor:
             import traceback
             traceback.print_exc()
         finally:
-            if self.cap.isOpened():
-                self.cap.release()
+            self.shutdown()
+
+    def shutdown(self):
+        """Detiene workers y fuente, y guarda las métricas"""
+        self.running = False
+        self.detector_pool.stop()
+        try:
+            metrics_path = self.dump_metrics()
+            print(f"📈 Métricas guardadas en {os.path.abspath(metrics_path)}")
+            self.metrics.print_summary()
+        except Exception as e:
+            print(f"⚠️  No se pudieron guardar las métricas: {e}")
+        if self.grabber is not None:
+            self.grabber.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"📼 Grabación: {self.recorder.summary()}")
+        if self.cap.isOpened():
+            self.cap.release()
+        if not self.headless:
             cv2.destroyAllWindows()
-            print("✅ Monitor detenido correctamente")
+        print("✅ Monitor detenido correctamente")
 
 if __name__ == "__main__":
-    monitor = VisualMonitor()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Monitor de Actividad Visual 3D")
+    parser.add_argument('--mode', choices=['threads', 'processes'], default='threads',
+                        help="Ejecución de detectores: hilos (por defecto) o un proceso por detector")
+    parser.add_argument('--scheduler', choices=['fixed', 'adaptive'], default='fixed',
+                        help="Intervalos fijos (por defecto) o planificador adaptativo por presupuesto")
+    parser.add_argument('--budget-ms', type=float, default=25.0,
+                        help="Milisegundos de inferencia por frame para el planificador adaptativo")
+    parser.add_argument('--source', nargs='+', default=['0'],
+                        help="Índice de cámara, video, carpeta de imágenes o 'synthetic[:AnchoxAlto]'; "
+                             "varias fuentes activan el monitor multicámara (YOLO por lotes)")
+    parser.add_argument('--headless', action='store_true', help="No mostrar ventana de OpenCV")
+    parser.add_argument('--no-realtime', action='store_true',
+                        help="Leer videos/imágenes/sintéticos tan rápido como sea posible")
+    parser.add_argument('--loop', action='store_true', help="Repetir videos o carpetas al terminar")
+    parser.add_argument('--cascade', action='store_true',
+                        help="Ejecutar pose/manos/caras solo sobre las personas detectadas por YOLO")
+    parser.add_argument('--track', action='store_true',
+                        help="Propagar las cajas de YOLO con flujo óptico entre ejecuciones (track_id estable)")
+    parser.add_argument('--yolo-interval', type=int, default=3,
+                        help="Frames entre ejecuciones de YOLO (con --track se puede subir sin perder precisión)")
+    parser.add_argument('--detectors', nargs='+', choices=['yolo', 'pose', 'hands', 'faces', 'colors'],
+                        help="Detectores que corren sin clientes suscritos (por defecto todos); "
+                             "los modelos que nadie necesita no se cargan")
+    parser.add_argument('--record', metavar='DIR',
+                        help="Grabar los datos procesados en bloques .npz (leer con recorder.py)")
+    args = parser.parse_args()
+    
+    sources = [open_source(spec, realtime=not args.no_realtime, loop=args.loop) for spec in args.source]
+    if len(sources) > 1:
+        from multi_camera import MultiCameraMonitor
+        if args.mode == 'processes':
+            print("⚠️  El monitor multicámara comparte YOLO en hilos; se ignora --mode processes")
+        monitor = MultiCameraMonitor(sources, scheduler=args.scheduler, budget_ms=args.budget_ms,
+                                     headless=args.headless, cascade=args.cascade, tracking=args.track,
+                                     yolo_interval=args.yolo_interval, record=args.record)
+    else:
+        monitor = VisualMonitor(execution_mode=args.mode, scheduler=args.scheduler,
+                                budget_ms=args.budget_ms, source=sources[0], headless=args.headless,
+                                cascade=args.cascade, tracking=args.track, yolo_interval=args.yolo_interval,
+                                record=args.record, detectors=args.detectors)
     monitor.run()
@@ -0,0 +1,102 @@
+"""
+Métricas de latencia por etapa para el Monitor Visual 3D
+
+Cada etapa del pipeline (captura, detectores, movimiento, colores, cola,
+compresión, broadcast, envío) guarda sus últimas muestras en un histograma
+móvil. Registrar una muestra es un append O(1) a un deque; los percentiles
+solo se calculan al pedir un resumen.
+"""
+
+import json
+import time
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+# Etapas en el orden del pipeline (se aceptan otras)
+STAGES = [
+    'capture',          # Edad del frame al procesarlo (captura en FrameGrabber -> process_frame)
+    'yolo', 'pose', 'hands', 'faces', 'colors',
+    'movement',         # calculate_movement_intensity_optimized
+    'tracking',         # Propagación de cajas con flujo óptico
+    'process_frame',    # process_frame completo en el hilo de cámara
+    'queue',            # Espera en LatestValue hasta que el sender lo toma
+    'compression',      # compress_data_for_websocket
+    'broadcast',        # Serialización + encolado a clientes
+    'send',             # websocket.send por cliente
+    'capture_to_broadcast'  # Extremo a extremo: captura -> broadcast
+]
+
+
+class RollingHistogram:
+    def __init__(self, size: int = 512):
+        """Ventana de las últimas `size` muestras (en segundos)"""
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self) -> Dict:
+        """Percentiles en milisegundos sobre la ventana actual"""
+        samples = np.fromiter(list(self.samples), dtype=np.float64) * 1000
+        if samples.size == 0:
+            return {'count': self.count}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+        return {
+            'count': self.count,
+            'mean_ms': round(float(samples.mean()), 3),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+            'max_ms': round(float(samples.max()), 3)
+        }
+
+
+class PipelineMetrics:
+    def __init__(self, window: int = 512):
+        """
+        Histogramas móviles por etapa
+
+        Args:
+            window: Muestras que conserva cada etapa
+        """
+        self.window = window
+        self.histograms: Dict[str, RollingHistogram] = {name: RollingHistogram(window) for name in STAGES}
+        self.started_at = time.time()
+
+    def record(self, stage: str, seconds: float):
+        """Registra la duración de una etapa (seguro desde cualquier hilo)"""
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms.setdefault(stage, RollingHistogram(self.window))
+        histogram.record(seconds)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Resumen p50/p95/p99 de las etapas con muestras"""
+        return {
+            name: histogram.summary()
+            for name, histogram in list(self.histograms.items())
+            if histogram.count > 0
+        }
+
+    def dump(self, path: str, extra: Dict = None):
+        """Guarda el resumen en un archivo JSON"""
+        report = {
+            'started_at': self.started_at,
+            'dumped_at': time.time(),
+            'stages': self.snapshot()
+        }
+        if extra:
+            report.update(extra)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        return path
+
+    def print_summary(self):
+        for name, s in self.snapshot().items():
+            if 'p50_ms' in s:
+                print(f"   {name:>20}: p50={s['p50_ms']:.2f}ms p95={s['p95_ms']:.2f}ms "
+                      f"p99={s['p99_ms']:.2f}ms (n={s['count']})")
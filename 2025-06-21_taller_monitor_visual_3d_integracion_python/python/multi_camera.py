@@ -0,0 +1,252 @@
+"""
+Monitor Visual 3D con varias cámaras
+
+Un solo proceso atiende varias fuentes. El modelo YOLO se carga una vez: un
+BatchedDetectorWorker recoge el último frame de cada cámara y los infiere
+como un lote. MediaPipe (pose, manos, caras) guarda estado de seguimiento
+entre frames, así que cada cámara tiene sus propios grafos ligeros en su
+propio DetectorPool. Cada cámara tiene además su planificador, su caché y
+su cálculo de movimiento. Los datos salen por el mismo WebSocket con un
+campo camera_id.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import cv2
+import numpy as np
+
+from client_sessions import ClientBroadcaster
+from detector_workers import BatchedDetectorWorker, CameraDetectorPool, DetectorPool
+from frame_grabber import FrameGrabber
+from frame_sources import open_source
+from latest_value import LatestValue
+from main import VisualMonitor
+from metrics import PipelineMetrics
+from recorder import StreamRecorder
+
+LOCAL_DETECTORS = ['pose', 'hands', 'faces']
+
+
+class MultiCameraMonitor(VisualMonitor):
+    def __init__(self, sources: List, scheduler: str = 'fixed', budget_ms: float = 25.0,
+                 headless: bool = False, max_batch: int = 8, cascade: bool = False,
+                 tracking: bool = False, yolo_interval: int = 3, record: Optional[str] = None):
+        """
+        Inicializa un monitor para varias fuentes con YOLO compartido por lotes
+
+        Args:
+            sources: Especificaciones o instancias de FrameSource (una por cámara)
+            scheduler: 'fixed' o 'adaptive' (uno por cámara)
+            budget_ms: Presupuesto de inferencia por frame del planificador adaptativo
+            headless: No abrir ventanas de OpenCV
+            max_batch: Frames por lote de YOLO como máximo
+            cascade: MediaPipe solo sobre las personas que YOLO encontró en cada cámara
+            tracking: Propagar las cajas de YOLO con flujo óptico en cada cámara
+            yolo_interval: Frames entre ejecuciones de YOLO por cámara
+            record: Carpeta donde grabar los datos de todas las cámaras (None = no grabar)
+        """
+        # No se llama a VisualMonitor.__init__: abriría una sola fuente y su propio pool
+        self.execution_mode = 'threads'
+        self.headless = headless
+        self.running = True
+        self.cascade = cascade
+        self.default_detectors = None
+        # YOLO compartido: se carga antes de arrancar las cámaras; MediaPipe, en los workers de cada canal
+        self._load_models(['yolo'])
+
+        self.metrics = PipelineMetrics(window=512)
+        self.yolo_worker = BatchedDetectorWorker('yolo', self.detect_objects_yolo_batch, max_batch=max_batch)
+
+        # Un canal por cámara: fuente, planificador, caché, movimiento y MediaPipe propios
+        self.channels: List[VisualMonitor] = []
+        for camera_id, source in enumerate(sources):
+            channel = VisualMonitor.detectors_only([])  # MediaPipe se carga en su worker al usarse
+            channel.camera_id = camera_id
+            channel.person_class_id = self.person_class_id  # Resultados del YOLO compartido
+            channel.cap = open_source(source)
+            channel.grabber = None
+            channel.headless = headless
+            channel.cascade = cascade
+            channel.metrics = self.metrics
+            channel._init_frame_state(scheduler, budget_ms, yolo_interval, tracking)
+            functions = channel.detector_functions()
+            loaders = channel.model_loaders()
+            channel.detector_pool = CameraDetectorPool(
+                camera_id,
+                DetectorPool({name: functions[name] for name in LOCAL_DETECTORS},
+                             loaders={name: loaders[name] for name in LOCAL_DETECTORS}),
+                {'yolo': self.yolo_worker}
+            )
+            self.channels.append(channel)
+
+        # Último dato de cada cámara para el sender; colas de envío con espacio para un dato por cámara
+        self.latest_data = LatestValue()
+        self.websocket_server = None
+        self.broadcaster = ClientBroadcaster(base_interval=0.050, queue_size=4 * len(self.channels),
+                                             keyframe_interval=40, metrics=self.metrics)
+
+        # Una sola grabación para todas las cámaras (cada fila lleva su camera_id)
+        self.recorder = StreamRecorder(record) if record else None
+
+        self.yolo_worker.start()
+        for channel in self.channels:
+            channel.detector_pool.start()
+
+        print("🎯 Monitor Visual MULTICÁMARA inicializado correctamente")
+        for channel in self.channels:
+            print(f"📷 Cámara {channel.camera_id}: {channel.cap.describe()}")
+        print(f"🤖 YOLO compartido por lotes (hasta {max_batch} frames) + MediaPipe por cámara")
+
+    def set_active_detectors(self, names: Optional[Iterable[str]]):
+        """Las suscripciones de los clientes se aplican a todas las cámaras"""
+        for channel in self.channels:
+            channel.set_active_detectors(names)
+
+    def detector_states(self) -> Dict[str, str]:
+        """Estado de cada detector: listo solo cuando lo está en todas las cámaras"""
+        states: Dict[str, str] = {}
+        order = ['failed', 'unloaded', 'warming', 'ready']
+        for channel in self.channels:
+            for name, state in channel.detector_states().items():
+                if name not in states or order.index(state) < order.index(states[name]):
+                    states[name] = state
+        return states
+
+    @property
+    def frame_count(self) -> int:
+        return sum(channel.frame_count for channel in self.channels)
+
+    def get_metrics_report(self) -> Dict:
+        """Latencias por etapa, estado por cámara, lotes de YOLO y clientes"""
+        return {
+            "frame_count": self.frame_count,
+            "stages": self.metrics.snapshot(),
+            "cameras": {
+                channel.camera_id: {
+                    "frame_count": channel.frame_count,
+                    "detectors": channel.detector_pool.get_stats(channel.frame_count),
+                    "cascade": channel.cascade_stats if self.cascade else None,
+                    "tracking": channel.tracker.stats if channel.tracker is not None else None,
+                    "capture": channel.grabber.get_stats() if channel.grabber is not None else None
+                }
+                for channel in self.channels
+            },
+            "yolo_batches": self.yolo_worker.get_stats(),
+            "recorder": self.recorder.stats if self.recorder is not None else None,
+            "handoff": self.latest_data.stats,
+            "clients": self.broadcaster.metrics()
+        }
+
+    def channel_thread(self, channel: VisualMonitor, latest_frames: Dict):
+        """Captura y procesa una cámara; deja el último frame anotado para la ventana"""
+        channel.grabber = FrameGrabber(channel.cap, name=f"grabber-{channel.camera_id}").start()
+        last_frame_id = 0
+        while self.running:
+            grabbed = channel.grabber.wait(last_frame_id, timeout=0.5)
+            if grabbed is None:
+                if channel.grabber.exhausted:
+                    print(f"🏁 Cámara {channel.camera_id}: fuente terminada")
+                    break
+                continue
+            last_frame_id = grabbed.frame_id
+            frame, capture_time = grabbed.frame, grabbed.capture_time
+            self.metrics.record('capture', time.perf_counter() - capture_time)
+
+            try:
+                processed_data = channel.process_frame(frame, capture_time)
+                processed_data['camera_id'] = channel.camera_id
+                if self.recorder is not None:
+                    self.recorder.record(processed_data)
+
+                processed_data['_queued_at'] = time.perf_counter()
+                self.latest_data.publish(processed_data, key=channel.camera_id)
+
+                if not self.headless:
+                    latest_frames[channel.camera_id] = (frame, processed_data)
+            except Exception as e:
+                print(f"❌ Error procesando frame de cámara {channel.camera_id}: {e}")
+
+        channel.grabber.release()
+
+    def camera_thread(self):
+        """Arranca un hilo por cámara y, con ventana, muestra todas en una cuadrícula"""
+        print(f"📹 Iniciando captura de {len(self.channels)} cámaras...")
+        latest_frames: Dict = {}
+        threads = [
+            threading.Thread(target=self.channel_thread, args=(channel, latest_frames),
+                             name=f"camera-{channel.camera_id}", daemon=True)
+            for channel in self.channels
+        ]
+        for thread in threads:
+            thread.start()
+
+        # HighGUI no es seguro entre hilos: solo este hilo dibuja
+        while any(thread.is_alive() for thread in threads):
+            if self.headless:
+                time.sleep(0.1)
+                continue
+            tiles = []
+            for channel in self.channels:
+                if channel.camera_id in latest_frames:
+                    frame, data = latest_frames[channel.camera_id]
+                    display_frame = frame.copy()
+                    channel.draw_annotations_fast(display_frame, data)
+                    tile = cv2.resize(display_frame, (320, 240))
+                    cv2.putText(tile, f"Cam {channel.camera_id}", (10, 230),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                else:
+                    tile = np.zeros((240, 320, 3), dtype=np.uint8)
+                tiles.append(tile)
+            cv2.imshow('Monitor Visual MULTICÁMARA - Q para salir', self._grid(tiles))
+            key = cv2.waitKey(100) & 0xFF
+            if key == ord('q') or key == 27:
+                self.running = False
+                break
+
+        for thread in threads:
+            thread.join(timeout=1.0)
+        if not self.headless:
+            cv2.destroyAllWindows()
+        print("📹 Cámaras detenidas correctamente")
+        for channel in self.channels:
+            print(f"📊 Cámara {channel.camera_id} ({channel.frame_count} frames):")
+            if channel.grabber is not None:
+                print(f"   🎞️  Captura: {channel.grabber.summary()}")
+            channel.detector_pool.print_stats(channel.frame_count)
+        batches = self.yolo_worker.get_stats()
+        print(f"📦 YOLO: {batches['batches']} lotes, {batches['mean_batch_size']:.2f} frames por lote")
+
+    @staticmethod
+    def _grid(tiles: List[np.ndarray]) -> np.ndarray:
+        """Coloca las vistas en filas de hasta 3"""
+        columns = min(3, len(tiles))
+        blank = np.zeros_like(tiles[0])
+        tiles = tiles + [blank] * (-len(tiles) % columns)
+        rows = [np.hstack(tiles[i:i + columns]) for i in range(0, len(tiles), columns)]
+        return np.vstack(rows)
+
+    def shutdown(self):
+        """Detiene los workers de todas las cámaras y guarda las métricas"""
+        self.running = False
+        for channel in self.channels:
+            channel.detector_pool.stop()
+        self.yolo_worker.stop()
+        try:
+            metrics_path = self.dump_metrics()
+            print(f"📈 Métricas guardadas en {os.path.abspath(metrics_path)}")
+            self.metrics.print_summary()
+        except Exception as e:
+            print(f"⚠️  No se pudieron guardar las métricas: {e}")
+        for channel in self.channels:
+            if channel.grabber is not None:
+                channel.grabber.stop()
+            channel.cap.release()
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"📼 Grabación: {self.recorder.summary()}")
+        if not self.headless:
+            cv2.destroyAllWindows()
+        print("✅ Monitor detenido correctamente")
@@ -0,0 +1,493 @@
+"""
+Ejecución de detectores en procesos separados para el Monitor Visual 3D
+
+Cada detector (YOLO, pose, manos, caras y k-means de colores) corre en su
+propio proceso, así que no compiten por el GIL. Los frames se publican una
+sola vez en un anillo de memoria compartida (multiprocessing.shared_memory);
+a los workers solo se les envía el índice de ranura. Los resultados vuelven
+por un Pipe como bytes con un formato fijo (cabecera struct + float32),
+sin serializar arrays con pickle.
+
+Cada proceso se lanza la primera vez que se le entrega un frame (o con
+`load`), así que los modelos que nadie usa no se cargan. Hasta que termina
+su inferencia de calentamiento el detector está en estado 'warming'.
+"""
+
+import multiprocessing as mp
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from detector_workers import FAILED, READY, UNLOADED, WARMING, DetectorResult
+from yolo_postprocess import YoloDetections
+
+# Límites del formato fijo de resultados
+MAX_DETECTIONS = 32
+MAX_FACES = 8
+MAX_HANDS = 2
+MAX_COLORS = 3
+POSE_LANDMARKS = 33
+HAND_LANDMARKS = 21
+GESTURES = ['fist', 'open_hand', 'pointing', 'peace', 'partial']
+
+# Forma del anillo si hay que lanzar los workers antes de recibir ningún frame
+DEFAULT_FRAME_SHAPE = (240, 320, 3)
+
+# Mensaje padre -> worker: frame_id, ranura (frame_id < 0 = detener)
+FRAME_MSG = struct.Struct('<qi')
+# Mensaje worker -> padre: frame_id, count (-1 = frame omitido), descartados, obsoletos, latencia
+RESULT_HEADER = struct.Struct('<qiiif')
+
+# Forma del payload float32 por detector
+PAYLOAD_SHAPES = {
+    'yolo': (MAX_DETECTIONS, 6),                       # x1, y1, x2, y2, conf, clase
+    'pose': (POSE_LANDMARKS, 4),                        # x, y, z, visibilidad
+    'hands': (MAX_HANDS, HAND_LANDMARKS * 3 + 1),       # landmarks + código de gesto
+    'faces': (MAX_FACES, 5),                            # x1, y1, x2, y2, conf
+    'colors': (MAX_COLORS, 3)                           # RGB
+}
+
+
+class SharedFrameRing:
+    def __init__(self, frame_shape: Tuple[int, int, int], slots: int = 8,
+                 name: Optional[str] = None, create: bool = True):
+        """
+        Anillo de frames en memoria compartida
+
+        Args:
+            frame_shape: Forma (alto, ancho, canales) de cada frame
+            slots: Número de ranuras del anillo
+            name: Nombre del bloque compartido (para adjuntarse desde un worker)
+            create: True en el proceso que publica, False en los workers
+        """
+        self.frame_shape = tuple(frame_shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.frame_shape))
+        header_bytes = slots * 8
+        self.shm = shared_memory.SharedMemory(name=name, create=create,
+                                              size=header_bytes + slots * frame_bytes)
+        # Secuencia por ranura: frame_id publicado, -1 mientras se escribe
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        self.frames = np.ndarray((slots,) + self.frame_shape, dtype=np.uint8,
+                                 buffer=self.shm.buf, offset=header_bytes)
+        if create:
+            self.seqs[:] = -1
+        self._next_slot = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def publish(self, frame: np.ndarray, frame_id: int) -> int:
+        """Copia el frame a la siguiente ranura y devuelve su índice"""
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        if frame.shape != self.frame_shape:
+            frame = cv2.resize(frame, (self.frame_shape[1], self.frame_shape[0]))
+        self.seqs[slot] = -1
+        self.frames[slot] = frame
+        self.seqs[slot] = frame_id
+        return slot
+
+    def read(self, slot: int, frame_id: int) -> Optional[np.ndarray]:
+        """Copia el frame de una ranura, o None si ya fue sobrescrito"""
+        if self.seqs[slot] != frame_id:
+            return None
+        frame = self.frames[slot].copy()
+        if self.seqs[slot] != frame_id:  # Sobrescrito durante la copia
+            return None
+        return frame
+
+    def close(self):
+        # Soltar las vistas numpy antes de cerrar el bloque
+        del self.seqs
+        del self.frames
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def encode_result(name: str, data, class_ids: Optional[Dict[str, int]] = None) -> Tuple[int, np.ndarray]:
+    """Convierte la salida de un detector al payload fijo (count, array float32)"""
+    payload = np.zeros(PAYLOAD_SHAPES[name], dtype=np.float32)
+    count = 0
+
+    if name == 'yolo':
+        detections = data['detections']
+        if isinstance(detections, YoloDetections):
+            # Copia directa de columnas: sin pasar por los dicts
+            array = detections.array[:MAX_DETECTIONS]
+            count = len(array)
+            payload[:count, :4] = array['bbox']
+            payload[:count, 4] = array['confidence']
+            payload[:count, 5] = array['class_id']
+            return count, payload
+        for det in detections[:MAX_DETECTIONS]:
+            payload[count, :4] = det['bbox']
+            payload[count, 4] = det['confidence']
+            payload[count, 5] = class_ids[det['class']]
+            count += 1
+    elif name == 'pose':
+        if data['pose_detected']:
+            count = 1
+            payload[:, :3] = np.asarray(data['landmarks'], dtype=np.float32).reshape(-1, 3)
+            payload[:, 3] = data['visibility_scores']
+    elif name == 'hands':
+        for landmarks, gesture in list(zip(data['hands_landmarks'], data['gestures']))[:MAX_HANDS]:
+            payload[count, :-1] = landmarks
+            payload[count, -1] = GESTURES.index(gesture)
+            count += 1
+    elif name == 'faces':
+        for face in data['face_positions'][:MAX_FACES]:
+            payload[count, :4] = face['bbox']
+            payload[count, 4] = face['confidence']
+            count += 1
+    elif name == 'colors':
+        for color in data[:MAX_COLORS]:
+            payload[count] = color
+            count += 1
+
+    return count, payload
+
+
+def decode_result(name: str, count: int, payload: np.ndarray,
+                  class_names: Optional[Dict[int, str]] = None,
+                  scale: Tuple[float, float] = (1.0, 1.0)):
+    """
+    Reconstruye la misma estructura que devuelve el detector en modo hilos
+
+    `scale` (sx, sy) devuelve las cajas en píxeles al tamaño del frame original
+    cuando el anillo tuvo que redimensionarlo; pose y manos ya vienen normalizadas.
+    """
+    if scale != (1.0, 1.0) and name in ('yolo', 'faces'):
+        payload = payload.copy()
+        payload[:count, [0, 2]] *= scale[0]
+        payload[:count, [1, 3]] *= scale[1]
+    if name == 'yolo':
+        detections = []
+        people_count = 0
+        for x1, y1, x2, y2, conf, cls in payload[:count].tolist():
+            class_name = class_names[int(cls)]
+            detections.append({
+                'class': class_name,
+                'confidence': conf,
+                'bbox': [x1, y1, x2, y2],
+                'center': [(x1 + x2) / 2, (y1 + y2) / 2],
+                'area': (x2 - x1) * (y2 - y1)
+            })
+            if class_name == 'person':
+                people_count += 1
+        return {
+            'people_count': people_count,
+            'objects_count': len(detections) - people_count,
+            'detections': detections
+        }
+    if name == 'pose':
+        if count == 0:
+            return {'pose_detected': False, 'landmarks': [], 'visibility_scores': []}
+        return {
+            'pose_detected': True,
+            'landmarks': payload[:, :3].ravel().tolist(),
+            'visibility_scores': payload[:, 3].tolist()
+        }
+    if name == 'hands':
+        return {
+            'hands_count': count,
+            'hands_landmarks': [payload[i, :-1].tolist() for i in range(count)],
+            'gestures': [GESTURES[int(payload[i, -1])] for i in range(count)]
+        }
+    if name == 'faces':
+        faces = []
+        for x1, y1, x2, y2, conf in payload[:count].tolist():
+            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+            faces.append({
+                'center': [(x1 + x2) // 2, (y1 + y2) // 2],
+                'bbox': [x1, y1, x2, y2],
+                'confidence': conf
+            })
+        return {'faces_count': count, 'face_positions': faces}
+    if name == 'colors':
+        return payload[:count].astype(int).tolist()
+    raise ValueError(f"Detector desconocido: {name}")
+
+
+def _detector_process_main(name: str, ring_name: str, frame_shape: Tuple[int, int, int],
+                           slots: int, conn):
+    """Bucle de un proceso worker: carga su modelo y procesa la ranura más reciente"""
+    # Import diferido: el modelo solo se carga dentro de este proceso
+    from main import VisualMonitor
+
+    monitor = VisualMonitor.detectors_only([name])
+    detect_fn = monitor.detector_functions()[name]
+    ring = SharedFrameRing(frame_shape, slots, name=ring_name, create=False)
+
+    # Calentamiento antes del handshake: el padre ve 'warming' hasta que termina
+    detect_fn(np.zeros(frame_shape, dtype=np.uint8))
+
+    # Handshake: único mensaje con pickle (nombres de clases de YOLO)
+    class_ids = None
+    if name == 'yolo':
+        class_names = dict(monitor.yolo_model.names)
+        class_ids = {v: k for k, v in class_names.items()}
+        conn.send(class_names)
+    else:
+        conn.send(None)
+
+    dropped = 0
+    stale = 0
+    try:
+        while True:
+            # Esperar un mensaje y quedarse solo con el más reciente
+            message = conn.recv_bytes()
+            while conn.poll():
+                message = conn.recv_bytes()
+                dropped += 1
+            frame_id, slot = FRAME_MSG.unpack(message)
+            if frame_id < 0:
+                break
+
+            frame = ring.read(slot, frame_id)
+            if frame is None:
+                stale += 1
+                conn.send_bytes(RESULT_HEADER.pack(frame_id, -1, dropped, stale, 0.0))
+                continue
+
+            start = time.perf_counter()
+            try:
+                data = detect_fn(frame)
+                count, payload = encode_result(name, data, class_ids)
+            except Exception as e:
+                print(f"❌ Error en proceso {name}: {e}")
+                conn.send_bytes(RESULT_HEADER.pack(frame_id, -1, dropped, stale, 0.0))
+                continue
+            latency = time.perf_counter() - start
+            conn.send_bytes(RESULT_HEADER.pack(frame_id, count, dropped, stale, latency) + payload.tobytes())
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        ring.close()
+
+
+class _ProcessWorkerHandle:
+    """Estado del lado del padre para un proceso worker"""
+
+    def __init__(self, name: str, process, conn):
+        self.name = name
+        self.process = process
+        self.conn = conn
+        self.ready = False
+        self.spawned_at = time.perf_counter()  # Para medir carga + calentamiento
+        self.class_names = None
+        self.result: Optional[DetectorResult] = None
+        self.latest_submitted_id = 0
+        self.latest_answered_id = 0
+        self.stats = {
+            'submitted': 0,
+            'processed': 0,
+            'dropped': 0,
+            'stale': 0,
+            'errors': 0,
+            'last_latency': 0.0,
+            'frame_lag': 0,
+            'load_time': 0.0      # Desde el lanzamiento hasta el handshake (carga + calentamiento)
+        }
+
+
+class ProcessDetectorPool:
+    def __init__(self, names: List[str], frame_shape: Optional[Tuple[int, int, int]] = None,
+                 slots: int = 8):
+        """
+        Un proceso por detector, con la misma interfaz que DetectorPool
+
+        Args:
+            names: Detectores a ejecutar ('yolo', 'pose', 'hands', 'faces', 'colors')
+            frame_shape: Forma de los frames del anillo (None = la del primer frame entregado);
+                los frames de otro tamaño se redimensionan y sus cajas se reescalan al volver
+            slots: Ranuras del anillo compartido
+        """
+        self._names = list(names)
+        self.frame_shape = tuple(frame_shape) if frame_shape is not None else None
+        self.slots = slots
+        self.ring: Optional[SharedFrameRing] = None
+        self.workers: Dict[str, _ProcessWorkerHandle] = {}
+        self._pending_loads: List[str] = []  # Pedidos con load() antes de conocer el tamaño
+        self._frame_scales: Dict[int, Tuple[float, float]] = {}  # frame_id -> (sx, sy) si se redimensionó
+        self._ctx = mp.get_context('spawn')  # Seguro con hilos activos y en Windows
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def start(self):
+        """Crea el anillo si ya se conoce el tamaño; los procesos se lanzan al usarse por primera vez"""
+        if self.frame_shape is not None:
+            self._create_ring(self.frame_shape)
+        print(f"🧩 Procesos de detección bajo demanda: {', '.join(self._names)}")
+
+    def _create_ring(self, frame_shape: Tuple[int, ...]):
+        """Crea el anillo compartido y lanza los workers que se pidieron antes"""
+        self.frame_shape = tuple(frame_shape)
+        self.ring = SharedFrameRing(self.frame_shape, self.slots)
+        pending, self._pending_loads = self._pending_loads, []
+        self.load(pending)
+
+    def _spawn(self, name: str) -> _ProcessWorkerHandle:
+        """Lanza el proceso de un detector (carga y calentamiento ocurren dentro)"""
+        parent_conn, child_conn = self._ctx.Pipe(duplex=True)
+        process = self._ctx.Process(
+            target=_detector_process_main,
+            args=(name, self.ring.name, self.frame_shape, self.slots, child_conn),
+            name=f"detector-{name}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        worker = _ProcessWorkerHandle(name, process, parent_conn)
+        self.workers[name] = worker
+        print(f"🧩 Proceso de detección lanzado: {name}")
+        return worker
+
+    def load(self, names: Optional[List[str]] = None):
+        """Lanza en paralelo los procesos indicados que aún no existen (None = todos)"""
+        for name in self._names if names is None else names:
+            if name in self.workers:
+                continue
+            if self.ring is None:
+                # Sin anillo todavía: se lanza cuando llegue el primer frame
+                if name not in self._pending_loads:
+                    self._pending_loads.append(name)
+            else:
+                self._spawn(name)
+
+    def wait_ready(self, timeout: float = 120.0) -> bool:
+        """Lanza todos los workers y espera a que hayan cargado y calentado su modelo"""
+        if self.ring is None:
+            self._create_ring(DEFAULT_FRAME_SHAPE)  # Aún sin frames: se reescalan al volver
+        self.load()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.collect()
+            if all(worker.ready for worker in self.workers.values()):
+                return True
+            time.sleep(0.05)
+        return False
+
+    def states(self) -> Dict[str, str]:
+        """Estado de cada detector ('unloaded', 'warming', 'ready' o 'failed')"""
+        states = {}
+        for name in self._names:
+            worker = self.workers.get(name)
+            if worker is None:
+                states[name] = UNLOADED
+            elif not worker.process.is_alive() and worker.process.exitcode not in (None, 0):
+                states[name] = FAILED
+            else:
+                states[name] = READY if worker.ready else WARMING
+        return states
+
+    def stop(self):
+        for worker in self.workers.values():
+            try:
+                worker.conn.send_bytes(FRAME_MSG.pack(-1, 0))
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self.workers.values():
+            worker.process.join(timeout=2.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
+
+    def is_busy(self, name: str) -> bool:
+        worker = self.workers.get(name)
+        if worker is None:
+            return False  # Sin lanzar: el primer frame que reciba lo lanza
+        return not worker.ready or worker.latest_answered_id < worker.latest_submitted_id
+
+    def submit(self, names: List[str], frame: np.ndarray, frame_id: int):
+        """Publica el frame una sola vez y envía el índice de ranura a cada worker"""
+        if not names:
+            return
+        if self.ring is None:
+            self._create_ring(frame.shape)
+        slot = self.ring.publish(frame, frame_id)
+        if frame.shape[:2] != self.frame_shape[:2]:
+            # El anillo lo redimensionó: las cajas de este frame se reescalan al decodificar
+            self._frame_scales[frame_id] = (frame.shape[1] / self.frame_shape[1],
+                                            frame.shape[0] / self.frame_shape[0])
+            # Solo pueden responder los frames que siguen en el anillo
+            while len(self._frame_scales) > self.slots:
+                del self._frame_scales[next(iter(self._frame_scales))]
+        message = FRAME_MSG.pack(frame_id, slot)
+        for name in names:
+            worker = self.workers.get(name) or self._spawn(name)
+            try:
+                worker.conn.send_bytes(message)
+            except (BrokenPipeError, OSError):
+                worker.stats['errors'] += 1
+                continue
+            worker.latest_submitted_id = frame_id
+            worker.stats['submitted'] += 1
+
+    def collect(self) -> Dict[str, DetectorResult]:
+        """Lee sin bloquear los resultados nuevos de cada proceso"""
+        new_results = {}
+        for name, worker in self.workers.items():
+            try:
+                while worker.conn.poll():
+                    if not worker.ready:
+                        worker.class_names = worker.conn.recv()
+                        worker.ready = True
+                        worker.stats['load_time'] = time.perf_counter() - worker.spawned_at
+                        print(f"🔥 Detector {name} listo: proceso cargado y calentado en "
+                              f"{worker.stats['load_time']:.2f}s")
+                        continue
+                    result = self._decode_message(worker, worker.conn.recv_bytes())
+                    if result is not None:
+                        new_results[name] = result
+            except (EOFError, OSError):
+                worker.stats['errors'] += 1
+        return new_results
+
+    def _decode_message(self, worker: _ProcessWorkerHandle, message: bytes) -> Optional[DetectorResult]:
+        frame_id, count, dropped, stale, latency = RESULT_HEADER.unpack_from(message)
+        worker.latest_answered_id = frame_id
+        worker.stats['dropped'] = dropped
+        worker.stats['stale'] = stale
+        if count < 0:
+            return None
+
+        payload = np.frombuffer(message, dtype=np.float32, offset=RESULT_HEADER.size)
+        payload = payload.reshape(PAYLOAD_SHAPES[worker.name])
+        scale = self._frame_scales.get(frame_id, (1.0, 1.0))
+        data = decode_result(worker.name, count, payload, worker.class_names, scale)
+        version = worker.result.version + 1 if worker.result else 1
+        worker.result = DetectorResult(version, frame_id, data, latency)
+        worker.stats['processed'] += 1
+        worker.stats['last_latency'] = latency
+        worker.stats['frame_lag'] = worker.latest_submitted_id - frame_id
+        return worker.result
+
+    def get_stats(self, current_frame_id: Optional[int] = None) -> Dict[str, Dict]:
+        stats = {}
+        for name, worker in self.workers.items():
+            worker_stats = dict(worker.stats)
+            worker_stats['state'] = READY if worker.ready else WARMING
+            if current_frame_id is not None and worker.result is not None:
+                worker_stats['frame_lag'] = current_frame_id - worker.result.frame_id
+            stats[name] = worker_stats
+        return stats
+
+    def print_stats(self, current_frame_id: Optional[int] = None):
+        for name, s in self.get_stats(current_frame_id).items():
+            print(f"   {name:>6}: procesados={s['processed']} descartados={s['dropped']} "
+                  f"obsoletos={s['stale']} retraso={s['frame_lag']} frames "
+                  f"latencia={s['last_latency'] * 1000:.1f}ms")
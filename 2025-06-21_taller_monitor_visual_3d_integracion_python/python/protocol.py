@@ -0,0 +1,261 @@
+"""
+Protocolo binario con deltas para el WebSocket del Monitor Visual 3D
+
+Formato (little endian), versión 1:
+
+    Cabecera: versión u8 | tipo u8 (0=keyframe, 1=delta) | seq u32 | seq_keyframe u32 | máscara u16
+    Campos presentes según la máscara, en orden de bit:
+        0 timestamp          f64
+        1 conteos            personas u16, objetos u16, manos u8, caras u8
+        2 movement_intensity f32
+        3 pose_detected      u8
+        4 frame_size         u16, u16
+        5 hand_gestures      n u8 + n × código u8
+        6 detections         n u8 + n × (clase u8, confianza u8 ×100, cx i16, cy i16)
+        7 dominant_colors    n u8 + n × (r, g, b) u8
+        8 pose_landmarks     n u8 + n × f16
+        9 camera_id          u8 (solo en el monitor multicámara)
+
+Un keyframe lleva todos los campos. Un delta solo lleva los campos que
+cambiaron respecto al ÚLTIMO KEYFRAME (no respecto al delta anterior), así
+que perder un delta no desincroniza al cliente. Se envía un keyframe cada
+`keyframe_interval` mensajes para resincronizar.
+
+Con varias cámaras cada una tiene su propia secuencia de keyframes y deltas.
+El campo camera_id va en todos los mensajes de esa secuencia, igual que el
+timestamp.
+
+Los clientes piden el formato con un mensaje JSON tras conectar:
+    {"type": "protocol", "format": "binary.v1"}
+El servidor confirma con el mismo tipo de mensaje. Quien no lo pide sigue en JSON.
+
+Un cliente suscrito a una parte de los temas solo recibe sus campos (ver
+TOPIC_FIELDS); timestamp, conteos, movimiento, tamaño y cámara van siempre.
+Cada combinación de temas tiene su propio codificador y sus keyframes.
+"""
+
+import struct
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+PROTOCOL_VERSION = 1
+BINARY_FORMAT = 'binary.v1'
+JSON_FORMAT = 'json'
+
+KEYFRAME = 0
+DELTA = 1
+
+HEADER = struct.Struct('<BBIIH')
+
+GESTURES = ['fist', 'open_hand', 'pointing', 'peace', 'partial']
+DETECTION_CLASSES = ['person']
+UNKNOWN_CODE = 255
+
+FIELD_TIMESTAMP = 0
+FIELD_COUNTS = 1
+FIELD_MOVEMENT = 2
+FIELD_POSE_DETECTED = 3
+FIELD_FRAME_SIZE = 4
+FIELD_GESTURES = 5
+FIELD_DETECTIONS = 6
+FIELD_COLORS = 7
+FIELD_LANDMARKS = 8
+FIELD_CAMERA = 9
+NUM_FIELDS = 10
+
+# Campos que viajan siempre, también en los deltas
+ALWAYS_SENT = (FIELD_TIMESTAMP, FIELD_CAMERA)
+
+# Campos de cada tema de suscripción; los que no aparecen aquí viajan a todos
+TOPIC_FIELDS = {
+    'detections': (FIELD_DETECTIONS,),
+    'pose': (FIELD_POSE_DETECTED, FIELD_LANDMARKS),
+    'hands': (FIELD_GESTURES,),
+    'faces': (),            # Solo el conteo, que va en FIELD_COUNTS
+    'colors': (FIELD_COLORS,)
+}
+BASE_FIELDS = (FIELD_TIMESTAMP, FIELD_COUNTS, FIELD_MOVEMENT, FIELD_FRAME_SIZE, FIELD_CAMERA)
+
+
+def fields_for_topics(topics: Iterable[str]) -> FrozenSet[int]:
+    """Campos binarios que recibe un cliente suscrito a `topics`"""
+    fields = set(BASE_FIELDS)
+    for topic in topics:
+        fields.update(TOPIC_FIELDS[topic])
+    return frozenset(fields)
+
+_TIMESTAMP = struct.Struct('<d')
+_COUNTS = struct.Struct('<HHBB')
+_MOVEMENT = struct.Struct('<f')
+_FLAG = struct.Struct('<B')
+_FRAME_SIZE = struct.Struct('<HH')
+_DETECTION = struct.Struct('<BBhh')
+
+
+def _clamp(value: int, low: int, high: int) -> int:
+    return max(low, min(high, int(value)))
+
+
+def pack_fields(data: Dict) -> Dict[int, bytes]:
+    """Empaqueta cada campo del dict comprimido en su formato fijo"""
+    gestures = data.get('hand_gestures', [])[:255]
+    detections = data.get('detections', [])[:255]
+    colors = data.get('dominant_colors', [])[:255]
+    landmarks = data.get('pose_landmarks', [])[:255]
+
+    fields = {
+        FIELD_TIMESTAMP: _TIMESTAMP.pack(data.get('timestamp', 0.0)),
+        FIELD_COUNTS: _COUNTS.pack(
+            _clamp(data.get('people_count', 0), 0, 0xFFFF),
+            _clamp(data.get('objects_count', 0), 0, 0xFFFF),
+            _clamp(data.get('hands_count', 0), 0, 0xFF),
+            _clamp(data.get('faces_count', 0), 0, 0xFF)
+        ),
+        FIELD_MOVEMENT: _MOVEMENT.pack(data.get('movement_intensity', 0.0)),
+        FIELD_POSE_DETECTED: _FLAG.pack(1 if data.get('pose_detected') else 0),
+        FIELD_FRAME_SIZE: _FRAME_SIZE.pack(*[_clamp(v, 0, 0xFFFF) for v in data.get('frame_size', [0, 0])]),
+        FIELD_GESTURES: bytes([len(gestures)] + [
+            GESTURES.index(g) if g in GESTURES else UNKNOWN_CODE for g in gestures
+        ]),
+        FIELD_DETECTIONS: bytes([len(detections)]) + b''.join(
+            _DETECTION.pack(
+                DETECTION_CLASSES.index(det['class']) if det['class'] in DETECTION_CLASSES else UNKNOWN_CODE,
+                _clamp(round(det['confidence'] * 100), 0, 100),
+                _clamp(det['center'][0], -32768, 32767),
+                _clamp(det['center'][1], -32768, 32767)
+            )
+            for det in detections
+        ),
+        FIELD_COLORS: bytes([len(colors)]) + bytes(
+            _clamp(channel, 0, 255) for color in colors for channel in color[:3]
+        ),
+        FIELD_LANDMARKS: bytes([len(landmarks)]) + struct.pack(f'<{len(landmarks)}e', *landmarks)
+    }
+    if data.get('camera_id') is not None:
+        fields[FIELD_CAMERA] = _FLAG.pack(_clamp(data['camera_id'], 0, 0xFF))
+    return fields
+
+
+def unpack_field(field: int, buffer: bytes, offset: int):
+    """Lee un campo desde `offset`; devuelve (valores dict, nuevo offset)"""
+    if field == FIELD_TIMESTAMP:
+        (timestamp,) = _TIMESTAMP.unpack_from(buffer, offset)
+        return {'timestamp': timestamp}, offset + _TIMESTAMP.size
+    if field == FIELD_COUNTS:
+        people, objects, hands, faces = _COUNTS.unpack_from(buffer, offset)
+        return {'people_count': people, 'objects_count': objects,
+                'hands_count': hands, 'faces_count': faces}, offset + _COUNTS.size
+    if field == FIELD_MOVEMENT:
+        (movement,) = _MOVEMENT.unpack_from(buffer, offset)
+        return {'movement_intensity': round(movement, 3)}, offset + _MOVEMENT.size
+    if field == FIELD_POSE_DETECTED:
+        (flag,) = _FLAG.unpack_from(buffer, offset)
+        return {'pose_detected': bool(flag)}, offset + _FLAG.size
+    if field == FIELD_FRAME_SIZE:
+        width, height = _FRAME_SIZE.unpack_from(buffer, offset)
+        return {'frame_size': [width, height]}, offset + _FRAME_SIZE.size
+    if field == FIELD_CAMERA:
+        (camera_id,) = _FLAG.unpack_from(buffer, offset)
+        return {'camera_id': camera_id}, offset + _FLAG.size
+
+    count = buffer[offset]
+    offset += 1
+    if field == FIELD_GESTURES:
+        codes = buffer[offset:offset + count]
+        gestures = [GESTURES[c] if c < len(GESTURES) else 'unknown' for c in codes]
+        return {'hand_gestures': gestures}, offset + count
+    if field == FIELD_DETECTIONS:
+        detections = []
+        for i in range(count):
+            cls, conf, cx, cy = _DETECTION.unpack_from(buffer, offset + i * _DETECTION.size)
+            detections.append({
+                'class': DETECTION_CLASSES[cls] if cls < len(DETECTION_CLASSES) else 'object',
+                'confidence': conf / 100,
+                'center': [cx, cy]
+            })
+        return {'detections': detections}, offset + count * _DETECTION.size
+    if field == FIELD_COLORS:
+        raw = buffer[offset:offset + count * 3]
+        colors = [list(raw[i:i + 3]) for i in range(0, len(raw), 3)]
+        return {'dominant_colors': colors}, offset + count * 3
+    if field == FIELD_LANDMARKS:
+        values = struct.unpack_from(f'<{count}e', buffer, offset)
+        return {'pose_landmarks': [round(v, 2) for v in values]}, offset + count * 2
+    raise ValueError(f"Campo desconocido: {field}")
+
+
+class BinaryDeltaEncoder:
+    def __init__(self, keyframe_interval: int = 40, fields: Optional[Iterable[int]] = None):
+        """
+        Codificador compartido por todos los clientes binarios (uno por cámara y temas)
+
+        Args:
+            keyframe_interval: Mensajes entre keyframes completos
+            fields: Campos a codificar (None = todos)
+        """
+        self.keyframe_interval = keyframe_interval
+        self.fields = frozenset(fields) if fields is not None else None
+        self.seq = 0
+        self.keyframe_seq = 0
+        self.keyframe_fields: Optional[Dict[int, bytes]] = None
+        self.last_keyframe_message: Optional[bytes] = None
+        self.last_was_keyframe = False
+
+    def encode(self, data: Dict) -> bytes:
+        """Codifica el estado como delta o, si toca, como keyframe"""
+        fields = pack_fields(data)
+        if self.fields is not None:
+            fields = {f: value for f, value in fields.items() if f in self.fields}
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+
+        if self.keyframe_fields is None or ((self.seq - self.keyframe_seq) & 0xFFFFFFFF) >= self.keyframe_interval:
+            self.keyframe_seq = self.seq
+            self.keyframe_fields = fields
+            self.last_keyframe_message = self._build(KEYFRAME, fields, sorted(fields))
+            self.last_was_keyframe = True
+            return self.last_keyframe_message
+
+        changed = [f for f in sorted(fields)
+                   if f in ALWAYS_SENT or fields[f] != self.keyframe_fields.get(f)]
+        self.last_was_keyframe = False
+        return self._build(DELTA, fields, changed)
+
+    def _build(self, frame_type: int, fields: Dict[int, bytes], present) -> bytes:
+        mask = 0
+        body = []
+        for field in present:
+            mask |= 1 << field
+            body.append(fields[field])
+        return HEADER.pack(PROTOCOL_VERSION, frame_type, self.seq, self.keyframe_seq, mask) + b''.join(body)
+
+
+class BinaryDeltaDecoder:
+    """Decodificador de referencia (benchmarks y clientes Python)"""
+
+    def __init__(self):
+        # Último keyframe por cámara (None en el monitor de una sola cámara)
+        self.keyframes: Dict[Optional[int], Tuple[int, Dict]] = {}
+
+    def decode(self, message: bytes) -> Optional[Dict]:
+        """Devuelve el estado completo, o None si falta el keyframe de referencia"""
+        version, frame_type, seq, keyframe_seq, mask = HEADER.unpack_from(message)
+        if version != PROTOCOL_VERSION:
+            raise ValueError(f"Versión de protocolo no soportada: {version}")
+
+        values = {}
+        offset = HEADER.size
+        for field in range(NUM_FIELDS):
+            if mask & (1 << field):
+                field_values, offset = unpack_field(field, message, offset)
+                values.update(field_values)
+
+        camera_id = values.get('camera_id')
+        if frame_type == KEYFRAME:
+            self.keyframes[camera_id] = (seq, values)
+            return dict(values)
+
+        known_seq, keyframe_state = self.keyframes.get(camera_id, (None, {}))
+        if keyframe_seq != known_seq:
+            return None  # Esperar al siguiente keyframe
+        state = dict(keyframe_state)
+        state.update(values)
+        return state
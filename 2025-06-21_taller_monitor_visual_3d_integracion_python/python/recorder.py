@@ -0,0 +1,408 @@
+"""
+Grabación compacta del flujo procesado del Monitor Visual 3D
+
+StreamRecorder guarda los dicts de process_frame en una carpeta de bloques
+columnares (.npz comprimidos). Cada bloque tiene una columna por campo
+escalar. Las listas de longitud variable (detecciones, gestos, landmarks,
+caras) van en arrays planos con offsets por fila. Un índice (index.jsonl)
+guarda, por bloque, su archivo, sus filas y su rango de timestamps.
+
+El hilo de cámara solo añade una tupla de referencias al lote actual. La
+conversión a columnas y la escritura las hace un hilo de fondo. La cola de
+lotes pendientes está acotada: si el disco no da abasto se descarta el
+lote más nuevo y se cuenta, sin frenar nunca la cámara.
+
+StreamReader lee el índice y, para un rango de tiempo, abre solo los
+bloques que lo solapan, de uno en uno.
+
+Uso:
+    python main.py --record grabacion/
+    python recorder.py grabacion/ [--start 2025-06-21T10:00] [--end 2025-06-21T11:00]
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from protocol import GESTURES, UNKNOWN_CODE
+from yolo_postprocess import YoloDetections
+
+INDEX_FILE = 'index.jsonl'
+
+# Columnas de una fila por frame
+SCALAR_COLUMNS = {
+    'timestamp': np.float64,
+    'camera_id': np.int16,           # -1 con una sola cámara
+    'people_count': np.uint16,
+    'objects_count': np.uint16,
+    'hands_count': np.uint16,
+    'faces_count': np.uint16,
+    'movement_intensity': np.float32,
+    'pose_detected': np.bool_,
+    'frame_width': np.uint16,
+    'frame_height': np.uint16,
+}
+MAX_COLORS = 3
+
+
+class StreamRecorder:
+    def __init__(self, directory: str, chunk_rows: int = 4096, flush_interval: float = 60.0,
+                 max_pending: int = 4):
+        """
+        Args:
+            directory: Carpeta de la grabación (se crea si no existe; se añade a una existente)
+            chunk_rows: Filas por bloque como máximo
+            flush_interval: Segundos como máximo que un lote espera en memoria
+            max_pending: Lotes en cola hacia el escritor antes de empezar a descartar
+        """
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._batch: List[Tuple] = []
+        self._batch_started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._pending: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._next_chunk = self._count_chunks()
+        self.closed = False
+        self.stats = {'recorded': 0, 'written_rows': 0, 'chunks': 0, 'dropped_rows': 0,
+                      'bytes': 0, 'write_ms': 0.0}
+
+        # El escritor arranca cuando el objeto ya está completo
+        self._writer = threading.Thread(target=self._write_loop, name='stream-recorder', daemon=True)
+        self._writer.start()
+
+    def _count_chunks(self) -> int:
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return 0
+        with open(index_path) as f:
+            return sum(1 for line in f if line.strip())
+
+    def record(self, data: Dict):
+        """Añade un frame procesado al lote actual (hilo de cámara, sin E/S)"""
+        if self.closed:
+            return
+        frame_size = data.get('frame_size', (0, 0))
+        # Referencias, no copias: las listas de la caché se reemplazan, nunca se modifican
+        row = (
+            data.get('timestamp', time.time()),
+            data.get('camera_id'),
+            data.get('people_count', 0),
+            data.get('objects_count', 0),
+            data.get('hands_count', 0),
+            data.get('faces_count', 0),
+            data.get('movement_intensity', 0.0),
+            data.get('pose_detected', False),
+            frame_size[0],
+            frame_size[1],
+            data.get('detections', []),
+            data.get('hand_gestures', []),
+            data.get('pose_landmarks', []),
+            data.get('face_positions', []),
+            data.get('dominant_colors', []),
+        )
+        with self._lock:
+            self._batch.append(row)
+            self.stats['recorded'] += 1
+            if len(self._batch) >= self.chunk_rows or \
+                    time.perf_counter() - self._batch_started >= self.flush_interval:
+                self._hand_off()
+
+    def _hand_off(self):
+        """Pasa el lote al escritor (con el lock tomado); si la cola está llena lo descarta"""
+        batch, self._batch = self._batch, []
+        self._batch_started = time.perf_counter()
+        if not batch:
+            return
+        try:
+            self._pending.put_nowait(batch)
+        except queue.Full:
+            self.stats['dropped_rows'] += len(batch)
+
+    def flush(self):
+        with self._lock:
+            self._hand_off()
+
+    def close(self, timeout: float = 10.0):
+        """Escribe el último lote y espera al escritor"""
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        self._pending.put(None)
+        self._writer.join(timeout=timeout)
+
+    def _write_loop(self):
+        while True:
+            batch = self._pending.get()
+            if batch is None:
+                return
+            start = time.perf_counter()
+            try:
+                self._write_chunk(batch)
+            except Exception as e:
+                with self._lock:
+                    self.stats['dropped_rows'] += len(batch)
+                print(f"⚠️  Error escribiendo bloque de grabación: {e}")
+            with self._lock:
+                self.stats['write_ms'] += (time.perf_counter() - start) * 1000
+
+    def _write_chunk(self, batch: List[Tuple]):
+        columns = rows_to_columns(batch)
+        name = f"chunk_{self._next_chunk:06d}.npz"
+        path = os.path.join(self.directory, name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **columns)
+        os.replace(tmp_path, path)
+        self._next_chunk += 1
+
+        timestamps = columns['timestamp']
+        entry = {'file': name, 'rows': len(batch),
+                 't_start': float(timestamps.min()), 't_end': float(timestamps.max())}
+        with open(os.path.join(self.directory, INDEX_FILE), 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        size = os.path.getsize(path)
+        with self._lock:
+            self.stats['written_rows'] += len(batch)
+            self.stats['chunks'] += 1
+            self.stats['bytes'] += size
+
+    def summary(self) -> str:
+        with self._lock:
+            s = dict(self.stats)
+        return (f"{s['written_rows']} filas en {s['chunks']} bloques ({s['bytes'] / 1024:.0f} KiB), "
+                f"descartadas={s['dropped_rows']}")
+
+
+def _detection_columns(detections) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """(clases, confianzas, cajas, track_ids) de las detecciones de un frame"""
+    if isinstance(detections, YoloDetections):
+        array = detections.array
+        names = detections.names
+        return ([names[c] for c in array['class_id'].tolist()], array['confidence'], array['bbox'],
+                np.full(len(array), -1, dtype=np.int32))
+    classes = [det['class'] for det in detections]
+    confidences = np.array([det['confidence'] for det in detections], dtype=np.float32)
+    boxes = np.array([det['bbox'] for det in detections], dtype=np.float32).reshape(-1, 4)
+    track_ids = np.array([det.get('track_id', -1) for det in detections], dtype=np.int32)
+    return classes, confidences, boxes, track_ids
+
+
+def rows_to_columns(rows: List[Tuple]) -> Dict[str, np.ndarray]:
+    """Convierte tuplas de StreamRecorder.record en columnas de un bloque"""
+    count = len(rows)
+    columns = {}
+    for i, (name, dtype) in enumerate(SCALAR_COLUMNS.items()):
+        values = [row[i] for row in rows]
+        if name == 'camera_id':
+            values = [-1 if value is None else value for value in values]
+        columns[name] = np.array(values, dtype=dtype)
+
+    colors = np.zeros((count, MAX_COLORS, 3), dtype=np.uint8)
+    colors_count = np.zeros(count, dtype=np.uint8)
+
+    vocabulary: Dict[str, int] = {}
+    det_offsets = np.zeros(count + 1, dtype=np.int32)
+    det_class, det_conf, det_bbox, det_track = [], [], [], []
+    gesture_offsets = np.zeros(count + 1, dtype=np.int32)
+    gestures: List[int] = []
+    landmark_offsets = np.zeros(count + 1, dtype=np.int32)
+    landmarks: List[float] = []
+    face_offsets = np.zeros(count + 1, dtype=np.int32)
+    face_bbox, face_conf = [], []
+
+    for r, row in enumerate(rows):
+        detections, row_gestures, row_landmarks, faces, row_colors = row[10:]
+
+        classes, confidences, boxes, track_ids = _detection_columns(detections)
+        det_class.extend(vocabulary.setdefault(c, len(vocabulary)) for c in classes)
+        det_conf.append(confidences)
+        det_bbox.append(boxes)
+        det_track.append(track_ids)
+        det_offsets[r + 1] = det_offsets[r] + len(classes)
+
+        gestures.extend(GESTURES.index(g) if g in GESTURES else UNKNOWN_CODE for g in row_gestures)
+        gesture_offsets[r + 1] = len(gestures)
+
+        landmarks.extend(row_landmarks)
+        landmark_offsets[r + 1] = len(landmarks)
+
+        for face in faces:
+            face_bbox.append(face['bbox'])
+            face_conf.append(face['confidence'])
+        face_offsets[r + 1] = len(face_conf)
+
+        row_colors = row_colors[:MAX_COLORS]
+        colors_count[r] = len(row_colors)
+        if row_colors:
+            colors[r, :len(row_colors)] = np.clip(row_colors, 0, 255)
+
+    columns.update({
+        'colors': colors,
+        'colors_count': colors_count,
+        'classes': np.array(list(vocabulary), dtype=np.str_),
+        'det_offsets': det_offsets,
+        'det_class': np.array(det_class, dtype=np.uint16),
+        'det_confidence': np.concatenate(det_conf).astype(np.float32) if det_conf else np.zeros(0, np.float32),
+        'det_bbox': np.concatenate(det_bbox).astype(np.float32) if det_bbox else np.zeros((0, 4), np.float32),
+        'det_track_id': np.concatenate(det_track).astype(np.int32) if det_track else np.zeros(0, np.int32),
+        'gesture_offsets': gesture_offsets,
+        'gestures': np.array(gestures, dtype=np.uint8),
+        'landmark_offsets': landmark_offsets,
+        'landmarks': np.array(landmarks, dtype=np.float32),
+        'face_offsets': face_offsets,
+        'face_bbox': np.array(face_bbox, dtype=np.float32).reshape(-1, 4),
+        'face_confidence': np.array(face_conf, dtype=np.float32),
+    })
+    return columns
+
+
+class StreamReader:
+    def __init__(self, directory: str):
+        """Lector de una carpeta escrita por StreamRecorder"""
+        self.directory = directory
+        self.chunks: List[Dict] = []
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            for line in f:
+                if line.strip():
+                    self.chunks.append(json.loads(line))
+        self.chunks.sort(key=lambda chunk: chunk['t_start'])
+
+    def __len__(self) -> int:
+        return sum(chunk['rows'] for chunk in self.chunks)
+
+    def time_range(self) -> Tuple[float, float]:
+        if not self.chunks:
+            return 0.0, 0.0
+        return self.chunks[0]['t_start'], max(chunk['t_end'] for chunk in self.chunks)
+
+    def _overlapping(self, start: Optional[float], end: Optional[float]) -> Iterator[Dict]:
+        for chunk in self.chunks:
+            if start is not None and chunk['t_end'] < start:
+                continue
+            if end is not None and chunk['t_start'] > end:
+                continue
+            yield chunk
+
+    @staticmethod
+    def _row_mask(timestamps: np.ndarray, start: Optional[float], end: Optional[float]) -> np.ndarray:
+        mask = np.ones(len(timestamps), dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps <= end
+        return mask
+
+    def iter_columns(self, names: List[str], start: Optional[float] = None,
+                     end: Optional[float] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """Columnas escalares de cada bloque del rango (solo se descomprimen las pedidas)"""
+        for chunk in self._overlapping(start, end):
+            with np.load(os.path.join(self.directory, chunk['file'])) as data:
+                mask = self._row_mask(data['timestamp'], start, end)
+                if mask.any():
+                    yield {name: data[name][mask] for name in names}
+
+    def column(self, name: str, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """Una columna escalar completa en un rango de tiempo"""
+        parts = [columns[name] for columns in self.iter_columns([name], start, end)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=SCALAR_COLUMNS[name])
+
+    def iter_records(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Dict]:
+        """Reconstruye los dicts de process_frame del rango, bloque a bloque"""
+        for chunk in self._overlapping(start, end):
+            with np.load(os.path.join(self.directory, chunk['file'])) as npz:
+                data = {key: npz[key] for key in npz.files}
+            mask = self._row_mask(data['timestamp'], start, end)
+            classes = data['classes'].tolist()
+            for r in np.flatnonzero(mask):
+                yield self._record(data, int(r), classes)
+
+    @staticmethod
+    def _record(data: Dict[str, np.ndarray], r: int, classes: List[str]) -> Dict:
+        record = {name: data[name][r].item() for name in SCALAR_COLUMNS}
+        camera_id = record.pop('camera_id')
+        if camera_id >= 0:
+            record['camera_id'] = camera_id
+        record['frame_size'] = [record.pop('frame_width'), record.pop('frame_height')]
+
+        d0, d1 = data['det_offsets'][r], data['det_offsets'][r + 1]
+        detections = []
+        for cls, conf, bbox, track_id in zip(data['det_class'][d0:d1].tolist(),
+                                             data['det_confidence'][d0:d1].tolist(),
+                                             data['det_bbox'][d0:d1].tolist(),
+                                             data['det_track_id'][d0:d1].tolist()):
+            x1, y1, x2, y2 = bbox
+            detection = {'class': classes[cls], 'confidence': conf, 'bbox': bbox,
+                         'center': [(x1 + x2) / 2, (y1 + y2) / 2], 'area': (x2 - x1) * (y2 - y1)}
+            if track_id >= 0:
+                detection['track_id'] = track_id
+            detections.append(detection)
+        record['detections'] = detections
+
+        g0, g1 = data['gesture_offsets'][r], data['gesture_offsets'][r + 1]
+        record['hand_gestures'] = [GESTURES[g] if g < len(GESTURES) else 'unknown'
+                                   for g in data['gestures'][g0:g1].tolist()]
+        l0, l1 = data['landmark_offsets'][r], data['landmark_offsets'][r + 1]
+        record['pose_landmarks'] = data['landmarks'][l0:l1].tolist()
+        f0, f1 = data['face_offsets'][r], data['face_offsets'][r + 1]
+        record['face_positions'] = [
+            {'bbox': bbox, 'confidence': conf, 'center': [(bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2]}
+            for bbox, conf in zip(data['face_bbox'][f0:f1].tolist(), data['face_confidence'][f0:f1].tolist())
+        ]
+        record['dominant_colors'] = data['colors'][r, :data['colors_count'][r]].tolist()
+        return record
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    """Segundos epoch o fecha ISO (2025-06-21T10:00)"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumen de una grabación del Monitor Visual 3D")
+    parser.add_argument('directory', help="Carpeta escrita con --record")
+    parser.add_argument('--start', help="Inicio del rango (epoch o ISO)")
+    parser.add_argument('--end', help="Fin del rango (epoch o ISO)")
+    args = parser.parse_args()
+
+    reader = StreamReader(args.directory)
+    t0, t1 = reader.time_range()
+    print(f"📼 {args.directory}: {len(reader)} frames en {len(reader.chunks)} bloques, "
+          f"{datetime.fromtimestamp(t0)} -> {datetime.fromtimestamp(t1)}")
+
+    start, end = _parse_time(args.start), _parse_time(args.end)
+    # Resumen por minuto leyendo solo las columnas necesarias
+    minutes: Dict[int, List[float]] = {}
+    for columns in reader.iter_columns(['timestamp', 'people_count', 'movement_intensity'], start, end):
+        for minute, people, movement in zip((columns['timestamp'] // 60).astype(int).tolist(),
+                                            columns['people_count'].tolist(),
+                                            columns['movement_intensity'].tolist()):
+            totals = minutes.setdefault(minute, [0, 0.0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += people
+            totals[2] += movement
+            totals[3] = max(totals[3], people)
+    print(f"{'minuto':>17} {'frames':>7} {'personas':>9} {'máx':>5} {'movimiento':>11}")
+    for minute in sorted(minutes):
+        frames, people, movement, peak = minutes[minute]
+        label = datetime.fromtimestamp(minute * 60).strftime('%Y-%m-%d %H:%M')
+        print(f"{label:>17} {frames:>7} {people / frames:>9.2f} {peak:>5} {movement / frames:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
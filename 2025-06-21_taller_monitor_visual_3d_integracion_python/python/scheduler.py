@@ -0,0 +1,136 @@
+"""
+Planificadores de detectores para el Monitor Visual 3D
+
+Deciden qué detectores se ejecutan en cada frame:
+- FixedIntervalScheduler: política original (cada detector cada N frames)
+- AdaptiveBudgetScheduler: mide la latencia reciente de cada detector y
+  reparte un presupuesto de milisegundos por frame, según el movimiento
+
+Los detectores inactivos (sin clientes suscritos) no se eligen nunca.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+# Política original de VisualMonitor
+DEFAULT_INTERVALS = {
+    'yolo': 3,      # Ejecutar YOLO cada 3 frames
+    'pose': 2,      # Ejecutar pose cada 2 frames
+    'hands': 2,     # Ejecutar hands cada 2 frames
+    'faces': 4,     # Ejecutar face cada 4 frames
+    'colors': 2     # Colores incrementales cada 2 frames (antes k-means cada 10)
+}
+
+# Estimación inicial de latencia (ms) hasta tener medidas reales
+INITIAL_LATENCY_MS = {'yolo': 40.0, 'pose': 15.0, 'hands': 15.0, 'faces': 5.0, 'colors': 0.3}
+
+
+class FixedIntervalScheduler:
+    def __init__(self, intervals: Optional[Dict[str, int]] = None):
+        """Preset con intervalos fijos (comportamiento original)"""
+        self.intervals = dict(intervals or DEFAULT_INTERVALS)
+        self.runs = {name: 0 for name in self.intervals}
+
+    def select(self, frame_count: int, movement_intensity: float,
+               busy: Iterable[str] = (), inactive: Iterable[str] = ()) -> List[str]:
+        inactive = set(inactive)
+        selected = [name for name, interval in self.intervals.items()
+                    if frame_count % interval == 0 and name not in inactive]
+        for name in selected:
+            self.runs[name] += 1
+        return selected
+
+    def record_latency(self, name: str, latency: float):
+        """La política fija no usa latencias"""
+        pass
+
+    def summary(self) -> str:
+        return "fijo " + ", ".join(f"{name}={self.runs[name]}" for name in self.intervals)
+
+
+class AdaptiveBudgetScheduler:
+    def __init__(self, budget_ms: float = 25.0, base_intervals: Optional[Dict[str, int]] = None,
+                 heavy_detectors: Iterable[str] = ('yolo', 'pose'),
+                 static_threshold: float = 0.01, high_motion_threshold: float = 0.08,
+                 static_interval: int = 30, smoothing: float = 0.2):
+        """
+        Planificador adaptativo por presupuesto de latencia
+
+        Args:
+            budget_ms: Milisegundos de inferencia permitidos por frame (promedio)
+            base_intervals: Intervalo deseado por detector con movimiento normal
+            heavy_detectors: Modelos que se pausan en escenas estáticas
+            static_threshold: Intensidad de movimiento por debajo de la cual la escena es estática
+            high_motion_threshold: Intensidad por encima de la cual se duplica la frecuencia
+            static_interval: Intervalo de refresco de los modelos pesados en escena estática
+            smoothing: Factor de la media móvil exponencial de latencias
+        """
+        self.budget_ms = budget_ms
+        self.base_intervals = dict(base_intervals or DEFAULT_INTERVALS)
+        self.heavy_detectors = set(heavy_detectors)
+        self.static_threshold = static_threshold
+        self.high_motion_threshold = high_motion_threshold
+        self.static_interval = static_interval
+        self.smoothing = smoothing
+
+        self.latency_ms = {name: INITIAL_LATENCY_MS.get(name, 10.0) for name in self.base_intervals}
+        self.last_run = {name: 0 for name in self.base_intervals}
+        self.runs = {name: 0 for name in self.base_intervals}
+        self.credit_ms = 0.0
+
+    def desired_interval(self, name: str, movement_intensity: float) -> int:
+        """Intervalo objetivo de un detector según el movimiento de la escena"""
+        base = self.base_intervals[name]
+        if movement_intensity < self.static_threshold and name in self.heavy_detectors:
+            return self.static_interval
+        if movement_intensity > self.high_motion_threshold:
+            return max(1, base // 2)
+        return base
+
+    def select(self, frame_count: int, movement_intensity: float,
+               busy: Iterable[str] = (), inactive: Iterable[str] = ()) -> List[str]:
+        """Elige los detectores más atrasados que caben en el presupuesto del frame"""
+        # Cada frame aporta su presupuesto; se acumula como máximo el de dos frames
+        self.credit_ms = min(self.credit_ms + self.budget_ms, 2 * self.budget_ms)
+
+        busy = set(busy)
+        inactive = set(inactive)
+        candidates = []
+        for name in self.base_intervals:
+            if name in busy:
+                continue  # Sigue procesando un frame anterior
+            if name in inactive:
+                continue  # Ningún cliente lo necesita: no consume presupuesto
+            urgency = (frame_count - self.last_run[name]) / self.desired_interval(name, movement_intensity)
+            if urgency >= 1.0:
+                candidates.append((urgency, name))
+        candidates.sort(reverse=True)
+
+        selected = []
+        for urgency, name in candidates:
+            cost = self.latency_ms[name]
+            # Un detector muy atrasado puede endeudar el presupuesto para no quedar sin ejecutar
+            if cost <= self.credit_ms or (urgency >= 2.0 and self.credit_ms > 0):
+                self.credit_ms -= cost
+                self.last_run[name] = frame_count
+                self.runs[name] += 1
+                selected.append(name)
+        return selected
+
+    def record_latency(self, name: str, latency: float):
+        """Actualiza la media móvil de latencia (latency en segundos)"""
+        if name in self.latency_ms:
+            self.latency_ms[name] += self.smoothing * (latency * 1000 - self.latency_ms[name])
+
+    def summary(self) -> str:
+        return f"adaptativo ({self.budget_ms:.0f}ms/frame) " + ", ".join(
+            f"{name}={self.runs[name]} ({self.latency_ms[name]:.1f}ms)" for name in self.base_intervals
+        )
+
+
+def create_scheduler(name: str, budget_ms: float = 25.0, intervals: Optional[Dict[str, int]] = None):
+    """Crea un planificador por nombre ('fixed' o 'adaptive')"""
+    if name == 'fixed':
+        return FixedIntervalScheduler(intervals)
+    if name == 'adaptive':
+        return AdaptiveBudgetScheduler(budget_ms, base_intervals=intervals)
+    raise ValueError(f"Planificador desconocido: {name}")
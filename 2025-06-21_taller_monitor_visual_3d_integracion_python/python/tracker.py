@@ -0,0 +1,214 @@
+"""
+Seguimiento de detecciones entre ejecuciones de YOLO
+
+YOLO corre cada pocos frames. Entre medias, BoxTracker mueve las cajas con
+flujo óptico Lucas-Kanade disperso sobre el frame gris de 80x60 que ya se
+calcula para el movimiento. Un filtro alfa-beta de velocidad constante
+suaviza el resultado. Cada detección conserva un track_id estable.
+
+Cuando llega un resultado de YOLO, que puede ser de un frame anterior
+porque la inferencia corre en un worker, se compara con la posición que
+tenía cada track en ese frame. Después se le suma el desplazamiento que el
+track acumuló desde entonces.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+LK_PARAMS = dict(
+    winSize=(9, 9),
+    maxLevel=1,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+)
+
+
+def _iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    def __init__(self, track_id: int, detection: Dict, frame_id: int, history: int):
+        self.track_id = track_id
+        self.detection = detection
+        self.bbox = np.array(detection['bbox'], dtype=np.float32)
+        self.velocity = np.zeros(2, dtype=np.float32)  # Píxeles por frame (centro)
+        self.last_detected = frame_id
+        self.misses = 0
+        # Desplazamiento aplicado en cada frame, para compensar resultados de YOLO atrasados
+        self.shifts: deque = deque(maxlen=history)
+
+    def shift_since(self, frame_id: int) -> np.ndarray:
+        total = np.zeros(2, dtype=np.float32)
+        for shifted_frame, shift in self.shifts:
+            if shifted_frame > frame_id:
+                total += shift
+        return total
+
+    def move(self, shift: np.ndarray, frame_id: int):
+        self.bbox[[0, 2]] += shift[0]
+        self.bbox[[1, 3]] += shift[1]
+        self.shifts.append((frame_id, shift))
+
+
+class BoxTracker:
+    def __init__(self, small_size: Tuple[int, int] = (80, 60), alpha: float = 0.6, beta: float = 0.3,
+                 iou_threshold: float = 0.3, max_misses: int = 2, points_per_side: int = 3,
+                 velocity_decay: float = 0.8, history: int = 30):
+        """
+        Args:
+            small_size: Tamaño (ancho, alto) del frame gris sobre el que se calcula el flujo
+            alpha: Peso de la medida de flujo frente a la predicción en la posición
+            beta: Peso de la innovación en la velocidad
+            iou_threshold: IoU mínima para asociar una detección nueva a un track
+            max_misses: Resultados de YOLO seguidos sin un track antes de eliminarlo
+            points_per_side: Rejilla de puntos por caja para el flujo (n × n)
+            velocity_decay: Atenuación de la velocidad cuando no hay flujo válido
+            history: Frames de desplazamiento guardados por track
+        """
+        self.small_size = small_size
+        self.alpha = alpha
+        self.beta = beta
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.points_per_side = points_per_side
+        self.velocity_decay = velocity_decay
+        self.history = history
+
+        self.tracks: List[Track] = []
+        self.next_id = 1
+        self.stats = {'tracks_created': 0, 'tracks_dropped': 0, 'propagated_frames': 0,
+                      'flow_failures': 0}
+
+    def _grid_points(self, boxes: np.ndarray, scale: np.ndarray) -> np.ndarray:
+        """Rejilla n × n en el 60% central de cada caja, en coordenadas del frame pequeño"""
+        small = boxes * np.tile(scale, 2)                                   # t × 4
+        ts = (np.arange(self.points_per_side, dtype=np.float32) + 0.5) / self.points_per_side * 0.6 + 0.2
+        xs = small[:, 0:1] + (small[:, 2:3] - small[:, 0:1]) * ts           # t × n
+        ys = small[:, 1:2] + (small[:, 3:4] - small[:, 1:2]) * ts
+        n = self.points_per_side
+        grid = np.stack([np.repeat(xs[:, None, :], n, axis=1),
+                         np.repeat(ys[:, :, None], n, axis=2)], axis=-1)   # t × n × n × 2
+        return grid.reshape(-1, 1, 2).astype(np.float32)
+
+    @staticmethod
+    def _masked_median(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """Mediana por track de los puntos válidos (t × p × 2) sin bucles ni np.nanmedian"""
+        ordered = np.sort(np.where(valid[:, :, None], values, np.inf), axis=1)  # inf al final
+        counts = valid.sum(axis=1)
+        rows = np.arange(len(values))
+        low = ordered[rows, (counts - 1) // 2]
+        high = ordered[rows, counts // 2]
+        return (low + high) / 2
+
+    def propagate(self, prev_gray: Optional[np.ndarray], gray: np.ndarray,
+                  frame_shape: Tuple[int, ...], frame_id: int):
+        """Mueve todos los tracks un frame con flujo óptico + velocidad constante"""
+        if not self.tracks or prev_gray is None:
+            return
+        h, w = frame_shape[:2]
+        scale = np.array([self.small_size[0] / w, self.small_size[1] / h], dtype=np.float32)
+        count = len(self.tracks)
+        per_track = self.points_per_side ** 2
+
+        # Una sola llamada a LK con los puntos de todos los tracks
+        boxes = np.stack([track.bbox for track in self.tracks])
+        points = self._grid_points(boxes, scale)
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, **LK_PARAMS)
+        flow = (new_points - points).reshape(count, per_track, 2) / scale
+        valid = status.reshape(count, per_track).astype(bool)
+
+        # Filtro alfa-beta de velocidad constante, vectorizado sobre los tracks
+        velocities = np.stack([track.velocity for track in self.tracks])
+        has_flow = valid.sum(axis=1) >= max(2, per_track // 3)
+        shifts = velocities * self.velocity_decay
+        new_velocities = shifts.copy()
+        if has_flow.any():
+            measured = self._masked_median(flow[has_flow], valid[has_flow])
+            innovation = measured - velocities[has_flow]
+            shifts[has_flow] = velocities[has_flow] + self.alpha * innovation
+            new_velocities[has_flow] = velocities[has_flow] + self.beta * innovation
+        # Sin textura suficiente: seguir con la velocidad atenuada
+        self.stats['flow_failures'] += int(count - has_flow.sum())
+
+        for track, shift, velocity in zip(self.tracks, shifts.astype(np.float32), new_velocities):
+            track.velocity = velocity.astype(np.float32)
+            # No dejar que la caja salga del frame
+            x1, y1, x2, y2 = track.bbox + np.tile(shift, 2)
+            shift[0] -= min(0.0, float(x1)) + max(0.0, float(x2) - w)
+            shift[1] -= min(0.0, float(y1)) + max(0.0, float(y2) - h)
+            track.move(shift, frame_id)
+        self.stats['propagated_frames'] += 1
+
+    def update(self, detections: List[Dict], frame_id: int):
+        """Asocia un resultado de YOLO (calculado sobre `frame_id`) a los tracks existentes"""
+        # Posición de cada track en el frame que vio YOLO
+        past_boxes = []
+        for track in self.tracks:
+            shift = track.shift_since(frame_id)
+            past_boxes.append(track.bbox - np.tile(shift, 2))
+
+        # Emparejamiento voraz por IoU, solo dentro de la misma clase
+        candidates = []
+        for d, det in enumerate(detections):
+            for t, track in enumerate(self.tracks):
+                if track.detection['class'] != det['class']:
+                    continue
+                iou = _iou(det['bbox'], past_boxes[t])
+                if iou >= self.iou_threshold:
+                    candidates.append((iou, d, t))
+        candidates.sort(reverse=True)
+
+        matched_dets, matched_tracks = set(), set()
+        for _, d, t in candidates:
+            if d in matched_dets or t in matched_tracks:
+                continue
+            matched_dets.add(d)
+            matched_tracks.add(t)
+            track = self.tracks[t]
+            det = detections[d]
+            # Caja de YOLO llevada al frame actual con el desplazamiento posterior del track
+            shift = track.shift_since(frame_id)
+            track.bbox = np.array(det['bbox'], dtype=np.float32) + np.tile(shift, 2)
+            track.detection = det
+            track.last_detected = frame_id
+            track.misses = 0
+
+        survivors = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    self.stats['tracks_dropped'] += 1
+                    continue
+            survivors.append(track)
+        self.tracks = survivors
+
+        for d, det in enumerate(detections):
+            if d not in matched_dets:
+                self.tracks.append(Track(self.next_id, det, frame_id, self.history))
+                self.next_id += 1
+                self.stats['tracks_created'] += 1
+
+    def detections(self) -> List[Dict]:
+        """Detecciones con la caja propagada al frame actual y su track_id"""
+        tracked = []
+        for track in self.tracks:
+            if track.misses:
+                continue  # YOLO ya no lo vio: no publicarlo hasta que reaparezca
+            x1, y1, x2, y2 = (float(v) for v in track.bbox)
+            detection = dict(track.detection)
+            detection['bbox'] = [x1, y1, x2, y2]
+            detection['center'] = [(x1 + x2) / 2, (y1 + y2) / 2]
+            detection['track_id'] = track.track_id
+            tracked.append(detection)
+        return tracked
+
+    def reset(self):
+        self.tracks = []
@@ -0,0 +1,170 @@
+import glob
+import os
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+
+import cv2
+
+
+def dhash(frame, size=8):
+    """64-bit difference hash: sign of horizontal gradients on a (size+1) x size grayscale thumbnail"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class CaptureWriter:
+    """Save capture JPEGs from a small pool of writer threads
+
+    `submit` only queues a reference to the frame, so the detection loop
+    never encodes or touches the disk. Each writer hashes the frame (dHash)
+    and skips it if it is within `max_distance` bits of one of the last
+    `recent` captures saved for the same class. Otherwise it optionally
+    downscales the frame and encodes it as JPEG at `quality`. It then writes
+    the file and calls `on_saved`. Once the captures directory grows past
+    `budget_bytes`, the oldest .jpg files are deleted.
+    """
+
+    def __init__(self, captures_dir, workers=2, quality=85, max_width=None, max_queue=32,
+                 max_distance=6, recent=8, budget_bytes=500 * 1024 * 1024, on_saved=None):
+        self.captures_dir = captures_dir
+        self.quality = quality
+        self.max_width = max_width
+        self.max_distance = max_distance
+        self.budget_bytes = budget_bytes
+        self.on_saved = on_saved
+        os.makedirs(captures_dir, exist_ok=True)
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {'submitted': 0, 'saved': 0, 'duplicates': 0, 'dropped': 0, 'evicted': 0,
+                      'errors': 0, 'bytes_written': 0, 'encode_ms': 0.0}
+        self._lock = threading.Lock()
+        self._recent = defaultdict(lambda: deque(maxlen=recent))  # (source, class) -> recent hashes
+
+        # Existing captures count towards the budget, oldest first
+        existing = sorted(glob.glob(os.path.join(captures_dir, "*.jpg")), key=os.path.getmtime)
+        self._files = deque((path, os.path.getsize(path)) for path in existing)
+        self._disk_bytes = sum(size for _, size in self._files)
+
+        self._threads = [threading.Thread(target=self._run, name=f"capture-writer-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, frame, obj_class, timestamp, confidence=0.0, source=None):
+        """Queue a capture without blocking; returns False if the queue was full
+
+        `source` (e.g. 'cam1') prefixes the file name and keeps a separate
+        duplicate history per camera.
+        """
+        try:
+            self.queue.put_nowait((frame, obj_class, timestamp, confidence, source))
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('submitted')
+        return True
+
+    def _count(self, key, amount=1):
+        # submit runs on every camera thread and _save on every writer
+        with self._lock:
+            self.stats[key] += amount
+
+    def close(self, timeout=5.0):
+        """Finish the queued captures and stop the writers"""
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+    def _is_duplicate(self, key, frame_hash):
+        """Check against recent saves of the class (and source) and reserve the hash if it is new"""
+        with self._lock:
+            recent = self._recent[key]
+            if any(hamming(frame_hash, previous) <= self.max_distance for previous in recent):
+                return True
+            recent.append(frame_hash)
+            return False
+
+    def _path_for(self, obj_class, timestamp, source=None):
+        prefix = f"{source}_{obj_class}" if source else obj_class
+        base = os.path.join(self.captures_dir, f"{prefix}_{timestamp.strftime('%Y%m%d_%H%M%S')}")
+        path = f"{base}.jpg"
+        suffix = 1
+        while os.path.exists(path):
+            path = f"{base}_{suffix}.jpg"
+            suffix += 1
+        return path
+
+    def _save(self, frame, obj_class, timestamp, confidence, source=None):
+        if self._is_duplicate((source, obj_class), dhash(frame)):
+            self._count('duplicates')
+            return
+
+        start = time.perf_counter()
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            scale = self.max_width / width
+            frame = cv2.resize(frame, (self.max_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            self._count('errors')
+            return
+        data = encoded.tobytes()
+        self._count('encode_ms', (time.perf_counter() - start) * 1000)
+
+        with self._lock:
+            path = self._path_for(obj_class, timestamp, source)
+            # Reserve the name before writing so another writer cannot pick it
+            open(path, 'wb').close()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._files.append((path, len(data)))
+            self._disk_bytes += len(data)
+            self.stats['saved'] += 1
+            self.stats['bytes_written'] += len(data)
+            self._enforce_budget()
+        if self.on_saved is not None:
+            self.on_saved(path, obj_class, timestamp, confidence)
+
+    def _enforce_budget(self):
+        """Delete the oldest captures until the directory fits the budget (with the lock held)"""
+        while self._disk_bytes > self.budget_bytes and len(self._files) > 1:
+            path, size = self._files.popleft()
+            self._disk_bytes -= size
+            try:
+                os.remove(path)
+                self.stats['evicted'] += 1
+            except OSError:
+                pass
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                self._save(*item)
+            except Exception as e:
+                self._count('errors')
+                print(f"Error saving capture: {e}")
+
+    def summary(self):
+        with self._lock:
+            s = dict(self.stats)
+        return (f"{s['saved']} captures saved ({s['bytes_written'] / 1024:.0f} KiB), "
+                f"{s['duplicates']} near-duplicates skipped, {s['dropped']} dropped, {s['evicted']} evicted")
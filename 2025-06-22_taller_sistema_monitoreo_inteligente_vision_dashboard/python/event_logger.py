@@ -0,0 +1,210 @@
+import atexit
+import csv
+import datetime
+import io
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from event_store import EventStore, store_path_for
+
+
+class EventLogger:
+    """Buffered, rotating CSV event log written by a dedicated thread
+
+    The detection loop only puts a tuple on a bounded queue. The logger
+    thread formats rows, writes them in batches, flushes periodically and
+    starts a new `log_YYYYmmdd_HHMMSS.csv` file once the current one grows
+    past `max_bytes` or gets older than `rotate_seconds`. When the disk
+    cannot keep up and the queue is full, events are dropped according to
+    `overflow` ('drop_newest' or 'drop_oldest') and counted instead of
+    blocking the caller. With `store=True` every batch is also inserted into
+    an indexed SQLite `EventStore` next to the CSV (`log_X.db`), which the
+    dashboards query instead of re-reading the CSV.
+    """
+
+    HEADER = ['timestamp', 'evento', 'clase', 'confianza']
+
+    def __init__(self, logs_dir, prefix="log", max_queue=10000, batch_size=200, flush_interval=1.0,
+                 max_bytes=50 * 1024 * 1024, rotate_seconds=24 * 3600, overflow="drop_newest", store=True):
+        if overflow not in ("drop_newest", "drop_oldest"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.logs_dir = logs_dir
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.overflow = overflow
+        self.use_store = store
+        os.makedirs(logs_dir, exist_ok=True)
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {'logged': 0, 'written': 0, 'dropped': 0, 'batches': 0, 'rotations': 0,
+                      'write_errors': 0, 'store_errors': 0}
+        # Callers (several threads) and the logger thread both count drops
+        self._stats_lock = threading.Lock()
+        self.files = []
+        self._file = None
+        self.store = None
+        self._opened_at = 0.0
+        self._closed = False
+        self._open_new_file()
+
+        self._thread = threading.Thread(target=self._run, name="event-logger", daemon=True)
+        self._thread.start()
+        # Also flush on interpreter exit if the window is never closed cleanly
+        atexit.register(self.close)
+
+    @property
+    def current_file(self):
+        return self.files[-1]
+
+    def log(self, timestamp, event, obj_class, confidence):
+        """Queue an event without blocking; returns False if it was dropped"""
+        if self._closed:
+            return False
+        item = (timestamp, event, obj_class, float(confidence))
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            if self.overflow == "drop_newest":
+                self._count('dropped')
+                return False
+            # drop_oldest: make room by discarding the oldest pending event
+            try:
+                self.queue.get_nowait()
+                self._count('dropped')
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                self._count('dropped')
+                return False
+        self._count('logged')
+        return True
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def close(self, timeout=5.0):
+        """Write everything still queued, flush and fsync the current file"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            # Sentinel: the thread drains everything before it
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            # The logger thread is stuck or dead with a full queue; do not hang the caller
+            pass
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive() or not self.queue.empty():
+            print("Warning: event logger did not finish writing in time")
+
+    def _open_new_file(self):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._close_store()
+            self.stats['rotations'] += 1
+        stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.logs_dir, f"{self.prefix}_{stamp}.csv")
+        suffix = 1
+        while os.path.exists(path):  # Several rotations within the same second
+            path = os.path.join(self.logs_dir, f"{self.prefix}_{stamp}_{suffix}.csv")
+            suffix += 1
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        csv.writer(self._file).writerow(self.HEADER)
+        self._file.flush()
+        self._opened_at = time.time()
+        self.files.append(path)
+        if self.use_store:
+            try:
+                self.store = EventStore(store_path_for(path))
+            except sqlite3.Error as e:
+                self.stats['store_errors'] += 1
+                print(f"Error opening event store, logging to CSV only: {e}")
+    
+    def _close_store(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def _should_rotate(self):
+        return (self._file.tell() >= self.max_bytes
+                or time.time() - self._opened_at >= self.rotate_seconds)
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _write_batch(self, batch):
+        rows = [[timestamp.strftime('%Y-%m-%d %H:%M:%S'), event, obj_class, f"{confidence:.2f}"]
+                for timestamp, event, obj_class, confidence in batch]
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        text = buffer.getvalue()
+        try:
+            if self.store is not None:
+                # The store gets exactly what the CSV holds: whole seconds, two-decimal confidences
+                stored = [(timestamp.replace(microsecond=0), event, obj_class, float(row[3]))
+                          for (timestamp, event, obj_class, _), row in zip(batch, rows)]
+                # Commit to the store first, claiming the CSV bytes about to be written, so a
+                # reader syncing this CSV never sees rows the store does not cover yet
+                self._insert_batch(stored, self._file.tell() + len(text.encode('utf-8')))
+            self._file.write(text)
+            self.stats['written'] += len(rows)
+            self.stats['batches'] += 1
+            if self._should_rotate():
+                self._open_new_file()
+        except OSError as e:
+            self.stats['write_errors'] += 1
+            self._count('dropped', len(rows))
+            print(f"Error writing event log: {e}")
+
+    def _insert_batch(self, batch, source_offset):
+        try:
+            self.store.insert_many(batch, source_offset=source_offset)
+        except sqlite3.Error as e:
+            # The CSV stays complete; EventStore.sync_csv can fill the store in later
+            self.stats['store_errors'] += 1
+            print(f"Error writing event store: {e}")
+    
+    def _run(self):
+        last_flush = time.monotonic()
+        finished = False
+        while not finished:
+            batch = []
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = self.queue.get(timeout=timeout)
+                # Gather whatever else is already waiting, up to one batch
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self.queue.get_nowait()
+                finished = item is None
+            except queue.Empty:
+                pass
+            if batch:
+                self._write_batch(batch)
+            if finished or time.monotonic() - last_flush >= self.flush_interval:
+                try:
+                    self._sync()
+                except OSError as e:
+                    self.stats['write_errors'] += 1
+                    print(f"Error flushing event log: {e}")
+                last_flush = time.monotonic()
+        self._file.close()
+        self._close_store()
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['written']} events written in {s['batches']} batches to {len(self.files)} file(s), "
+                f"{s['dropped']} dropped")
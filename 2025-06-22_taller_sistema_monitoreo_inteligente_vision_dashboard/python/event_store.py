@@ -0,0 +1,336 @@
+import contextlib
+import csv
+import datetime
+import io
+import math
+import os
+import sqlite3
+
+CAPTURE_EVENT = "Captura guardada"
+EPOCH = datetime.datetime(1970, 1, 1)
+ROLLUP_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    event TEXT NOT NULL,
+    class TEXT NOT NULL,
+    confidence REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS idx_events_class_ts ON events (class, ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    minute INTEGER NOT NULL,
+    class TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    conf_sum REAL NOT NULL,
+    conf_sum_sq REAL NOT NULL,
+    conf_min REAL NOT NULL,
+    conf_max REAL NOT NULL,
+    PRIMARY KEY (minute, class)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+# count, sum, sum of squares, min, max of the confidence, from either table
+EVENT_COLUMNS = "COUNT(*), SUM(confidence), SUM(confidence * confidence), MIN(confidence), MAX(confidence)"
+ROLLUP_COLUMNS = "SUM(count), SUM(conf_sum), SUM(conf_sum_sq), MIN(conf_min), MAX(conf_max)"
+
+
+def to_seconds(timestamp):
+    """Log timestamps are naive local datetimes; store them as seconds since 1970-01-01 (no timezone)"""
+    return (timestamp - EPOCH).total_seconds()
+
+
+def from_seconds(seconds):
+    return EPOCH + datetime.timedelta(seconds=seconds)
+
+
+def store_path_for(log_file):
+    """The store that sits next to a CSV log: logs/log_X.csv -> logs/log_X.db"""
+    return os.path.splitext(log_file)[0] + ".db"
+
+
+def read_csv_rows(csv_path, offset=0, chunk_bytes=8 * 1024 * 1024):
+    """Yield (rows, offset after them) for the complete lines of a CSV log past `offset`
+
+    A trailing line without its newline is still being written and is left
+    for the next call. Rows are (timestamp, event, class, confidence).
+    """
+    with open(csv_path, 'rb') as f:
+        f.seek(offset)
+        pending = b""
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                return
+            data = pending + chunk
+            end = data.rfind(b"\n") + 1
+            pending = data[end:]
+            rows = []
+            for record in csv.reader(io.StringIO(data[:end].decode('utf-8'))):
+                if not record or record[0] == 'timestamp':
+                    continue  # Header
+                timestamp, event, obj_class, confidence = record
+                rows.append((datetime.datetime.fromisoformat(timestamp), event, obj_class, float(confidence)))
+            offset += end
+            yield rows, offset
+
+
+class EventStore:
+    """SQLite copy of an event log, indexed on timestamp and class
+
+    The logger inserts every batch it writes to the CSV. Along with the rows
+    it stores how many CSV bytes they cover (`source_offset`). This lets
+    `sync_csv` import only what is missing, either for a CSV that was never
+    indexed or for rows written after the last insert. The query methods
+    return aggregates (counts, confidence statistics, histograms,
+    time-bucketed series), so the viewers never load the raw rows. By
+    default they skip "Captura guardada" rows, like the dashboards did.
+
+    Each insert also updates `rollups`: per minute and class, the count and
+    the confidence sum, sum of squares, min and max of the detections.
+    Queries whose window and buckets are whole minutes read these instead of
+    the events, so they cost O(minutes x classes) however many rows the log
+    has. Other windows, and the histogram bins, still read the events.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Written by the logger thread and read by the UI; WAL lets readers run during writes
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._ensure_rollups()
+
+    @classmethod
+    def for_log(cls, log_file):
+        """Open the store of a log (.db) or of a CSV log, importing whatever it is missing"""
+        if log_file.endswith(".db"):
+            return cls(log_file)
+        store = cls(store_path_for(log_file))
+        store.sync_csv(log_file)
+        return store
+
+    def close(self):
+        self.conn.close()
+
+    def _meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    @property
+    def source_offset(self):
+        return self._meta('source_offset', 0)
+
+    def _ensure_rollups(self):
+        """Stores written before the rollups existed get them built once from their events"""
+        if self._meta('rollups_built'):
+            return
+        with self.conn:
+            self.conn.execute("DELETE FROM rollups")
+            self.conn.execute(
+                f"INSERT INTO rollups SELECT CAST(ts / {ROLLUP_SECONDS} AS INTEGER) AS minute, class, {EVENT_COLUMNS} "
+                "FROM events WHERE event != ? GROUP BY minute, class", (CAPTURE_EVENT,))
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rollups_built', 1)")
+
+    def insert_many(self, rows, source_offset=None):
+        """Insert (timestamp, event, class, confidence) rows and fold them into the rollups, in one transaction"""
+        with self.conn:
+            self._insert(rows, source_offset)
+
+    def _insert(self, rows, source_offset=None):
+        """insert_many's statements, inside the caller's transaction"""
+        events = [(to_seconds(timestamp), event, obj_class, float(confidence))
+                  for timestamp, event, obj_class, confidence in rows]
+        rollups = {}
+        for ts, event, obj_class, confidence in events:
+            if event == CAPTURE_EVENT:
+                continue
+            key = (int(ts // ROLLUP_SECONDS), obj_class)
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollups[key] = [1, confidence, confidence * confidence, confidence, confidence]
+            else:
+                rollup[0] += 1
+                rollup[1] += confidence
+                rollup[2] += confidence * confidence
+                rollup[3] = min(rollup[3], confidence)
+                rollup[4] = max(rollup[4], confidence)
+        self.conn.executemany("INSERT INTO events (ts, event, class, confidence) VALUES (?, ?, ?, ?)", events)
+        self.conn.executemany(
+            "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (minute, class) DO UPDATE SET "
+            "count = count + excluded.count, conf_sum = conf_sum + excluded.conf_sum, "
+            "conf_sum_sq = conf_sum_sq + excluded.conf_sum_sq, "
+            "conf_min = MIN(conf_min, excluded.conf_min), conf_max = MAX(conf_max, excluded.conf_max)",
+            [key + tuple(rollup) for key, rollup in rollups.items()])
+        if source_offset is not None:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source_offset', ?)",
+                              (source_offset,))
+
+    def sync_csv(self, csv_path, chunk_bytes=8 * 1024 * 1024):
+        """Import the complete lines appended to `csv_path` since the last sync; returns rows added
+
+        The logger may be inserting into the same store. Each chunk is imported
+        in its own BEGIN IMMEDIATE transaction that re-reads `source_offset`
+        after taking the write lock, so a batch the logger committed in the
+        meantime is skipped instead of imported twice.
+        """
+        if os.path.getsize(csv_path) <= self.source_offset:
+            return 0  # source_offset only grows, so a stale read can only send us to the check below
+        added = 0
+        while True:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                offset = self.source_offset
+                chunks = read_csv_rows(csv_path, offset, chunk_bytes)
+                rows, end = next(chunks, ([], offset))
+                chunks.close()
+                if end > offset:
+                    self._insert(rows, source_offset=end)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            added += len(rows)
+            if end <= offset:
+                return added
+
+    @contextlib.contextmanager
+    def snapshot(self):
+        """Run several queries against one consistent state of the store (a read transaction)"""
+        self.conn.execute("BEGIN")
+        try:
+            yield self
+        finally:
+            self.conn.execute("ROLLBACK")
+
+    def _where(self, start=None, end=None, obj_class=None, detections_only=True):
+        clauses, params = [], []
+        if detections_only:
+            clauses.append("event != ?")
+            params.append(CAPTURE_EVENT)
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(to_seconds(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(to_seconds(end))
+        if obj_class is not None:
+            clauses.append("class = ?")
+            params.append(obj_class)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _rollup_where(self, start=None, end=None, obj_class=None):
+        """WHERE clause over the rollups, or None when the window does not fall on whole minutes"""
+        clauses, params = [], []
+        for bound, operator in ((start, ">="), (end, "<")):
+            if bound is None:
+                continue
+            seconds = to_seconds(bound)
+            if seconds % ROLLUP_SECONDS:
+                return None
+            clauses.append(f"minute {operator} ?")
+            params.append(int(seconds // ROLLUP_SECONDS))
+        if obj_class is not None:
+            clauses.append("class = ?")
+            params.append(obj_class)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _source(self, start=None, end=None, obj_class=None, bucket_seconds=None):
+        """(FROM ... WHERE ..., params, bucket expression, stats columns) for a detection aggregate
+
+        Uses the rollups when the window and the buckets are whole minutes,
+        the events otherwise.
+        """
+        rollup_where = self._rollup_where(start, end, obj_class)
+        if rollup_where is not None and (bucket_seconds is None or bucket_seconds % ROLLUP_SECONDS == 0):
+            where, params = rollup_where
+            bucket = f"minute / {int(bucket_seconds) // ROLLUP_SECONDS}" if bucket_seconds else None
+            return f"rollups{where}", params, bucket, ROLLUP_COLUMNS
+        where, params = self._where(start, end, obj_class)
+        bucket = f"CAST(ts / {int(bucket_seconds)} AS INTEGER)" if bucket_seconds else None
+        return f"events{where}", params, bucket, EVENT_COLUMNS
+
+    def count(self, start=None, end=None, obj_class=None):
+        return self.confidence_stats(start, end, obj_class=obj_class)['count']
+
+    def class_counts(self, start=None, end=None):
+        """[(class, count)] sorted by count, most frequent first"""
+        source, params, _, columns = self._source(start, end)
+        rows = self.conn.execute(f"SELECT class, {columns} FROM {source} GROUP BY class", params)
+        return sorted(((row[0], row[1]) for row in rows), key=lambda x: x[1], reverse=True)
+
+    def confidence_stats(self, start=None, end=None, by_class=False, obj_class=None):
+        """count/mean/std/min/max of the confidence, overall or as {class: stats}"""
+        source, params, _, columns = self._source(start, end, obj_class)
+        if not by_class:
+            return self._stats(*self.conn.execute(f"SELECT {columns} FROM {source}", params).fetchone())
+        rows = self.conn.execute(f"SELECT class, {columns} FROM {source} GROUP BY class", params)
+        return {row[0]: self._stats(*row[1:]) for row in rows}
+
+    @staticmethod
+    def _stats(count, total, total_sq, minimum, maximum):
+        if not count:
+            return {'count': 0, 'mean': float('nan'), 'std': float('nan'), 'min': None, 'max': None}
+        mean = total / count
+        # Sample standard deviation, like pandas
+        variance = (total_sq - count * mean * mean) / (count - 1) if count > 1 else float('nan')
+        return {'count': count, 'mean': mean, 'std': math.sqrt(max(variance, 0.0)),
+                'min': minimum, 'max': maximum}
+
+    def confidence_histogram(self, bins=10, start=None, end=None):
+        """(edges, counts) with `bins` equal-width bins between the min and max confidence"""
+        stats = self.confidence_stats(start, end)
+        if not stats['count']:
+            return [], []
+        low, high = stats['min'], stats['max']
+        if high == low:
+            low, high = low - 0.5, high + 0.5  # Same fallback as numpy for a constant sample
+        width = (high - low) / bins
+        where, params = self._where(start, end)
+        counts = [0] * bins
+        rows = self.conn.execute(
+            f"SELECT MIN(CAST((confidence - ?) / ? AS INTEGER), ?) AS bin, COUNT(*) FROM events{where} GROUP BY bin",
+            [low, width, bins - 1] + params)
+        for index, count in rows:
+            counts[index] += count
+        return [low + i * width for i in range(bins + 1)], counts
+
+    def time_series(self, bucket_seconds=300, start=None, end=None, obj_class=None):
+        """[(bucket start, count)] for non-empty buckets, like `dt.floor(...)` + `groupby().size()`"""
+        return [(start_time, stats['count'])
+                for start_time, stats in self.bucket_stats(bucket_seconds, start, end, obj_class)]
+
+    def bucket_stats(self, bucket_seconds=3600, start=None, end=None, obj_class=None):
+        """[(bucket start, count/mean/std/min/max)] for non-empty buckets"""
+        source, params, bucket, columns = self._source(start, end, obj_class, bucket_seconds)
+        rows = self.conn.execute(
+            f"SELECT {bucket} AS bucket, {columns} FROM {source} GROUP BY bucket ORDER BY bucket", params)
+        return [(from_seconds(row[0] * bucket_seconds), self._stats(*row[1:])) for row in rows]
+
+    def confidence_values(self, start=None, end=None):
+        """{confidence in hundredths: count}; the CSV and the logger's inserts keep two decimals, so this is exact"""
+        where, params = self._where(start, end)
+        rows = self.conn.execute(
+            f"SELECT CAST(ROUND(confidence * 100) AS INTEGER) AS value, COUNT(*) FROM events{where} GROUP BY value",
+            params)
+        return dict(rows.fetchall())
+
+    def recent_events(self, limit=50):
+        """The newest rows (captures included), newest first"""
+        rows = self.conn.execute(
+            "SELECT ts, event, class, confidence FROM events ORDER BY ts DESC, id DESC LIMIT ?", (limit,))
+        return [(from_seconds(ts), event, obj_class, confidence) for ts, event, obj_class, confidence in rows]
+
+    def last_detection(self):
+        """(timestamp, class) of the newest detection, or None"""
+        where, params = self._where()
+        row = self.conn.execute(
+            f"SELECT ts, class FROM events{where} ORDER BY ts DESC, id DESC LIMIT 1", params).fetchone()
+        return (from_seconds(row[0]), row[1]) if row else None
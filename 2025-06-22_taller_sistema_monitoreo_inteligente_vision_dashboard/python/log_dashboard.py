@@ -1,4 +1,3 @@
-import pandas as pd
 import tkinter as tk
 from tkinter import ttk, filedialog
 import matplotlib.pyplot as plt
@@ -6,8 +5,55 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import os
 import threading
 import time
+from collections import defaultdict, deque
 from datetime import datetime
 
+from event_store import CAPTURE_EVENT, EventStore, from_seconds, read_csv_rows, to_seconds
+
+class LogAggregates:
+    """Running statistics of a log, seeded once from its store and then updated with appended rows"""
+    
+    BUCKET_SECONDS = 300  # 'Detections Over Time' uses 5-minute buckets
+    
+    def __init__(self):
+        self.class_counts = defaultdict(int)
+        self.class_sums = defaultdict(float)     # confidence sum per class
+        self.values = defaultdict(int)           # confidence in hundredths -> count
+        self.buckets = defaultdict(int)          # bucket start -> detections
+        self.last_detection = None               # (timestamp, class)
+        self.recent = deque(maxlen=50)           # newest rows, captures included, oldest first
+    
+    @classmethod
+    def from_store(cls, store):
+        aggregates = cls()
+        for obj_class, stats in store.confidence_stats(by_class=True).items():
+            aggregates.class_counts[obj_class] = stats['count']
+            aggregates.class_sums[obj_class] = stats['mean'] * stats['count']
+        aggregates.values.update(store.confidence_values())
+        aggregates.buckets.update(store.time_series(bucket_seconds=cls.BUCKET_SECONDS))
+        aggregates.last_detection = store.last_detection()
+        aggregates.recent.extend(reversed(store.recent_events(aggregates.recent.maxlen)))
+        return aggregates
+    
+    def fold(self, rows):
+        """Add appended rows; returns what changed ('classes', 'detections', 'events')"""
+        changed = set()
+        for timestamp, event, obj_class, confidence in rows:
+            self.recent.append((timestamp, event, obj_class, confidence))
+            changed.add('events')
+            if event == CAPTURE_EVENT:
+                continue
+            if obj_class not in self.class_counts:
+                changed.add('classes')
+            self.class_counts[obj_class] += 1
+            self.class_sums[obj_class] += confidence
+            self.values[round(confidence * 100)] += 1
+            bucket = to_seconds(timestamp) // self.BUCKET_SECONDS * self.BUCKET_SECONDS
+            self.buckets[from_seconds(bucket)] += 1
+            self.last_detection = (timestamp, obj_class)
+            changed.add('detections')
+        return changed
+
 class LogDashboardViewer:
     def __init__(self, root, log_file=None):
         """Initialize the dashboard for viewing log files"""
@@ -17,7 +63,9 @@ class LogDashboardViewer:
         
         # Variables
         self.log_file = log_file
-        self.df = None
+        self.aggregates = None
+        self.follow_path = None  # CSV followed by auto-update
+        self.follow_offset = 0   # bytes of it already folded into the aggregates
         self.update_interval = 5000  # ms
         self.auto_update = False
         
@@ -104,7 +152,7 @@ class LogDashboardViewer:
     
     def browse_log(self):
         """Open file dialog to select log file"""
-        filetypes = [("CSV files", "*.csv"), ("All files", "*.*")]
+        filetypes = [("CSV files", "*.csv"), ("Event stores", "*.db"), ("All files", "*.*")]
         filename = filedialog.askopenfilename(
             title="Select Log File",
             filetypes=filetypes
@@ -113,17 +161,24 @@ class LogDashboardViewer:
             self.log_path_var.set(filename)
     
     def load_log(self):
-        """Load and display log data"""
+        """Open the indexed store of the log and display its aggregates"""
         log_path = self.log_path_var.get()
         if not log_path or not os.path.exists(log_path):
             return
         
         try:
+            # A CSV without a store (sample logs, older logs) is imported once
+            store = EventStore.for_log(log_path)
+            try:
+                # Aggregates and the byte offset they cover must come from the same state
+                with store.snapshot():
+                    self.aggregates = LogAggregates.from_store(store)
+                    self.follow_offset = store.source_offset
+            finally:
+                store.close()
             self.log_file = log_path
-            self.df = pd.read_csv(log_path)
-            
-            # Convert timestamp to datetime
-            self.df['timestamp'] = pd.to_datetime(self.df['timestamp'])
+            csv_path = os.path.splitext(log_path)[0] + ".csv"
+            self.follow_path = csv_path if os.path.exists(csv_path) else None
             
             # Update statistics
             self.update_statistics()
@@ -137,22 +192,42 @@ class LogDashboardViewer:
         except Exception as e:
             print(f"Error loading log file: {e}")
     
+    def follow_log(self):
+        """Parse only the rows appended to the CSV since the last refresh and redraw what they changed"""
+        if self.follow_path is None or not os.path.exists(self.follow_path):
+            return
+        if os.path.getsize(self.follow_path) <= self.follow_offset:
+            return
+        
+        try:
+            changed = set()
+            for rows, self.follow_offset in read_csv_rows(self.follow_path, self.follow_offset):
+                changed |= self.aggregates.fold(rows)
+            
+            if 'detections' in changed:
+                self.update_statistics()
+                # A new class changes the bar categories and needs a new layout
+                self.update_visualizations(relayout='classes' in changed)
+            if 'events' in changed:
+                self.update_event_log()
+        except Exception as e:
+            print(f"Error following log file: {e}")
+    
     def update_statistics(self):
         """Update summary statistics"""
-        if self.df is None:
+        if self.aggregates is None:
             return
         
-        # Filter out 'Captura guardada' events for counting detections
-        detections = self.df[self.df['evento'] != 'Captura guardada']
+        # The aggregates skip 'Captura guardada' events when counting detections
+        total_detections = sum(self.aggregates.class_counts.values())
+        unique_classes = len(self.aggregates.class_counts)
+        avg_confidence = (sum(self.aggregates.class_sums.values()) / total_detections
+                          if total_detections else float('nan'))
         
-        total_detections = len(detections)
-        unique_classes = detections['clase'].nunique()
-        avg_confidence = detections['confianza'].mean()
-        
-        if not detections.empty:
-            last_detection = detections.iloc[-1]
-            last_detection_time = last_detection['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
-            last_detection_class = last_detection['clase']
+        last_detection = self.aggregates.last_detection
+        if last_detection is not None:
+            last_detection_time = last_detection[0].strftime('%Y-%m-%d %H:%M:%S')
+            last_detection_class = last_detection[1]
         else:
             last_detection_time = "N/A"
             last_detection_class = "N/A"
@@ -163,74 +238,71 @@ class LogDashboardViewer:
         self.avg_confidence_var.set(f"Avg Confidence: {avg_confidence:.2f}")
         self.last_detection_var.set(f"Last Detection: {last_detection_class} at {last_detection_time}")
     
-    def update_visualizations(self):
-        """Update all visualizations"""
-        if self.df is None:
+    def update_visualizations(self, relayout=True):
+        """Update all visualizations from the aggregates (cost depends on classes and buckets, not rows)"""
+        if self.aggregates is None:
             return
+        aggregates = self.aggregates
         
         # Clear previous plots
         for ax in self.axs.flat:
             ax.clear()
         
-        # Filter out 'Captura guardada' events for analysis
-        detections = self.df[self.df['evento'] != 'Captura guardada']
-        
         # 1. Count by class
-        class_counts = detections['clase'].value_counts()
-        self.axs[0, 0].bar(class_counts.index, class_counts.values, color='skyblue')
+        class_counts = sorted(aggregates.class_counts.items(), key=lambda x: x[1], reverse=True)
+        self.axs[0, 0].bar([c for c, _ in class_counts], [n for _, n in class_counts], color='skyblue')
         self.axs[0, 0].set_title('Detections by Class')
         self.axs[0, 0].set_ylabel('Count')
         self.axs[0, 0].set_xlabel('Class')
         self.axs[0, 0].tick_params(axis='x', rotation=45)
         
-        # 2. Confidence distribution
-        self.axs[0, 1].hist(detections['confianza'], bins=10, color='lightgreen', edgecolor='black')
+        # 2. Confidence distribution (10 bins between the min and max, from the value counts)
+        if aggregates.values:
+            values = sorted(aggregates.values)
+            self.axs[0, 1].hist([v / 100 for v in values], bins=10, weights=[aggregates.values[v] for v in values],
+                                color='lightgreen', edgecolor='black')
         self.axs[0, 1].set_title('Confidence Distribution')
         self.axs[0, 1].set_xlabel('Confidence')
         self.axs[0, 1].set_ylabel('Frequency')
         
-        # 3. Events over time
-        detections['time_interval'] = detections['timestamp'].dt.floor('5min')
-        time_series = detections.groupby('time_interval').size()
+        # 3. Events over time, in 5-minute buckets
+        time_series = sorted(aggregates.buckets.items())
         
-        self.axs[1, 0].plot(time_series.index, time_series.values, marker='o', linestyle='-', color='orange')
+        self.axs[1, 0].plot([t for t, _ in time_series], [n for _, n in time_series],
+                            marker='o', linestyle='-', color='orange')
         self.axs[1, 0].set_title('Detections Over Time')
         self.axs[1, 0].set_xlabel('Time')
         self.axs[1, 0].set_ylabel('Number of Detections')
         self.axs[1, 0].tick_params(axis='x', rotation=45)
         
         # 4. Confidence by class
-        class_confidence = detections.groupby('clase')['confianza'].mean().sort_values(ascending=False)
-        self.axs[1, 1].bar(class_confidence.index, class_confidence.values, color='lightcoral')
+        class_confidence = sorted(((c, aggregates.class_sums[c] / n) for c, n in aggregates.class_counts.items()),
+                                  key=lambda x: x[1], reverse=True)
+        self.axs[1, 1].bar([c for c, _ in class_confidence], [m for _, m in class_confidence], color='lightcoral')
         self.axs[1, 1].set_title('Average Confidence by Class')
         self.axs[1, 1].set_xlabel('Class')
         self.axs[1, 1].set_ylabel('Avg Confidence')
         self.axs[1, 1].set_ylim(0, 1.0)
         self.axs[1, 1].tick_params(axis='x', rotation=45)
         
-        # Adjust layout
-        self.fig.tight_layout()
-        self.canvas.draw()
+        # Adjust layout and draw
+        if relayout:
+            self.fig.tight_layout()
+        self.canvas.draw_idle()
     
     def update_event_log(self):
         """Update the event log table"""
-        if self.df is None:
+        if self.aggregates is None:
             return
         
         # Clear existing items
         for item in self.tree.get_children():
             self.tree.delete(item)
         
-        # Add the most recent 50 events (or fewer if there aren't that many)
-        recent_events = self.df.tail(50).iloc[::-1]  # Reverse to show newest first
-        
-        for _, row in recent_events.iterrows():
-            timestamp = row['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
-            event = row['evento']
-            obj_class = row['clase']
-            confidence = f"{row['confianza']:.2f}"
-            
-            self.tree.insert("", "end", values=(timestamp, event, obj_class, confidence))
+        # Add the most recent 50 events (or fewer if there aren't that many), newest first
+        for timestamp, event, obj_class, confidence in reversed(self.aggregates.recent):
+            self.tree.insert("", "end", values=(timestamp.strftime('%Y-%m-%d %H:%M:%S'), event,
+                                                obj_class, f"{confidence:.2f}"))
     
     def toggle_auto_update(self):
         """Toggle automatic updates"""
@@ -243,12 +315,15 @@ class LogDashboardViewer:
     def schedule_update(self):
         """Schedule the next update if auto-update is enabled"""
         if self.auto_update:
-            self.load_log()  # Reload the log file
+            if self.aggregates is None or self.log_file != self.log_path_var.get():
+                self.load_log()  # First load, or a different log was selected
+            else:
+                self.follow_log()  # Only the rows appended since the last tick
             self.root.after(self.update_interval, self.schedule_update)
     
     def export_visualization(self):
         """Export current visualization to a file"""
-        if self.df is None:
+        if self.aggregates is None:
             return
         
         filetypes = [("PNG files", "*.png"), ("All files", "*.*")]
@@ -1,11 +1,13 @@
+import argparse
 import cv2
+import math
 import numpy as np
 import os
-import csv
 import time
 import datetime
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.ticker import FuncFormatter
 import tkinter as tk
 from tkinter import ttk
 from collections import defaultdict
@@ -13,6 +15,15 @@ import threading
 import queue
 import pandas as pd
 
+from event_logger import EventLogger
+from capture_writer import CaptureWriter
+
+# Latest-frame grabber, single-slot hand-off and batched detector worker
+# (copies of the modules from the 3D visual monitor workshop)
+from detector_workers import BatchedDetectorWorker
+from frame_grabber import FrameGrabber
+from latest_value import LatestValue
+
 # Try to import YOLOv8, if not available, fallback to cvlib
 try:
     from ultralytics import YOLO
@@ -24,9 +35,35 @@ except ImportError:
     USING_YOLO = False
     print("Using cvlib for detection")
 
+class CameraFeed:
+    """One video source: its capture, its latest-frame grabber and its tile in the video grid"""
+    
+    def __init__(self, camera_id, source, parent, display_size, titled=True):
+        self.camera_id = camera_id
+        self.source = source
+        self.display_size = display_size
+        self.cap = cv2.VideoCapture(source)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        # Read the camera on its own thread and keep only the newest frame
+        self.grabber = FrameGrabber(self.cap, drop_frames=True, name=f"monitor-grabber-{camera_id}").start()
+        self.frame_age_ms = None
+        
+        # With a single camera the label goes straight into the video panel
+        self.frame = ttk.LabelFrame(parent, text=f"Camera {source}") if titled else None
+        self.label = ttk.Label(self.frame if titled else parent)
+        self.label.pack(padx=5, pady=5)
+
 class IntelligentMonitoringSystem:
-    def __init__(self, root, camera_id=0):
-        """Initialize the monitoring system with UI components"""
+    PLOT_TIME_HEADROOM = 30.0  # seconds of empty time axis kept ahead of the newest point
+    
+    def __init__(self, root, sources=(0,), capture_quality=85, capture_max_width=None,
+                 capture_budget_mb=500, max_batch=8):
+        """Initialize the monitoring system with UI components
+
+        Every source (camera index, file or stream URL) gets its own grabber and
+        processing thread, while a single detector service runs the model on
+        the newest frame of all cameras as one batch.
+        """
         self.root = root
         self.root.title("Intelligent Monitoring System")
         self.root.geometry("1200x700")
@@ -41,33 +78,50 @@ class IntelligentMonitoringSystem:
         os.makedirs(self.captures_dir, exist_ok=True)
         os.makedirs(self.logs_dir, exist_ok=True)
         
-        # Initialize log file
-        self.log_file = os.path.join(self.logs_dir, f"log_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-        with open(self.log_file, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['timestamp', 'evento', 'clase', 'confianza'])
+        # Event log written in batches by its own thread (rotates by size or age)
+        self.logger = EventLogger(self.logs_dir)
         
-        # Initialize video capture
-        self.camera_id = camera_id
-        self.cap = cv2.VideoCapture(camera_id)
+        # Captures are hashed, encoded and written by a writer pool; near-duplicates
+        # are skipped and the oldest captures are evicted past the disk budget
+        self.capture_writer = CaptureWriter(self.captures_dir, quality=capture_quality,
+                                            max_width=capture_max_width,
+                                            budget_bytes=capture_budget_mb * 1024 * 1024,
+                                            on_saved=self.on_capture_saved)
+        
+        self.sources = list(sources)
         self.running = True
         
-        # Initialize detection model
+        # Initialize detection model, loaded once and shared by all cameras
         if USING_YOLO:
             self.model = YOLO("yolov8n.pt")  # Using YOLOv8 nano model
+        self.detector = BatchedDetectorWorker('yolo' if USING_YOLO else 'cvlib', self.detect_batch,
+                                              max_batch=min(max_batch, len(self.sources)))
         
-        # Setup data structures for tracking statistics
+        # Setup data structures for tracking statistics, keyed by camera and class
+        # (see stat_key); a lock because every camera thread updates them
+        self.stats_lock = threading.Lock()
         self.detection_counts = defaultdict(int)
         self.detection_history = defaultdict(list)
         self.last_detected = defaultdict(float)
-        self.detection_cooldown = 2.0  # seconds between logging the same object class
+        self.detection_cooldown = 2.0  # seconds between logging the same object class on a camera
+        # Bumped by the detection thread so the UI redraws plots only after a change
+        self.counts_version = 0
+        self.history_version = 0
         
-        # Setup frame for video
-        self.video_frame = ttk.LabelFrame(root, text="Live Video Feed")
+        # Setup frame for video: a grid of feeds, each scaled to fit a 640x480 area
+        multi = len(self.sources) > 1
+        self.video_frame = ttk.LabelFrame(root, text="Live Video Feeds" if multi else "Live Video Feed")
         self.video_frame.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
         
-        self.video_label = ttk.Label(self.video_frame)
-        self.video_label.pack(padx=5, pady=5)
+        columns = math.ceil(math.sqrt(len(self.sources)))
+        display_size = (640 // columns, 480 // columns)
+        self.feeds = []
+        for camera_id, source in enumerate(self.sources):
+            feed = CameraFeed(camera_id, source, self.video_frame, display_size, titled=multi)
+            if feed.frame is not None:
+                feed.frame.grid(row=camera_id // columns, column=camera_id % columns, padx=2, pady=2)
+            self.detector.register(camera_id)
+            self.feeds.append(feed)
         
         # Setup frame for statistics
         self.stats_frame = ttk.LabelFrame(root, text="Detection Statistics")
@@ -78,11 +132,14 @@ class IntelligentMonitoringSystem:
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.stats_frame)
         self.canvas_widget = self.canvas.get_tk_widget()
         self.canvas_widget.pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
+        self._init_plots()
         
         # Setup frame for system status
         self.status_frame = ttk.LabelFrame(root, text="System Status")
         self.status_frame.grid(row=1, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
         
+        self.camera_status = {}  # camera_id -> (headline, details) from its processing thread
+        self.detector_rate = (time.perf_counter(), 0, 0.0)  # (when, frames, frames/s) for the status bar
         self.status_var = tk.StringVar(value="System starting...")
         self.status_label = ttk.Label(self.status_frame, textvariable=self.status_var, font=("Helvetica", 12))
         self.status_label.pack(padx=5, pady=5)
@@ -94,8 +151,11 @@ class IntelligentMonitoringSystem:
         self.events_text = tk.Text(self.events_frame, height=6, width=80)
         self.events_text.pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
         
-        # Queue for safe thread communication
-        self.queue = queue.Queue()
+        # Thread communication: the newest display-ready frame in a single slot (older ones
+        # are overwritten, never queued) and a small bounded queue for events and status
+        self.latest_frame = LatestValue()
+        self.queue = queue.Queue(maxsize=100)
+        self.dropped_messages = 0
         
         # Configure grid weights
         root.grid_columnconfigure(0, weight=3)
@@ -104,91 +164,103 @@ class IntelligentMonitoringSystem:
         root.grid_rowconfigure(1, weight=1)
         root.grid_rowconfigure(2, weight=1)
         
-        # Start processing threads
-        self.processing_thread = threading.Thread(target=self.process_video)
-        self.processing_thread.daemon = True
-        self.processing_thread.start()
+        # Start the shared detector and one processing thread per camera
+        self.detector.start()
+        self.processing_threads = []
+        for feed in self.feeds:
+            thread = threading.Thread(target=self.process_camera, args=(feed,),
+                                      name=f"monitor-camera-{feed.camera_id}", daemon=True)
+            thread.start()
+            self.processing_threads.append(thread)
         
         # Start UI update
         self.update_ui()
     
-    def process_video(self):
-        """Process video frames and detect objects in a separate thread"""
+    def stat_key(self, camera_id, obj_class):
+        """Key for counts, history and cooldowns: the class, prefixed by the camera when there are several"""
+        return obj_class if len(self.feeds) == 1 else f"cam{camera_id}:{obj_class}"
+    
+    def process_camera(self, feed):
+        """Process one camera in its own thread; detection runs in the shared batched service"""
+        last_frame_id = 0
+        last_version = 0
         while self.running:
-            ret, frame = self.cap.read()
-            if not ret:
-                self.status_var.set("Error: Could not read from camera")
-                time.sleep(0.1)
+            # Newest frame only: frames captured while detecting are dropped, not queued
+            grabbed = feed.grabber.wait(last_frame_id, timeout=0.5)
+            if grabbed is None:
+                self.post("status", (feed.camera_id, "Error: Could not read from camera", ""))
                 continue
+            last_frame_id = grabbed.frame_id
             
-            # Perform object detection
-            current_time = time.time()
-            frame_with_boxes, detections = self.detect_objects(frame)
-            
-            # Process detections
+            # Hand the frame to the detector, which batches it with the other cameras' frames
+            self.detector.submit(feed.camera_id, grabbed.frame, grabbed.frame_id)
+            result = self.detector.wait_result(feed.camera_id, last_version, timeout=5.0)
+            if result is None:
+                continue
+            last_version = result.version
+            frame_with_boxes, detections = result.data
+            self.process_detections(feed, grabbed, frame_with_boxes, detections)
+    
+    def process_detections(self, feed, grabbed, frame_with_boxes, detections):
+        """Counts, cooldown-gated events and captures, display frame and status for one camera"""
+        frame = grabbed.frame
+        # Cooldowns and log timestamps use the capture time
+        current_time = grabbed.wall_time
+        latency_ms = (time.perf_counter() - grabbed.capture_time) * 1000
+        camera_note = f" (camera {feed.source})" if len(self.feeds) > 1 else ""
+        
+        # Process detections
+        with self.stats_lock:
             for obj_class, confidence, _ in detections:
-                self.detection_counts[obj_class] += 1
+                key = self.stat_key(feed.camera_id, obj_class)
+                self.detection_counts[key] += 1
                 
-                # Check if we should log this detection (cooldown)
-                if current_time - self.last_detected[obj_class] > self.detection_cooldown:
-                    self.last_detected[obj_class] = current_time
-                    timestamp = datetime.datetime.now()
+                # Check if we should log this detection (cooldown per camera and class)
+                if current_time - self.last_detected[key] > self.detection_cooldown:
+                    self.last_detected[key] = current_time
+                    timestamp = datetime.datetime.fromtimestamp(current_time)
                     
                     # Log the detection
-                    event = f"{obj_class.capitalize()} detected"
+                    event = f"{obj_class.capitalize()} detected{camera_note}"
                     self.log_event(timestamp, event, obj_class, confidence)
                     
-                    # Save capture
-                    capture_path = os.path.join(self.captures_dir, 
-                                             f"{obj_class}_{timestamp.strftime('%Y%m%d_%H%M%S')}.jpg")
-                    cv2.imwrite(capture_path, frame)
-                    
-                    # Log capture saved event
-                    self.log_event(timestamp, "Captura guardada", obj_class, confidence)
+                    # Save capture (queued; "Captura guardada" is logged once it is written)
+                    source = f"cam{feed.camera_id}" if len(self.feeds) > 1 else None
+                    self.capture_writer.submit(frame, obj_class, timestamp, confidence, source=source)
                     
                     # Add to history with timestamp for plotting
-                    timestamp_str = timestamp.strftime('%H:%M:%S')
-                    self.detection_history[obj_class].append((timestamp_str, confidence))
+                    self.detection_history[key].append((current_time, confidence))
+                    self.history_version += 1
                     
                     # Put event in queue for UI thread
                     event_text = f"{timestamp.strftime('%H:%M:%S')} - {event} (Confidence: {confidence:.2f})"
-                    self.queue.put(("event", event_text))
+                    self.post("event", event_text)
             
-            # Put frame in queue for UI thread
-            self.queue.put(("frame", frame_with_boxes))
-            
-            # Update status based on detections
             if detections:
-                status = "ALERT: Objects detected!"
-            else:
-                status = "Monitoring: No objects detected"
-            self.queue.put(("status", status))
-            
-            # Slight delay to reduce CPU usage
-            time.sleep(0.01)
+                self.counts_version += 1
+        
+        # Prepare the frame for Tk here so the UI thread only builds the PhotoImage
+        self.latest_frame.publish((self.encode_for_display(frame_with_boxes, feed.display_size),
+                                   grabbed.capture_time), key=feed.camera_id)
+        
+        # Update status based on detections
+        if detections:
+            headline = "ALERT: Objects detected!"
+        else:
+            headline = "Monitoring: No objects detected"
+        details = f"Latency from capture: {latency_ms:.0f} ms, dropped frames: {feed.grabber.stats['dropped']}"
+        self.post("status", (feed.camera_id, headline, details))
+    
+    def detect_batch(self, frames):
+        """Shared detection service: one model call for the newest frame of every camera"""
+        if USING_YOLO:
+            return [self.parse_yolo_result(result) for result in self.model(frames)]
+        return [self.detect_objects(frame) for frame in frames]
     
     def detect_objects(self, frame):
         """Detect objects in frame using YOLO or cvlib"""
         if USING_YOLO:
-            results = self.model(frame)
-            result = results[0]
-            
-            # Draw bounding boxes
-            annotated_frame = result.plot()
-            
-            # Extract detections
-            detections = []
-            boxes = result.boxes.xyxy.cpu().numpy()
-            confidences = result.boxes.conf.cpu().numpy()
-            class_ids = result.boxes.cls.cpu().numpy().astype(int)
-            
-            for i, box in enumerate(boxes):
-                class_id = class_ids[i]
-                confidence = confidences[i]
-                obj_class = result.names[class_id]
-                detections.append((obj_class, confidence, box))
-            
-            return annotated_frame, detections
+            return self.parse_yolo_result(self.model(frame)[0])
         else:
             # Using cvlib for detection
             bbox, labels, confidences = cv.detect_common_objects(frame)
@@ -200,42 +272,85 @@ class IntelligentMonitoringSystem:
             
             return annotated_frame, detections
     
+    def parse_yolo_result(self, result):
+        """Annotated frame and (class, confidence, box) detections from one YOLO result"""
+        # Draw bounding boxes
+        annotated_frame = result.plot()
+        
+        # Extract detections
+        detections = []
+        boxes = result.boxes.xyxy.cpu().numpy()
+        confidences = result.boxes.conf.cpu().numpy()
+        class_ids = result.boxes.cls.cpu().numpy().astype(int)
+        
+        for i, box in enumerate(boxes):
+            class_id = class_ids[i]
+            confidence = confidences[i]
+            obj_class = result.names[class_id]
+            detections.append((obj_class, confidence, box))
+        
+        return annotated_frame, detections
+    
+    @property
+    def log_file(self):
+        """CSV file currently being written (changes when the log rotates)"""
+        return self.logger.current_file
+    
     def log_event(self, timestamp, event, obj_class, confidence):
-        """Log event to CSV file"""
-        with open(self.log_file, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                event,
-                obj_class,
-                f"{confidence:.2f}"
-            ])
+        """Queue an event for the logger thread (no file I/O on the detection loop)"""
+        self.logger.log(timestamp, event, obj_class, confidence)
+    
+    def on_capture_saved(self, path, obj_class, timestamp, confidence):
+        """Called from a capture writer thread after a capture is on disk"""
+        self.log_event(timestamp, "Captura guardada", obj_class, confidence)
+    
+    def post(self, msg_type, data):
+        """Send an event or status to the UI without blocking; drops it if the UI is behind"""
+        try:
+            self.queue.put_nowait((msg_type, data))
+        except queue.Full:
+            self.dropped_messages += 1
+    
+    def encode_for_display(self, frame, size=(640, 480)):
+        """RGB conversion, resize and PPM encoding for a Tk video label (camera thread)"""
+        img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        img = cv2.resize(img, size)
+        return cv2.imencode('.ppm', img)[1].tobytes()
     
     def update_ui(self):
         """Update UI components from the main thread"""
         try:
-            while not self.queue.empty():
-                msg_type, data = self.queue.get_nowait()
-                
-                if msg_type == "frame":
-                    # Update video frame
-                    img = cv2.cvtColor(data, cv2.COLOR_BGR2RGB)
-                    img = cv2.resize(img, (640, 480))
-                    img = tk.PhotoImage(data=cv2.imencode('.ppm', img)[1].tobytes())
-                    self.video_label.config(image=img)
-                    self.video_label.image = img
+            while True:
+                try:
+                    msg_type, data = self.queue.get_nowait()
+                except queue.Empty:
+                    break
                 
-                elif msg_type == "status":
-                    # Update status
-                    self.status_var.set(data)
+                if msg_type == "status":
+                    # Update status of one camera
+                    camera_id, headline, details = data
+                    self.camera_status[camera_id] = (headline, details)
+                    feed = self.feeds[camera_id]
+                    if feed.frame is not None:
+                        feed.frame.config(text=f"Camera {feed.source}  |  {details}" if details
+                                          else f"Camera {feed.source}")
                 
                 elif msg_type == "event":
                     # Update events text
                     self.events_text.insert(tk.END, data + "\n")
                     self.events_text.see(tk.END)
             
+            # Show only the newest frame of each camera; older ones were overwritten in the slot
+            for camera_id, (ppm, capture_time) in self.latest_frame.take().items():
+                feed = self.feeds[camera_id]
+                img = tk.PhotoImage(data=ppm)
+                feed.label.config(image=img)
+                feed.label.image = img
+                feed.frame_age_ms = (time.perf_counter() - capture_time) * 1000
+            
             # Update statistics plots
             self.update_plots()
+            self.refresh_status()
             
             # Schedule next update
             self.root.after(100, self.update_ui)
@@ -243,63 +358,209 @@ class IntelligentMonitoringSystem:
             print(f"Error in UI update: {e}")
             self.root.after(100, self.update_ui)
     
-    def update_plots(self):
-        """Update the matplotlib plots with current statistics"""
-        # Clear previous plots
-        self.ax1.clear()
-        self.ax2.clear()
-        
-        # Bar chart of detection counts
-        if self.detection_counts:
-            classes = list(self.detection_counts.keys())
-            counts = list(self.detection_counts.values())
-            
-            bars = self.ax1.bar(classes, counts, color='skyblue')
-            self.ax1.set_title('Object Detections Count')
-            self.ax1.set_ylabel('Count')
-            self.ax1.set_ylim(bottom=0)
-            
-            # Add count labels above bars
-            for bar, count in zip(bars, counts):
-                height = bar.get_height()
-                self.ax1.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                             f'{count}', ha='center', va='bottom')
-        
-        # Line chart of detection history
-        for obj_class, history in self.detection_history.items():
-            if history:
-                timestamps = [x[0] for x in history]
-                confidences = [x[1] for x in history]
-                
-                # Take only the last 10 points to keep the chart readable
-                if len(timestamps) > 10:
-                    timestamps = timestamps[-10:]
-                    confidences = confidences[-10:]
-                
-                self.ax2.plot(timestamps, confidences, 'o-', label=obj_class)
+    def _init_plots(self):
+        """Create the plot decorations once; data artists are added as classes appear"""
+        self.bar_container = None
+        self.bars = {}           # class -> bar patch
+        self.bar_labels = {}     # class -> count label above the bar
+        self.history_lines = {}  # class -> confidence line
+        self.background = None
+        self.drawn_versions = None
+        self.plot_stats = {'full': 0, 'blit': 0, 'last_ms': 0.0, 'last_mode': '-'}
         
-        if self.detection_history:
-            self.ax2.set_title('Detection Confidence Over Time')
-            self.ax2.set_ylabel('Confidence')
-            self.ax2.set_ylim(0, 1.1)
-            self.ax2.legend()
-            self.ax2.tick_params(axis='x', rotation=45)
+        self.ax1.set_title('Object Detections Count')
+        self.ax1.set_ylabel('Count')
+        self.ax1.set_ylim(0, 10)
         
-        # Adjust layout and draw
+        now = time.time()
+        self.ax2.set_title('Detection Confidence Over Time')
+        self.ax2.set_ylabel('Confidence')
+        self.ax2.set_ylim(0, 1.1)
+        self.ax2.set_xlim(now - 10, now + self.PLOT_TIME_HEADROOM)
+        self.ax2.xaxis.set_major_formatter(FuncFormatter(
+            lambda x, _: datetime.datetime.fromtimestamp(x).strftime('%H:%M:%S')))
+        self.ax2.tick_params(axis='x', rotation=45)
+        
+        # Every full draw (ours, or Tk resizing the window) refreshes the blit background
+        self.canvas.mpl_connect('draw_event', self._on_canvas_draw)
         self.fig.tight_layout()
         self.canvas.draw()
     
+    def _on_canvas_draw(self, event):
+        """Save the static parts of the figure and paint the data artists on top"""
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+    
+    def _draw_animated(self):
+        for artist in [*self.bars.values(), *self.bar_labels.values(), *self.history_lines.values()]:
+            self.fig.draw_artist(artist)
+    
+    def _update_bar_artists(self, counts):
+        """Update bar heights in place; returns 0 (blit), 1 (full draw) or 2 (new layout)"""
+        if not counts:
+            return 0
+        redraw = 0
+        if list(counts) != list(self.bars):
+            # A new class adds a category to the x axis: rebuild the bars
+            if self.bar_container is not None:
+                self.bar_container.remove()
+                for label in self.bar_labels.values():
+                    label.remove()
+            classes = list(counts)
+            self.bar_container = self.ax1.bar(classes, [counts[c] for c in classes],
+                                              color='skyblue', animated=True)
+            self.bars = dict(zip(classes, self.bar_container.patches))
+            self.bar_labels = {
+                obj_class: self.ax1.text(bar.get_x() + bar.get_width()/2., 0, '',
+                                         ha='center', va='bottom', animated=True)
+                for obj_class, bar in self.bars.items()}
+            redraw = 2
+        
+        for obj_class, bar in self.bars.items():
+            count = counts[obj_class]
+            bar.set_height(count)
+            label = self.bar_labels[obj_class]
+            label.set_y(count + 0.1)
+            label.set_text(f'{count}')
+        
+        # Grow the y axis with headroom so most increments only need a blit
+        top = max(counts.values())
+        if top * 1.1 + 1 > self.ax1.get_ylim()[1]:
+            self.ax1.set_ylim(0, top * 1.5 + 1)
+            redraw = max(redraw, 1)
+        return redraw
+    
+    def _update_history_artists(self, history):
+        """Move the confidence lines in place; returns 0 (blit), 1 (full draw) or 2 (new layout)"""
+        redraw = 0
+        first, last = None, None
+        for obj_class, points in history.items():
+            if not points:
+                continue
+            times = [t for t, _ in points]
+            confidences = [c for _, c in points]
+            line = self.history_lines.get(obj_class)
+            if line is None:
+                line, = self.ax2.plot(times, confidences, 'o-', label=obj_class, animated=True)
+                self.history_lines[obj_class] = line
+                redraw = 2
+            else:
+                line.set_data(times, confidences)
+            first = times[0] if first is None else min(first, times[0])
+            last = times[-1] if last is None else max(last, times[-1])
+        
+        if redraw == 2:
+            self.ax2.legend()
+        if first is not None:
+            # Shift the time axis only when a point falls outside it (ticks are not blitted)
+            xmin, xmax = self.ax2.get_xlim()
+            if last > xmax or first < xmin:
+                self.ax2.set_xlim(first - 1, last + self.PLOT_TIME_HEADROOM)
+                redraw = max(redraw, 1)
+        return redraw
+    
+    def update_plots(self):
+        """Update the matplotlib plots, only when the statistics changed since the last draw"""
+        versions = (self.counts_version, self.history_version)
+        if versions == self.drawn_versions:
+            return
+        start = time.perf_counter()
+        self.drawn_versions = versions
+        
+        counts = dict(self.detection_counts)
+        # Only the last 10 points per class, to keep the chart readable
+        history = {obj_class: points[-10:] for obj_class, points in list(self.detection_history.items())}
+        redraw = max(self._update_bar_artists(counts), self._update_history_artists(history))
+        
+        if redraw or self.background is None:
+            if redraw == 2:
+                self.fig.tight_layout()
+            self.canvas.draw()
+            mode = 'full'
+        else:
+            # Restore the static background, paint the moved artists and copy to the screen
+            self.canvas.restore_region(self.background)
+            self._draw_animated()
+            self.canvas.blit(self.fig.bbox)
+            mode = 'blit'
+        
+        self.plot_stats[mode] += 1
+        self.plot_stats['last_mode'] = mode
+        self.plot_stats['last_ms'] = (time.perf_counter() - start) * 1000
+    
+    def worker_status(self):
+        """Status from the camera threads: full for one camera, the headline of each for several"""
+        if not self.camera_status:
+            return "System starting..."
+        if len(self.feeds) == 1:
+            headline, details = self.camera_status[0]
+            return f"{headline}  |  {details}" if details else headline
+        return "   ".join(f"[Camera {self.feeds[camera_id].source}] {headline}"
+                           for camera_id, (headline, _) in sorted(self.camera_status.items()))
+    
+    def refresh_status(self):
+        """Camera status plus detector throughput, displayed-frame age and plot redraw cost"""
+        s = self.plot_stats
+        status = self.worker_status()
+        
+        # Detector throughput, refreshed about once per second
+        now = time.perf_counter()
+        since, frames, rate = self.detector_rate
+        detector_stats = self.detector.get_stats()
+        if now - since >= 1.0:
+            rate = (detector_stats['frames'] - frames) / (now - since)
+            self.detector_rate = (now, detector_stats['frames'], rate)
+        status += f"  |  Detector: {rate:.1f} frames/s, mean batch {detector_stats['mean_batch_size']:.1f}"
+        
+        ages = [feed.frame_age_ms for feed in self.feeds if feed.frame_age_ms is not None]
+        if ages:
+            status += f"  |  Displayed frame age: {max(ages):.0f} ms"
+        status += f"  |  Plot redraw: {s['last_ms']:.1f} ms ({s['last_mode']}), {s['full']} full / {s['blit']} blitted"
+        
+        dropped = [(self.logger.stats['dropped'], "log events"), (self.capture_writer.stats['dropped'], "captures"),
+                   (self.dropped_messages, "UI messages")]
+        dropped = [f"{count} {what}" for count, what in dropped if count]
+        if dropped:
+            status += "  |  Dropped: " + ", ".join(dropped)
+        if status != self.status_var.get():
+            self.status_var.set(status)
+    
     def on_closing(self):
         """Handle window closing"""
         self.running = False
-        if hasattr(self, 'cap') and self.cap.isOpened():
-            self.cap.release()
+        for feed in getattr(self, 'feeds', []):
+            feed.grabber.release()
+            stats = feed.grabber.get_stats()
+            print(f"Camera {feed.source}: {stats['grabbed']} frames grabbed, {stats['delivered']} processed, "
+                  f"{stats['dropped']} dropped")
+        if hasattr(self, 'detector'):
+            self.detector.stop()
+            stats = self.detector.get_stats()
+            print(f"Detector: {stats['frames']} frames in {stats['batches']} batches "
+                  f"(mean batch {stats['mean_batch_size']:.1f})")
+        if hasattr(self, 'capture_writer'):
+            # Finish queued captures first so their log events still get written
+            self.capture_writer.close()
+            print(f"Captures: {self.capture_writer.summary()}")
+        if hasattr(self, 'latest_frame'):
+            stats = self.latest_frame.stats
+            print(f"Display: {stats['taken']} frames shown, {stats['overwritten']} replaced before display")
+        if hasattr(self, 'logger'):
+            # Write whatever is still queued before the window goes away
+            self.logger.close()
+            print(f"Event log: {self.logger.summary()}")
         self.root.destroy()
 
 def main():
     """Main function to start the application"""
+    parser = argparse.ArgumentParser(description="Intelligent Monitoring System")
+    parser.add_argument('--sources', nargs='+', default=['0'],
+                        help="Camera indices, video files or stream URLs (one feed each)")
+    args = parser.parse_args()
+    sources = [int(source) if source.isdigit() else source for source in args.sources]
+    
     root = tk.Tk()
-    app = IntelligentMonitoringSystem(root)
+    app = IntelligentMonitoringSystem(root, sources=sources)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -1,22 +1,20 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import os
 import seaborn as sns
 from datetime import datetime
 import sys
 
+from event_store import EventStore
+
 def visualize_log(log_file):
-    """Visualize a log file with various plots"""
+    """Visualize a log file (CSV or event store) with various plots"""
     # Check if file exists
     if not os.path.exists(log_file):
         print(f"Error: Log file {log_file} not found")
         return
     
-    # Read the CSV log file
-    df = pd.read_csv(log_file)
-    
-    # Convert timestamp to datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    # Query aggregates from the indexed store next to the log (built from the CSV if missing)
+    store = EventStore.for_log(log_file)
     
     # Set theme
     sns.set_theme(style="whitegrid")
@@ -26,39 +24,48 @@ def visualize_log(log_file):
     fig.suptitle('Log Analysis', fontsize=16)
     
     # 1. Count by class
-    class_counts = df[df['evento'] != 'Captura guardada']['clase'].value_counts()
-    axs[0, 0].bar(class_counts.index, class_counts.values, color=sns.color_palette("muted"))
+    class_counts = store.class_counts()
+    classes = [c for c, _ in class_counts]
+    counts = [n for _, n in class_counts]
+    axs[0, 0].bar(classes, counts, color=sns.color_palette("muted"))
     axs[0, 0].set_title('Detections by Class')
     axs[0, 0].set_ylabel('Count')
     axs[0, 0].set_xlabel('Class')
     
     # Add count labels
-    for i, v in enumerate(class_counts.values):
+    for i, v in enumerate(counts):
         axs[0, 0].text(i, v + 0.1, str(v), ha='center')
     
     # 2. Confidence distribution
-    axs[0, 1].hist(df['confianza'], bins=10, color='skyblue', edgecolor='black')
+    edges, bin_counts = store.confidence_histogram(bins=10)
+    if bin_counts:
+        axs[0, 1].hist(edges[:-1], bins=edges, weights=bin_counts, color='skyblue', edgecolor='black')
     axs[0, 1].set_title('Confidence Distribution')
     axs[0, 1].set_xlabel('Confidence')
     axs[0, 1].set_ylabel('Frequency')
     
-    # 3. Events over time
-    detection_events = df[df['evento'] != 'Captura guardada']
-    # Group by 5-minute intervals and count
-    detection_events['time_interval'] = detection_events['timestamp'].dt.floor('5min')
-    time_series = detection_events.groupby('time_interval').size()
+    # 3. Events over time, in 5-minute intervals
+    time_series = store.time_series(bucket_seconds=300)
     
-    axs[1, 0].plot(time_series.index, time_series.values, marker='o', linestyle='-', color='green')
+    axs[1, 0].plot([t for t, _ in time_series], [n for _, n in time_series],
+                   marker='o', linestyle='-', color='green')
     axs[1, 0].set_title('Detections Over Time')
     axs[1, 0].set_xlabel('Time')
     axs[1, 0].set_ylabel('Number of Detections')
     plt.setp(axs[1, 0].xaxis.get_majorticklabels(), rotation=45)
     
-    # 4. Confidence by class
-    sns.boxplot(x='clase', y='confianza', data=detection_events, ax=axs[1, 1])
+    # 4. Confidence by class: mean +/- std with the min-max range, from per-class aggregates
+    class_stats = store.confidence_stats(by_class=True)
+    stats = [class_stats[c] for c in classes]
+    positions = range(len(classes))
+    axs[1, 1].vlines(positions, [s['min'] for s in stats], [s['max'] for s in stats], color='gray')
+    axs[1, 1].errorbar(positions, [s['mean'] for s in stats], yerr=[s['std'] for s in stats],
+                       fmt='o', capsize=8, color=sns.color_palette("muted")[0])
+    axs[1, 1].set_xticks(list(positions), classes)
     axs[1, 1].set_title('Confidence by Class')
     axs[1, 1].set_xlabel('Class')
     axs[1, 1].set_ylabel('Confidence')
+    store.close()
     
     # Adjust layout
     plt.tight_layout()
@@ -4,12 +4,17 @@ import time
 from ultralytics import YOLO
 import os
 
+# Post-procesado vectorizado de YOLO y captura en hilo propio (copias de los módulos del Monitor Visual 3D)
+from yolo_postprocess import extract_detections
+from frame_grabber import FrameGrabber
+
 class CamaraYOLO:
     def __init__(self, modelo_path='../../../yolov8n.pt'):
         # Inicializar captura de video
         self.cap = cv2.VideoCapture(0)
         if not self.cap.isOpened():
             raise Exception("No se pudo abrir la cámara")
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         
         # Cargar modelo YOLO
         self.modelo = YOLO(modelo_path)
@@ -46,17 +51,12 @@ class CamaraYOLO:
         resultados = self.modelo.predict(frame, conf=0.5)
         frame_anotado = frame.copy()
         
-        # Dibujar cajas y etiquetas
+        # Dibujar cajas y etiquetas (cajas, confianzas y clases en un solo array por resultado)
         for r in resultados:
-            boxes = r.boxes
-            for box in boxes:
-                # Coordenadas de la caja
-                x1, y1, x2, y2 = box.xyxy[0]
-                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                
-                # Confianza y clase
-                conf = float(box.conf[0])
-                cls = int(box.cls[0])
+            detecciones = extract_detections(r)
+            for (x1, y1, x2, y2), conf, cls in zip(detecciones['bbox'].astype(int).tolist(),
+                                                  detecciones['confidence'].tolist(),
+                                                  detecciones['class_id'].tolist()):
                 nombre_clase = self.modelo.names[cls]
                 
                 # Dibujar caja
@@ -105,12 +105,18 @@ class CamaraYOLO:
         print("S: Guardar captura")
         print("R: Grabar video de 5 segundos")
         
+        # La cámara se lee en otro hilo; aquí se procesa siempre el frame más reciente
+        self.grabber = FrameGrabber(self.cap, drop_frames=True, name="camara-yolo").start()
+        ultimo_id = 0
+        
         while True:
             if not self.pausado:
-                ret, frame = self.cap.read()
-                if not ret:
+                capturado = self.grabber.wait(ultimo_id, timeout=1.0)
+                if capturado is None:
                     print("Error al leer el frame")
                     break
+                ultimo_id = capturado.frame_id
+                frame = capturado.frame
                 
                 # Detectar objetos con YOLO
                 frame_yolo = self.detectar_objetos(frame)
@@ -129,6 +135,12 @@ class CamaraYOLO:
                 cv2.putText(frame_filtrado_display, filtro_info, (10, 30), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                 
+                # Latencia desde la captura y frames viejos descartados
+                latencia = (time.perf_counter() - capturado.capture_time) * 1000
+                info_captura = f"Latencia: {latencia:.0f} ms  Descartados: {self.grabber.stats['dropped']}"
+                cv2.putText(frame_filtrado_display, info_captura, (10, 60),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                
                 # Grabar si está en modo grabación
                 if self.grabando:
                     self.video_writer.write(frame_yolo)
@@ -164,7 +176,7 @@ class CamaraYOLO:
                 self.iniciar_grabacion()
         
         # Liberar recursos
-        self.cap.release()
+        self.grabber.release()
         cv2.destroyAllWindows()
         if self.grabando:
             self.video_writer.release()
@@ -0,0 +1,146 @@
+"""
+Captura desacoplada con semántica de "último frame"
+
+Con `cap.read()` dentro del bucle de procesamiento, mientras el bucle
+procesa, el driver sigue acumulando frames. La siguiente lectura devuelve
+entonces un frame viejo, incluso con CAP_PROP_BUFFERSIZE=1. FrameGrabber
+lee la fuente sin parar en su propio hilo y guarda solo el frame más
+reciente junto con el instante de captura. El consumidor pide el último
+frame sin bloquear (`latest`) o espera a que haya uno nuevo (`wait`). Los
+frames que se sobrescriben sin que nadie los lea se cuentan como
+descartados.
+
+Con fuentes que no van en tiempo real (videos o frames sintéticos en
+benchmarks), descartar frames cambiaría los resultados. En ese caso el
+hilo espera a que se consuma el frame anterior (drop_frames=False).
+
+Lo usan el Monitor Visual 3D, el sistema de monitoreo inteligente
+(2025-06-22) y los talleres de YOLO con webcam (2025-06-23).
+"""
+
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Optional
+
+# frame_id empieza en 1; capture_time es time.perf_counter() y wall_time es time.time()
+GrabbedFrame = namedtuple('GrabbedFrame', ['frame', 'frame_id', 'capture_time', 'wall_time'])
+
+
+class FrameGrabber:
+    def __init__(self, source, drop_frames: Optional[bool] = None, name: str = 'frame-grabber',
+                 retry_delay: float = 0.01):
+        """
+        Args:
+            source: Cualquier objeto con read() y release() (cv2.VideoCapture o FrameSource)
+            drop_frames: Quedarse solo con el último frame (None = según `source.is_live`)
+            name: Nombre del hilo de captura
+            retry_delay: Espera tras una lectura fallida antes de reintentar
+        """
+        self.source = source
+        self.drop_frames = getattr(source, 'is_live', True) if drop_frames is None else drop_frames
+        self.name = name
+        self.retry_delay = retry_delay
+
+        self._condition = threading.Condition()
+        self._latest: Optional[GrabbedFrame] = None
+        self._consumed_id = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self.exhausted = False  # La fuente terminó y ya se entregó su último frame
+
+        self.stats = {'grabbed': 0, 'delivered': 0, 'dropped': 0, 'read_failures': 0}
+
+    def start(self) -> 'FrameGrabber':
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+
+    def release(self):
+        """Detiene el hilo y libera la fuente"""
+        self.stop()
+        self.source.release()
+
+    def _run(self):
+        frame_id = 0
+        while self._running:
+            if not self.drop_frames:
+                # Sin descartes: esperar a que se consuma el frame anterior
+                with self._condition:
+                    while self._running and self._latest is not None and \
+                            self._latest.frame_id > self._consumed_id:
+                        self._condition.wait(0.1)
+                if not self._running:
+                    break
+
+            ok, frame = self.source.read()
+            capture_time = time.perf_counter()
+            if not ok:
+                if getattr(self.source, 'exhausted', False):
+                    break
+                self.stats['read_failures'] += 1
+                time.sleep(self.retry_delay)
+                continue
+
+            frame_id += 1
+            with self._condition:
+                if self._latest is not None and self._latest.frame_id > self._consumed_id:
+                    self.stats['dropped'] += 1  # Nadie leyó el anterior
+                self._latest = GrabbedFrame(frame, frame_id, capture_time, time.time())
+                self.stats['grabbed'] += 1
+                self._condition.notify_all()
+
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+    def _take(self, after_id: int) -> Optional[GrabbedFrame]:
+        """Último frame si es posterior a `after_id` (llamar con el lock tomado)"""
+        latest = self._latest
+        if latest is None or latest.frame_id <= after_id:
+            if not self._running and (latest is None or latest.frame_id <= self._consumed_id):
+                self.exhausted = True
+            return None
+        if latest.frame_id > self._consumed_id:
+            self._consumed_id = latest.frame_id
+            self.stats['delivered'] += 1
+            self._condition.notify_all()
+        return latest
+
+    def latest(self, after_id: int = 0) -> Optional[GrabbedFrame]:
+        """Devuelve sin bloquear el frame más reciente posterior a `after_id`, o None"""
+        with self._condition:
+            return self._take(after_id)
+
+    def wait(self, after_id: int = 0, timeout: Optional[float] = None) -> Optional[GrabbedFrame]:
+        """Espera hasta que haya un frame posterior a `after_id`; None si vence o la fuente terminó"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._condition:
+            while True:
+                grabbed = self._take(after_id)
+                if grabbed is not None or self.exhausted:
+                    return grabbed
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        grabbed = stats['grabbed']
+        stats['drop_rate'] = stats['dropped'] / grabbed if grabbed else 0.0
+        return stats
+
+    def summary(self) -> str:
+        stats = self.get_stats()
+        return (f"capturados={stats['grabbed']} procesados={stats['delivered']} "
+                f"descartados={stats['dropped']} ({stats['drop_rate']:.0%}) "
+                f"lecturas fallidas={stats['read_failures']}")
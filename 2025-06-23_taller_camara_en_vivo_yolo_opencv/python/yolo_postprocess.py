@@ -0,0 +1,139 @@
+"""
+Post-procesado vectorizado de resultados de YOLO
+
+El bucle por caja de Ultralytics hace, por cada detección, varias copias
+GPU→CPU (xyxy, conf, cls) y crea escalares de Python aunque la caja se
+descarte después por confianza. Este módulo copia `boxes.data` (N × 6:
+x1, y1, x2, y2, conf, cls; N × 7 con el id de seguimiento antes de conf
+si el resultado viene de `track`) una sola vez por resultado. El umbral, el
+filtro de clases, el centro y el área se calculan sobre arrays.
+
+El resultado es un array estructurado compacto. Los dicts que esperan los
+consumidores se construyen solo cuando alguien los lee (YoloDetections).
+
+Lo usan el Monitor Visual 3D, el detector del taller de IA visual
+colaborativa (2025-06-20) y la cámara en vivo con YOLO (2025-06-23).
+"""
+
+from collections.abc import Sequence
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+DETECTION_DTYPE = np.dtype([
+    ('bbox', np.float32, (4,)),     # x1, y1, x2, y2
+    ('confidence', np.float32),
+    ('class_id', np.int16),
+    ('center', np.float32, (2,)),
+    ('area', np.float32)
+])
+
+
+def _to_numpy(values) -> np.ndarray:
+    """Tensor de torch (CPU o GPU) o array a numpy, con una sola copia"""
+    if hasattr(values, 'cpu'):
+        values = values.cpu().numpy()
+    return np.asarray(values, dtype=np.float32)
+
+
+def extract_detections(result, min_confidence: float = 0.0,
+                       classes: Optional[Iterable[int]] = None) -> np.ndarray:
+    """
+    Convierte un resultado de YOLO en un array estructurado de detecciones
+
+    Args:
+        result: Resultado de Ultralytics para un frame (con `.boxes`)
+        min_confidence: Se conservan las cajas con confianza mayor o igual, como con
+            `conf=` de Ultralytics (pasar el mismo umbral a los dos no descarta nada más)
+        classes: Ids de clase a conservar (None = todas)
+
+    Returns:
+        Array con dtype DETECTION_DTYPE, en el orden de YOLO
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.empty(0, dtype=DETECTION_DTYPE)
+
+    # Una sola transferencia por resultado en lugar de tres por caja
+    data = _to_numpy(boxes.data)
+    # conf y cls son siempre las dos últimas columnas (con `track` la 4 es el id de seguimiento)
+    keep = data[:, -2] >= min_confidence
+    if classes is not None:
+        keep &= np.isin(data[:, -1].astype(np.int64), np.fromiter(classes, dtype=np.int64))
+    data = data[keep]
+
+    detections = np.empty(len(data), dtype=DETECTION_DTYPE)
+    xyxy = data[:, :4]
+    detections['bbox'] = xyxy
+    detections['confidence'] = data[:, -2]
+    detections['class_id'] = data[:, -1]
+    detections['center'] = (xyxy[:, :2] + xyxy[:, 2:]) / 2
+    detections['area'] = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    return detections
+
+
+class YoloDetections(Sequence):
+    """Detecciones de un frame sobre el array compacto; los dicts se crean al leerlos"""
+
+    __slots__ = ('array', 'names', '_dicts')
+
+    def __init__(self, array: np.ndarray, names: Mapping[int, str]):
+        """
+        Args:
+            array: Detecciones con dtype DETECTION_DTYPE
+            names: Nombres de clase del modelo (id -> nombre)
+        """
+        self.array = array
+        self.names = names
+        self._dicts: Optional[List[Dict]] = None
+
+    def as_dicts(self) -> List[Dict]:
+        """Lista de dicts (class, confidence, bbox, center, area), calculada una vez"""
+        if self._dicts is None:
+            names = self.names
+            array = self.array
+            # tolist por columna: los campos con subarray (bbox, center) salen como listas
+            self._dicts = [
+                {
+                    'class': names[class_id],
+                    'confidence': confidence,
+                    'bbox': bbox,
+                    'center': center,
+                    'area': area
+                }
+                for bbox, confidence, class_id, center, area in zip(
+                    array['bbox'].tolist(), array['confidence'].tolist(), array['class_id'].tolist(),
+                    array['center'].tolist(), array['area'].tolist())
+            ]
+        return self._dicts
+
+    def select(self, class_id: int, min_confidence: float = 0.0) -> 'YoloDetections':
+        """Subconjunto de una clase con confianza >= min_confidence, filtrado sobre el array"""
+        array = self.array
+        mask = (array['class_id'] == class_id) & (array['confidence'] >= min_confidence)
+        return YoloDetections(array[mask], self.names)
+
+    def class_counts(self, class_id: int) -> Tuple[int, int]:
+        """(detecciones de la clase, resto) sin construir los dicts"""
+        matches = int(np.count_nonzero(self.array['class_id'] == class_id))
+        return matches, len(self.array) - matches
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __getitem__(self, index):
+        return self.as_dicts()[index]
+
+    def __iter__(self):
+        return iter(self.as_dicts())
+
+    def __repr__(self) -> str:
+        return f"YoloDetections({len(self)} detecciones)"
+
+
+def find_class_id(names: Mapping[int, str], class_name: str) -> int:
+    """Id de una clase por nombre, -1 si el modelo no la tiene"""
+    for index, name in names.items():
+        if name == class_name:
+            return int(index)
+    return -1
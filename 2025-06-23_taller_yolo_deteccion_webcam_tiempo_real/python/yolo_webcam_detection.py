@@ -15,6 +15,9 @@ import cv2
 import time
 import numpy as np
 
+# Latest-frame grabber (copy of the module from the 3D visual monitor workshop)
+from frame_grabber import FrameGrabber
+
 
 class YOLOWebcamDetector:
     """
@@ -157,6 +160,12 @@ class YOLOWebcamDetector:
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         cap.set(cv2.CAP_PROP_FPS, 30)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        
+        # Read frames on a separate thread and always process the newest one
+        grabber = FrameGrabber(cap, drop_frames=True, name="webcam-grabber").start()
+        last_frame_id = 0
+        latency_history = []
         
         print("Starting YOLO webcam detection...")
         print("Press 'q' to quit")
@@ -169,11 +178,13 @@ class YOLOWebcamDetector:
             # Start time measurement
             start_time = time.time()
             
-            # Capture frame
-            ret, frame = cap.read()
-            if not ret:
+            # Get the newest frame (older ones were dropped while we were busy)
+            grabbed = grabber.wait(last_frame_id, timeout=1.0)
+            if grabbed is None:
                 print("Error: Could not read frame")
                 break
+            last_frame_id = grabbed.frame_id
+            frame = grabbed.frame
             
             # Flip frame horizontally for mirror effect
             frame = cv2.flip(frame, 1)
@@ -212,6 +223,15 @@ class YOLOWebcamDetector:
             cv2.rectangle(frame, (10, 110), (250, 150), (0, 0, 0), -1)
             cv2.putText(frame, inference_text, (15, 135), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
             
+            # Draw latency measured from capture time
+            latency = (time.perf_counter() - grabbed.capture_time) * 1000
+            latency_history.append(latency)
+            if len(latency_history) > 30:
+                latency_history.pop(0)
+            latency_text = f"Latency: {np.mean(latency_history):.1f}ms"
+            cv2.rectangle(frame, (10, 160), (250, 200), (0, 0, 0), -1)
+            cv2.putText(frame, latency_text, (15, 185), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+            
             # Draw mode indicator
             mode_text = "Filtered" if filter_mode else "All Objects"
             cv2.rectangle(frame, (frame.shape[1] - 150, 10), (frame.shape[1] - 10, 50), (0, 0, 0), -1)
@@ -238,10 +258,11 @@ class YOLOWebcamDetector:
             
             # Print stats every 100 frames
             if self.frame_count % 100 == 0:
-                print(f"Processed {self.frame_count} frames. Average FPS: {avg_fps:.2f}")
+                print(f"Processed {self.frame_count} frames. Average FPS: {avg_fps:.2f}, "
+                      f"dropped stale frames: {grabber.stats['dropped']}")
         
         # Cleanup
-        cap.release()
+        grabber.release()
         cv2.destroyAllWindows()
         
         # Print final statistics
@@ -250,6 +271,7 @@ class YOLOWebcamDetector:
         print(f"Average FPS: {np.mean(self.fps_history):.2f}")
         print(f"Max FPS: {max(self.fps_history):.2f}")
         print(f"Min FPS: {min(self.fps_history):.2f}")
+        print(f"Frames grabbed: {grabber.stats['grabbed']}, dropped without processing: {grabber.stats['dropped']}")
 
 
 def main():